@@ -1,29 +1,233 @@
-from typing import Union, Tuple, List, Dict
+from functools import partial
+from typing import Callable, Union, Tuple, List, Dict, Optional
 
-import cli
+import build_cache
+import operations
+from config import API_BATCH_MAX_SIZE
+from metrics import MetricsRecorder, Unit
+from response_format import EncodedBody, ResponseFormat, to_archive, to_gzip, to_lines, to_string
+from result_offload import get_result_offloader
 
 
-def handle(version: str, action: str, data: Dict) -> Tuple[Union[str, List[str]], int]:
-    if version == "1.0":
-        if action == "validate":
-            valid, results = cli._validate(data, verbose=True)
-            if not valid:
-                return results, 422
+# Actions returning configurations, whose results are uploaded to S3 when too large to be returned
+OFFLOADED_ACTIONS = ("build", "build_incremental", "build_batch")
 
-        elif action == "build":
-            results = cli._build(data).split("\n")
 
-        elif action == "search":
-            search_results = cli._search(data.get("keyword"), data.get("cloud"), data.get("tags"))
-            if data.get("keys_only"):
-                results = [resource.key for resource in search_results]
-            else:
-                results = [result.to_json() for result in search_results]
+def handle(
+    version: str, action: str, data: Dict, recorder: Optional[MetricsRecorder] = None
+) -> Tuple[Union[str, List[str], List[Dict], Dict, EncodedBody], int]:
+    """Handle a request, recording the latency of its phases and whether it was served from cache to `recorder`"""
+    recorder = recorder or MetricsRecorder()
+    if version != "1.0":
+        return f"Unrecognised command version {version}", 403
+
+    handle_action = ACTIONS.get(action)
+    if handle_action is None:
+        return f"Command {action} not recognised", 404
+
+    results, status = handle_action(data, recorder)
+    if status == 200 and action in OFFLOADED_ACTIONS:
+        results = _offload_large(results, recorder)
+    return results, status
+
+
+def _handle_validate(data, recorder: MetricsRecorder) -> Tuple[List[str], int]:
+    with recorder.time_phase("Validate"):
+        valid, results = operations.validate(_get_mapping(data))
+    return results, 200 if valid else 422
+
+
+def _handle_build(data, recorder: MetricsRecorder) -> Tuple[Union[str, List[str], Dict, EncodedBody], int]:
+    mapping, options = _get_mapping(data), _get_options(data)
+    deterministic, seed = bool(options.get("deterministic")), options.get("seed")
+    if seed is not None and not isinstance(seed, str):
+        return "Seed should be a string", 422
+    response_format = options.get("format", ResponseFormat.LINES)
+    if response_format not in ResponseFormat.values():
+        return _unknown_format(response_format), 422
+    if options.get("profile"):
+        return _build_profiled(mapping, deterministic, options["profile"], seed)
+
+    with recorder.time_phase("Parse"):
+        parsed = operations.parse(mapping)
+    if not parsed.ok:
+        return parsed.message, 422
+    with recorder.time_phase("Build"):
+        return _build(mapping, deterministic, parsed.maps, recorder, response_format, seed), 200
+
+
+def _handle_build_incremental(data, recorder: MetricsRecorder) -> Tuple[Union[str, Dict], int]:
+    seed = _get_options(data).get("seed")
+    if seed is not None and not isinstance(seed, str):
+        return "Seed should be a string", 422
+    with recorder.time_phase("Build"):
+        return _build_incremental(_get_mapping(data), seed), 200
+
+
+def _handle_build_batch(data, recorder: MetricsRecorder) -> Tuple[Union[str, List[Dict]], int]:
+    options = _get_options(data)
+    mappings = options.get("mappings")
+    if not isinstance(mappings, list):
+        return "Action build_batch requires a list of mappings", 422
+    if len(mappings) > API_BATCH_MAX_SIZE:
+        return f"Batch of {len(mappings)} mappings exceeds the limit of {API_BATCH_MAX_SIZE}", 413
+    response_format = options.get("format", ResponseFormat.LINES)
+    if response_format not in ResponseFormat.values():
+        return _unknown_format(response_format), 422
+    with recorder.time_phase("Build"):
+        return _build_batch(mappings, bool(options.get("deterministic")), response_format), 200
+
+
+def _handle_cache_stats(data, recorder: MetricsRecorder) -> Tuple[Dict, int]:
+    cache = build_cache.get_build_cache()
+    return (cache.stats() if cache else {}), 200
+
+
+def _handle_search(data, recorder: MetricsRecorder) -> Tuple[List[str], int]:
+    search_results = operations.search(data.get("keyword"), data.get("cloud"), data.get("tags"))
+    if data.get("keys_only"):
+        return [resource.key for resource in search_results], 200
+    return [result.to_json() for result in search_results], 200
+
+
+ACTIONS: Dict[str, Callable[[Dict, MetricsRecorder], Tuple]] = {
+    "validate": _handle_validate,
+    "build": _handle_build,
+    "build_incremental": _handle_build_incremental,
+    "build_batch": _handle_build_batch,
+    "cache_stats": _handle_cache_stats,
+    "search": _handle_search,
+}
+
+
+def _offload_large(results, recorder: MetricsRecorder):
+    """`results`, or where they were uploaded to if they are too large to be returned"""
+    offloader = get_result_offloader()
+    body = offloader.get_offload_body(results)
+    if body is None:
+        return results
+    with recorder.time_phase("Offload"):
+        return offloader.offload(body).to_json()
+
+
+def _get_mapping(data: Union[Dict, List]):
+    # Requests carrying build options send the mapping under "mapping", older ones send it as the request itself
+    return data["mapping"] if isinstance(data, dict) and "mapping" in data else data
 
-        else:
-            return f"Command {action} not recognised", 404
 
+def _get_options(data: Union[Dict, List]) -> Dict:
+    # Requests sending a list mapping as the request itself have no options
+    return data if isinstance(data, dict) else {}
+
+
+def _unknown_format(response_format) -> str:
+    return f"Format {response_format} not recognised, expected one of {ResponseFormat.values()}"
+
+
+def _build(
+    data,
+    deterministic: bool = False,
+    hl_maps=None,
+    recorder: Optional[MetricsRecorder] = None,
+    response_format: str = ResponseFormat.LINES,
+    seed: Optional[str] = None,
+) -> Union[List[str], Dict[str, List[str]], str, Dict[str, str], EncodedBody]:
+    """
+    Lines of the generated configuration, or of each region's configuration if the mapping spans several,
+    unless another `response_format` is requested
+    """
+    if ResponseFormat.is_archive(response_format):
+        return to_archive(operations.build_files(data, deterministic, seed, hl_maps), response_format)
+
+    cache = build_cache.get_build_cache()
+    hits = cache.hits if cache else 0
+    region_templates = operations.build_regions(
+        data, deterministic=deterministic, seed=seed, cache=cache, hl_maps=hl_maps
+    )
+    if recorder and cache:
+        recorder.put_metric("CacheHit", int(cache.hits > hits), Unit.COUNT)
+    if response_format == ResponseFormat.STRING:
+        return to_string(region_templates)
+    if response_format == ResponseFormat.GZIP:
+        return to_gzip(region_templates)
+    return to_lines(region_templates)
+
+
+def _build_profiled(
+    data, deterministic: bool, profile: Union[bool, str], seed: Optional[str] = None
+) -> Tuple[Dict, int]:
+    """
+    Like `_build`, also returning the time spent in each phase. With `"profile": "cprofile"`, the build runs under
+    cProfile and the functions taking the most time are returned too.
+    """
+    from profiler import BuildProfiler
+
+    profiler = BuildProfiler(cprofile=profile == "cprofile")
+    with profiler.phase("parse"):
+        parsed = operations.parse(data)
+    if not parsed.ok:
+        return {"result": parsed.message, "profile": profiler.finish().to_json()}, 422
+
+    region_templates = profiler.build(data, parsed.maps, deterministic, seed)
+    result = to_lines(region_templates)
+    return {"result": result, "profile": profiler.finish().to_json()}, 200
+
+
+def _build_incremental(data, seed: Optional[str]) -> Dict:
+    """
+    Like `_build`, also reporting the uids of the resources re-rendered in each region. The fragment cache is shared
+    by every request, so names are derived from the request's seed, or from the mapping itself without one: pass a
+    seed unique to the stack to keep names, and so fragments, stable while its mapping is edited.
+    """
+    from models.naming import mapping_digest
+
+    if seed is None:
+        seed = mapping_digest(data)
+    region_templates, rendered = operations.build_incremental(data, _get_fragment_cache(), seed)
+    if len(region_templates) == 1:
+        result = next(iter(region_templates.values())).split("\n")
     else:
-        return f"Unrecognised command version {version}", 403
+        result = {key: template.split("\n") for key, template in region_templates.items()}
+    return {"result": result, "rendered": rendered}
+
+
+_fragment_cache = None
+
+
+def _get_fragment_cache():
+    # Kept for the lifetime of the (warm) container, so that consecutive builds of a mapping are incremental
+    global _fragment_cache
+    if _fragment_cache is None:
+        _fragment_cache = operations.create_fragment_cache()
+    return _fragment_cache
+
+
+def _build_batch(
+    mappings: List, deterministic: bool = False, response_format: str = ResponseFormat.LINES
+) -> List[Dict]:
+    """
+    Validate and build every mapping, reporting a status per mapping rather than for the batch. Rendering is
+    CPU-bound, so mappings are built in parallel by the workers of the shared process pool of `get_region_pool`,
+    or one after the other if there is none. Results of compressed formats are sent base64 encoded, with the
+    headers they would have been sent with.
+    """
+    from generator import get_region_pool
+
+    build_item = partial(_build_batch_item, deterministic=deterministic, response_format=response_format)
+    executor = get_region_pool() if len(mappings) > 1 else None
+    if executor is None:
+        return [build_item(mapping) for mapping in mappings]
+    return list(executor.map(build_item, mappings))
+
 
-    return results, 200
+def _build_batch_item(mapping, deterministic: bool = False, response_format: str = ResponseFormat.LINES) -> Dict:
+    try:
+        parsed = operations.parse(mapping)
+        if not parsed.ok:
+            return {"status": 422, "result": parsed.message}
+        result = _build(mapping, deterministic, parsed.maps, response_format=response_format)
+        if isinstance(result, EncodedBody):
+            return {"status": 200, "result": result.to_base64(), "headers": result.headers}
+        return {"status": 200, "result": result}
+    except Exception as e:
+        return {"status": 500, "result": f"{type(e).__name__}: {e}"}
@@ -1,16 +1,20 @@
 import json
 import os
+import time
 
 from dotenv import load_dotenv
 
 import api_handler
-from generator import TerraformGenerator
+import metrics
+from response_format import EncodedBody
 
 load_dotenv()
 TEMPLATES_MAP_PATH = os.path.join(os.getcwd(), "templates_map.json")
 
 
 def lambda_handler_old(event, context):
+    from generator import TerraformGenerator
+
     with open(TEMPLATES_MAP_PATH, "r") as f:
         template_map = json.load(f)
         generator = TerraformGenerator(template_map)
@@ -41,11 +45,42 @@ def lambda_handler_old(event, context):
 
 
 def lambda_handler_new(event, context):
-    print(json.dumps(event))
-    request = json.loads(event["body"])
-    version = request.get("version")
-    action = request.get("action")
+    start = time.perf_counter()
+    recorder = metrics.MetricsRecorder()
+    body = event.get("body") or ""
+    recorder.put_metric("InputSize", len(body), metrics.Unit.BYTES)
+    if context is not None:
+        recorder.set_property("RequestId", getattr(context, "aws_request_id", None))
+
+    logged = metrics.should_log_event()
+    if logged:
+        print(json.dumps(metrics.redact_event(event)))
 
-    response, status_code = api_handler.handle(version, action, data=request)
+    # Stays a server error if handling the request raises
+    status_code = 500
+    try:
+        with recorder.time_phase("Decode"):
+            request = json.loads(body)
+        version = request.get("version")
+        action = request.get("action")
+        recorder.put_dimension("Action", str(action))
+        recorder.set_property("Version", version)
 
+        response, status_code = api_handler.handle(version, action, data=request, recorder=recorder)
+        recorder.put_metric("OutputSize", metrics.get_response_size(response), metrics.Unit.BYTES)
+    finally:
+        if status_code >= 500 and not logged:
+            print(json.dumps(metrics.redact_event(event)))
+        recorder.set_property("StatusCode", status_code)
+        recorder.put_metric("Error", int(status_code >= 500))
+        recorder.put_metric("Latency", (time.perf_counter() - start) * 1000, metrics.Unit.MILLISECONDS)
+        recorder.flush()
+
+    if isinstance(response, EncodedBody):
+        return {
+            "statusCode": status_code,
+            "headers": response.headers,
+            "body": response.to_base64(),
+            "isBase64Encoded": True,
+        }
     return {"statusCode": status_code, "body": response}
@@ -0,0 +1,113 @@
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Tuple
+
+import operations
+import template_writer
+from build_cache import BuildCacheMode, create_build_cache
+from config import get_cloud_provider_settings, get_resource_settings
+from mapping_loader import load_mapping, VALID_FILE_SUFFIXES
+from template_loader import get_registry
+
+GLOB_CHARACTERS = set("*?[")
+
+
+@dataclass
+class BuildJobResult:
+    input_path: str
+    output_path: str
+    seconds: float
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def is_batch_input(paths: Iterable[str]) -> bool:
+    """Whether the given inputs may expand to several mappings, rather than being a single mapping file"""
+    paths = list(paths)
+    return len(paths) > 1 or any(os.path.isdir(path) or GLOB_CHARACTERS & set(path) for path in paths)
+
+
+def expand_inputs(paths: Iterable[str]) -> List[str]:
+    """Expand directories and glob patterns into the mapping files they contain, in a stable order"""
+    out: List[str] = []
+    for path in paths:
+        if os.path.isdir(path):
+            matches = sorted(os.path.join(path, name) for name in os.listdir(path))
+        elif GLOB_CHARACTERS & set(path):
+            matches = sorted(glob.glob(path))
+        else:
+            out.append(path)
+            continue
+        out.extend(match for match in matches if os.path.isfile(match) and _has_mapping_suffix(match))
+    return list(dict.fromkeys(out))
+
+
+def _has_mapping_suffix(path: str) -> bool:
+    return path.split(".")[-1] in VALID_FILE_SUFFIXES
+
+
+def get_output_path(input_path: str, output_dir: str) -> str:
+    return os.path.join(output_dir, f"{os.path.basename(input_path)}.tf")
+
+
+def preload():
+    """Load the resource catalog and compile all templates, so that builds in this process don't pay for it"""
+    get_resource_settings()
+    get_cloud_provider_settings()
+    get_registry().preload()
+
+
+def build_file(
+    input_path: str,
+    output_path: str,
+    deterministic: bool = False,
+    cache_dir: Optional[str] = None,
+    seed: Optional[str] = None,
+) -> BuildJobResult:
+    start = time.perf_counter()
+    try:
+        cache = create_build_cache(BuildCacheMode.DISK, cache_dir) if cache_dir else None
+        data = load_mapping(input_path)
+        parsed = operations.parse(data)
+        if not parsed.ok:
+            return BuildJobResult(
+                input_path, output_path, time.perf_counter() - start, f"Invalid mapping: {parsed.message}"
+            )
+        template_writer.write_regions(
+            output_path,
+            operations.build_regions(data, deterministic=deterministic, seed=seed, cache=cache, hl_maps=parsed.maps),
+        )
+    except Exception as e:
+        return BuildJobResult(input_path, output_path, time.perf_counter() - start, f"{type(e).__name__}: {e}")
+    return BuildJobResult(input_path, output_path, time.perf_counter() - start)
+
+
+def build_files(
+    jobs: List[Tuple[str, str]],
+    workers: int = 1,
+    deterministic: bool = False,
+    cache_dir: Optional[str] = None,
+    seed: Optional[str] = None,
+) -> List[BuildJobResult]:
+    """
+    Build every (input path, output path) pair. With more than one worker, builds run in a process pool
+    whose workers each preload the catalog and templates once.
+    """
+    if workers <= 1 or len(jobs) <= 1:
+        preload()
+        return [
+            build_file(input_path, output_path, deterministic, cache_dir, seed) for input_path, output_path in jobs
+        ]
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), initializer=preload) as executor:
+        futures = [
+            executor.submit(build_file, input_path, output_path, deterministic, cache_dir, seed)
+            for input_path, output_path in jobs
+        ]
+        return [future.result() for future in futures]
@@ -0,0 +1,95 @@
+"""
+Cold start benchmark for template loading.
+
+Every run spawns a fresh interpreter (as a new Lambda container would) which loads all templates, either
+compiling them from source or importing them from a precompiled bundle.
+
+Usage (from the tf_generator/ directory):
+    python -m benchmarks.cold_start --runs 20
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+import template_loader
+from config import BASE_DIR
+from template_loader import TemplateLoaderMode
+
+CHILD_SCRIPT = """
+import time
+start = time.perf_counter()
+import template_loader
+imported = time.perf_counter()
+registry = template_loader.get_registry()
+for name in registry.environment.loader.list_templates():
+    registry.get(name)
+print(imported - start, time.perf_counter() - imported)
+"""
+PHASES = ("import", "load", "process")
+
+
+def _run_child(mode: str, bundle_dir: str) -> Dict[str, float]:
+    env = dict(os.environ, TEMPLATES_LOADER_MODE=mode, TEMPLATES_BUNDLE_DIR=bundle_dir)
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD_SCRIPT],
+        cwd=BASE_DIR,
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    process = time.perf_counter() - start
+    import_time, load_time = (float(x) for x in output.split())
+    return {"import": import_time, "load": load_time, "process": process}
+
+
+def _summarise(samples: List[Dict[str, float]]) -> Dict[str, float]:
+    out = {}
+    for key in PHASES:
+        values = [sample[key] for sample in samples]
+        out[f"{key}_median_ms"] = statistics.median(values) * 1000
+        out[f"{key}_min_ms"] = min(values) * 1000
+    return out
+
+
+def run(runs: int) -> Dict[str, Dict[str, float]]:
+    with tempfile.TemporaryDirectory() as bundle_dir:
+        template_loader.compile_bundle(bundle_dir)
+        results = {}
+        for mode in (TemplateLoaderMode.SOURCE, TemplateLoaderMode.PRECOMPILED):
+            # Warm the OS file cache so that both modes start from the same conditions
+            _run_child(mode, bundle_dir)
+            results[mode] = _summarise([_run_child(mode, bundle_dir) for _ in range(runs)])
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    results = run(args.runs)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'mode':<12}" + "".join(f"{phase + ' median':>16}{phase + ' min':>14}" for phase in PHASES))
+    for mode, result in results.items():
+        print(
+            f"{mode:<12}"
+            + "".join(
+                f"{result[phase + '_median_ms']:>14.2f}ms{result[phase + '_min_ms']:>12.2f}ms" for phase in PHASES
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
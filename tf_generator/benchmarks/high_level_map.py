@@ -0,0 +1,77 @@
+"""
+Scaling benchmark for HighLevelMap.from_dict.
+
+Builds mappings of increasing size (with 5 bindings per resource) and reports parse time per resource,
+which should stay flat if binding resolution is linear.
+
+Usage (from the tf_generator/ directory):
+    python -m benchmarks.high_level_map --max-resources 10000
+"""
+import argparse
+import json
+import random
+import time
+from typing import Dict, List
+
+from models.high_level_items import HighLevelMap
+
+RESOURCE_KEYS = ["vm", "docker", "s3"]
+BINDINGS_PER_RESOURCE = 5
+
+
+def generate_mapping(resource_count: int, binding_count: int, seed: int = 0) -> Dict:
+    rng = random.Random(seed)
+    uids = [f"resource-{i}" for i in range(resource_count)]
+    resources = {
+        uid: {"resource": RESOURCE_KEYS[i % len(RESOURCE_KEYS)], "bindings": []} for i, uid in enumerate(uids)
+    }
+    for _ in range(binding_count):
+        source, target = rng.sample(uids, 2)
+        resources[source]["bindings"].append({"id": target, "direction": "to"})
+    return {"cloud": "aws", "resources": resources}
+
+
+def run(sizes: List[int], repeat: int) -> List[Dict]:
+    results = []
+    for size in sizes:
+        mapping = generate_mapping(size, size * BINDINGS_PER_RESOURCE)
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            HighLevelMap.from_dict(mapping)
+            timings.append(time.perf_counter() - start)
+        best = min(timings)
+        results.append(
+            {
+                "resources": size,
+                "bindings": size * BINDINGS_PER_RESOURCE,
+                "seconds": best,
+                "us_per_resource": best / size * 1_000_000,
+            }
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-resources", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    sizes = [args.max_resources // 8, args.max_resources // 4, args.max_resources // 2, args.max_resources]
+    results = run(sizes, args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'resources':>10} {'bindings':>10} {'total':>10} {'per resource':>14}")
+    for result in results:
+        print(
+            f"{result['resources']:>10} {result['bindings']:>10} {result['seconds'] * 1000:>8.1f}ms "
+            f"{result['us_per_resource']:>12.2f}us"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Load test of the HTTP server (cli.py serve).
+
+Sends requests over a number of keep-alive connections at once and reports latency percentiles, throughput and
+status codes. Unless --url is given, a server is started in this process on a free port for the duration of the test.
+
+Usage (from the tf_generator/ directory):
+    python -m benchmarks.load_test --connections 32 --requests 2000 --size 100
+    python -m benchmarks.load_test --url http://127.0.0.1:8080 --file tests/samples/basic_example.yaml
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from benchmarks.synthetic import generate_sized_mapping
+from mapping_loader import load_mapping
+
+
+async def _request(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, host: str, body: bytes) -> int:
+    writer.write(
+        f"POST / HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode()
+        + body
+    )
+    await writer.drain()
+    head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1")
+    status = int(head.split(" ", 2)[1])
+    length = next(
+        int(line.split(":", 1)[1]) for line in head.split("\r\n") if line.lower().startswith("content-length:")
+    )
+    await reader.readexactly(length)
+    return status
+
+
+async def _connection(host: str, port: int, body: bytes, remaining: List[int], out: List[Tuple[float, int]]):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            start = time.perf_counter()
+            status = await _request(reader, writer, host, body)
+            out.append((time.perf_counter() - start, status))
+    finally:
+        writer.close()
+
+
+async def run(host: str, port: int, body: bytes, connections: int, requests: int) -> Dict:
+    remaining = [requests]
+    timings: List[Tuple[float, int]] = []
+    start = time.perf_counter()
+    await asyncio.gather(*(_connection(host, port, body, remaining, timings) for _ in range(connections)))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(seconds for seconds, _ in timings)
+    ok = [seconds for seconds, status in timings if status == 200]
+    return {
+        "requests": len(timings),
+        "connections": connections,
+        "seconds": elapsed,
+        "throughput": len(timings) / elapsed,
+        "ok_throughput": len(ok) / elapsed,
+        "statuses": dict(Counter(status for _, status in timings)),
+        "p50_ms": _percentile(latencies, 50) * 1000,
+        "p90_ms": _percentile(latencies, 90) * 1000,
+        "p99_ms": _percentile(latencies, 99) * 1000,
+        "ok_mean_ms": statistics.mean(ok) * 1000 if ok else None,
+    }
+
+
+def _percentile(values: List[float], percentile: float) -> float:
+    if not values:
+        return 0
+    return values[min(len(values) - 1, int(len(values) * percentile / 100))]
+
+
+async def _run_with_server(args, body: bytes) -> Dict:
+    import server
+
+    generator_server = server.GeneratorServer(
+        port=0,
+        workers=args.workers,
+        max_concurrency=args.max_concurrency or args.workers,
+        max_pending=args.max_pending if args.max_pending is not None else 4 * args.workers,
+    )
+    await generator_server.start()
+    try:
+        results = await run(generator_server.host, generator_server.port, body, args.connections, args.requests)
+        results["server"] = generator_server.stats()
+        return results
+    finally:
+        await generator_server.close()
+
+
+def _get_body(action: str, file: Optional[str], size: int, deterministic: bool = False) -> bytes:
+    mapping = load_mapping(file) if file else generate_sized_mapping(size)
+    return json.dumps(
+        {"version": "1.0", "action": action, "mapping": mapping, "deterministic": deterministic}
+    ).encode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Server to test, e.g. http://127.0.0.1:8080")
+    parser.add_argument("--connections", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--action", choices=["build", "validate"], default="build")
+    parser.add_argument("--file", help="Mapping file sent with every request")
+    parser.add_argument("--size", type=int, default=20, help="Resources of the synthetic mapping sent otherwise")
+    parser.add_argument(
+        "--deterministic", action="store_true", help="Send deterministic builds, which the server can coalesce"
+    )
+    parser.add_argument("--workers", type=int, default=2, help="Worker processes of the server started for the test")
+    parser.add_argument("--max-concurrency", type=int, default=None)
+    parser.add_argument("--max-pending", type=int, default=None)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    body = _get_body(args.action, args.file, args.size, args.deterministic)
+    if args.url:
+        url = urlparse(args.url)
+        results = asyncio.run(run(url.hostname, url.port or 80, body, args.connections, args.requests))
+    else:
+        results = asyncio.run(_run_with_server(args, body))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(
+        f"{results['requests']} requests over {results['connections']} connections in {results['seconds']:.2f}s: "
+        f"{results['throughput']:.1f} req/s ({results['ok_throughput']:.1f} req/s successful)"
+    )
+    print(f"p50 {results['p50_ms']:.1f}ms, p90 {results['p90_ms']:.1f}ms, p99 {results['p99_ms']:.1f}ms")
+    print(f"statuses: {results['statuses']}")
+    if "coalescing" in results.get("server", {}):
+        coalescing = results["server"]["coalescing"]
+        print(f"coalesced {coalescing['coalesced']} requests into {coalescing['calls']} builds")
+
+
+if __name__ == "__main__":
+    main()
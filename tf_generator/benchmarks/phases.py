@@ -0,0 +1,180 @@
+"""
+Phase by phase benchmark of a build, on synthetic mappings of increasing size.
+
+Each size is timed through the phases of a build: loading the mapping file, validating it, parsing it into
+high-level maps, mapping those to low-level items and rendering the Terraform. Results can be saved as JSON and
+compared to a saved baseline, exiting with an error if any phase regressed by more than the tolerance.
+
+Usage (from the tf_generator/ directory):
+    python -m benchmarks.phases --sizes 10 100 1000 --output results.json
+    python -m benchmarks.phases --sizes 10 100 1000 --baseline results.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import schema_validator
+from benchmarks.synthetic import DEFAULT_MIX, generate_sized_mapping
+from benchmarks.timing import best_time
+from generator import TerraformGenerator, get_regions
+from mapping_loader import load_mapping
+from models.mapping_parser import parse_mapping
+from models.naming import NameGenerator
+from template_loader import get_registry
+
+DEFAULT_SIZES = [10, 100, 1_000, 10_000, 50_000]
+PHASES = ("load", "validate", "parse", "low_level", "render")
+# Phases faster than this are too noisy to be flagged as regressions
+MIN_REGRESSION_SECONDS = 0.001
+
+
+def run_size(size: int, binding_density: float, regions: int, file_format: str, repeat: int) -> Dict:
+    mapping = generate_sized_mapping(size, binding_density, regions)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, f"mapping.{file_format}")
+        _write_mapping(mapping, path)
+        timings = {"load": best_time(lambda: load_mapping(path), repeat)}
+        data = load_mapping(path)
+
+    timings["validate"] = best_time(lambda: schema_validator.validate(data), repeat)
+    timings["parse"] = best_time(lambda: parse_mapping(data).get_maps(), repeat)
+
+    # Generators keep the low-level items they mapped, so each repetition starts from fresh ones
+    low_level = []
+    render = []
+    for _ in range(repeat):
+        regions_to_build = get_regions(parse_mapping(data).get_maps())
+        generators = [TerraformGenerator(names=NameGenerator("benchmark")) for _ in regions_to_build]
+        start = time.perf_counter()
+        for generator, (_, hl_map, region) in zip(generators, regions_to_build):
+            generator.generate_low_level_aws_map(hl_map, region)
+        low_level.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        output_bytes = 0
+        for generator, (_, hl_map, region) in zip(generators, regions_to_build):
+            output_bytes += len("".join(generator.render_low_level_chunks(hl_map.cloud_provider, region)))
+        render.append(time.perf_counter() - start)
+    timings["low_level"] = min(low_level)
+    timings["render"] = min(render)
+
+    resources = mapping[0]["regions"]
+    return {
+        "resources": size,
+        "bindings": sum(len(r["bindings"]) for region in resources for r in region["resources"].values()),
+        "regions": regions,
+        "output_bytes": output_bytes,
+        "phases": timings,
+        "total_seconds": sum(timings.values()),
+    }
+
+
+def run(
+    sizes: List[int], binding_density: float = 1.0, regions: int = 1, file_format: str = "yaml", repeat: int = 3
+) -> Dict:
+    # Compile templates and the validator outside of the timings, as it happens once per process
+    get_registry().preload()
+    schema_validator.get_compiled_map_schema()
+    return {
+        "config": {
+            "binding_density": binding_density,
+            "regions": regions,
+            "format": file_format,
+            "repeat": repeat,
+            "mix": DEFAULT_MIX,
+        },
+        "results": [run_size(size, binding_density, regions, file_format, repeat) for size in sizes],
+    }
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float = 0.2) -> List[str]:
+    """Regressions of `results` compared to `baseline`, for every size and phase both have"""
+    baseline_by_size = {result["resources"]: result for result in baseline["results"]}
+    regressions = []
+    for result in results["results"]:
+        base = baseline_by_size.get(result["resources"])
+        if base is None:
+            continue
+        for phase, seconds in result["phases"].items():
+            base_seconds = base["phases"].get(phase)
+            if base_seconds is None or seconds < MIN_REGRESSION_SECONDS:
+                continue
+            if seconds > base_seconds * (1 + tolerance):
+                regressions.append(
+                    f"{phase} of {result['resources']} resources: {seconds * 1000:.1f}ms "
+                    f"vs {base_seconds * 1000:.1f}ms ({seconds / base_seconds - 1:+.0%})"
+                )
+    return regressions
+
+
+def _write_mapping(mapping: List[Dict], path: str):
+    import yaml
+
+    with open(path, "w") as f:
+        if path.endswith(".json"):
+            json.dump(mapping, f)
+        else:
+            yaml.safe_dump(mapping, f, sort_keys=False)
+
+
+def _print_results(results: Dict, baseline: Optional[Dict]):
+    baseline_by_size = {result["resources"]: result for result in baseline["results"]} if baseline else {}
+    print(f"{'resources':>10} {'bindings':>9} " + " ".join(f"{phase:>10}" for phase in PHASES) + f" {'total':>10}")
+    for result in results["results"]:
+        print(
+            f"{result['resources']:>10} {result['bindings']:>9} "
+            + " ".join(f"{result['phases'][phase] * 1000:>8.1f}ms" for phase in PHASES)
+            + f" {result['total_seconds'] * 1000:>8.1f}ms"
+        )
+        base = baseline_by_size.get(result["resources"])
+        if base:
+            print(
+                f"{'baseline':>20} "
+                + " ".join(f"{base['phases'].get(phase, 0) * 1000:>8.1f}ms" for phase in PHASES)
+                + f" {base['total_seconds'] * 1000:>8.1f}ms"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Resource counts to benchmark")
+    parser.add_argument("--binding-density", type=float, default=1.0, help="Bindings per compute resource")
+    parser.add_argument("--regions", type=int, default=1)
+    parser.add_argument("--format", choices=["yaml", "json"], default="yaml", help="Format of the loaded file")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Save the results as JSON to this file")
+    parser.add_argument("--baseline", help="Compare the results to those saved in this file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Slowdown over the baseline flagged, 0.2 = 20%%")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.binding_density, args.regions, args.format, args.repeat)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        _print_results(results, baseline)
+
+    if baseline:
+        if baseline.get("config") != results["config"]:
+            print(f"Baseline was run with a different configuration: {baseline.get('config')}")
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark of multi-region builds rendered serially, on a thread pool and on a process pool.
+
+Rendering is CPU-bound Python, so threads don't run it in parallel; this reports the speedup each executor actually
+gets over rendering the regions one after the other, against the time of the largest region alone.
+
+Usage (from the tf_generator/ directory):
+    python -m benchmarks.regions --regions 15 --size 1500 --workers 8
+"""
+import argparse
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict
+
+from benchmarks.synthetic import generate_sized_mapping
+from benchmarks.timing import best_time
+from generator import get_engine, get_regions
+from models.mapping_parser import parse_mapping
+
+
+def run(regions: int, size: int, workers: int, repeat: int = 3) -> Dict:
+    engine = get_engine()
+    mapping = generate_sized_mapping(size, regions=regions)
+    hl_maps = parse_mapping(mapping).get_maps()
+    regions_to_build = get_regions(hl_maps)
+    # Synthetic resources are spread evenly, so the first region is as large as any
+    _, first_map, first_region = regions_to_build[0]
+
+    def build(executor):
+        return lambda: engine.build(mapping, executor, deterministic=True, hl_maps=hl_maps)
+
+    timings = {
+        "largest_region": best_time(lambda: engine.build_region(first_map, first_region), repeat),
+        "serial": best_time(lambda: [engine.build_region(m, r) for _, m, r in regions_to_build], repeat),
+    }
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        timings["threads"] = best_time(build(executor), repeat)
+    with ProcessPoolExecutor(max_workers=workers, initializer=get_engine) as executor:
+        # Starts and warms up every worker before timing
+        list(executor.map(time.sleep, [0.1] * workers))
+        timings["processes"] = best_time(build(executor), repeat)
+
+    return {
+        "regions": regions,
+        "resources": size,
+        "workers": workers,
+        "seconds": timings,
+        "speedup": {name: timings["serial"] / timings[name] for name in ("threads", "processes")},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--regions", type=int, default=15)
+    parser.add_argument("--size", type=int, default=1500, help="Resources of the whole mapping")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    results = run(args.regions, args.size, args.workers, args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{results['regions']} regions, {results['resources']} resources, {results['workers']} workers")
+    for name, seconds in results["seconds"].items():
+        speedup = results["speedup"].get(name)
+        print(f"{name:>15} {seconds * 1000:>9.1f}ms" + (f"  x{speedup:.2f} vs serial" if speedup else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark of the response formats of the build action, on synthetic mappings of increasing size.
+
+For each size and format, reports the size of the payload sent (the JSON body, or the raw and base64 encoded
+bytes of compressed formats) and the time spent serialising the built configuration into it.
+
+Usage (from the tf_generator/ directory):
+    python -m benchmarks.response_formats --sizes 10 100 1000
+"""
+import argparse
+import json
+import time
+from typing import Dict, List
+
+from benchmarks.synthetic import generate_sized_mapping
+from generator import get_engine
+from models.mapping_parser import parse_mapping
+from response_format import EncodedBody, ResponseFormat, to_archive, to_gzip, to_lines, to_string
+
+DEFAULT_SIZES = [10, 100, 1_000, 10_000]
+
+
+def _serialise(region_templates: Dict, region_files: Dict, response_format: str):
+    if response_format == ResponseFormat.STRING:
+        return to_string(region_templates)
+    if response_format == ResponseFormat.GZIP:
+        return to_gzip(region_templates)
+    if ResponseFormat.is_archive(response_format):
+        return to_archive(region_files, response_format)
+    return to_lines(region_templates)
+
+
+def _payload(result) -> bytes:
+    # What the Lambda handler sends
+    return result.to_base64().encode() if isinstance(result, EncodedBody) else json.dumps(result).encode()
+
+
+def run_size(size: int, regions: int, repeat: int) -> Dict:
+    mapping = generate_sized_mapping(size, regions=regions)
+    hl_maps = parse_mapping(mapping).get_maps()
+    region_templates = get_engine().build(mapping, deterministic=True, hl_maps=hl_maps)
+    region_files = get_engine().build_files(mapping, deterministic=True, hl_maps=hl_maps)
+
+    formats = {}
+    for response_format in ResponseFormat.values():
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = _serialise(region_templates, region_files, response_format)
+            payload = _payload(result)
+            timings.append(time.perf_counter() - start)
+        formats[response_format] = {
+            "payload_bytes": len(payload),
+            "raw_bytes": len(result.data) if isinstance(result, EncodedBody) else len(payload),
+            "seconds": min(timings),
+        }
+    return {"resources": size, "regions": regions, "formats": formats}
+
+
+def run(sizes: List[int], regions: int = 1, repeat: int = 3) -> Dict:
+    return {"config": {"regions": regions, "repeat": repeat}, "results": [run_size(s, regions, repeat) for s in sizes]}
+
+
+def _print_results(results: Dict):
+    print(f"{'resources':>10} {'format':>8} {'raw':>12} {'payload':>12} {'serialise':>10}")
+    for result in results["results"]:
+        for response_format, stats in result["formats"].items():
+            print(
+                f"{result['resources']:>10} {response_format:>8} {stats['raw_bytes']:>12} "
+                f"{stats['payload_bytes']:>12} {stats['seconds'] * 1000:>8.2f}ms"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Resource counts to benchmark")
+    parser.add_argument("--regions", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.regions, args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        _print_results(results)
+
+
+if __name__ == "__main__":
+    main()
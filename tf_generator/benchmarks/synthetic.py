@@ -0,0 +1,102 @@
+"""
+Synthetic mappings for benchmarks, valid enough to go through every phase of a build.
+
+Resources are spread round robin over the regions, and bindings only link resources of the same region since
+every region is rendered into its own configuration.
+"""
+import random
+from typing import Dict, List
+
+from config import get_cloud_provider_settings
+from models.data_model import ServiceProvider
+
+VM_PARAMS = {"aws_instance_type": "t2.micro", "image_regex": "ubuntu-*-22.04-amd64-server-*"}
+DOCKER_PARAMS = {
+    "aws_instance_type": "t2.micro",
+    "image_regex": "amzn2-ami-ecs-hvm-*-x86_64-ebs",
+    "image_url": "nginx:latest",
+    "container_name": "web",
+    "healthcheck_path": "/",
+    "autoscale_min": "1",
+    "autoscale_max": "3",
+    "autoscale_target": "70",
+    "volume_path": "/data",
+    "volume_name": "data",
+}
+# Share of each resource type in mappings generated by size
+DEFAULT_MIX = {"vm": 0.4, "docker": 0.2, "s3": 0.4}
+
+
+def generate_mapping(
+    vm: int = 0,
+    docker: int = 0,
+    s3: int = 0,
+    binding_density: float = 1.0,
+    regions: int = 1,
+    seed: int = 0,
+) -> List[Dict]:
+    """
+    AWS mapping with the given number of each resource. Compute resources get `binding_density` bindings each on
+    average, to other resources of their region (storage is only ever bound to, as it cannot bind TO anything).
+    """
+    rng = random.Random(seed)
+    region_names = _get_region_names(regions)
+    region_resources: List[Dict[str, Dict]] = [{} for _ in region_names]
+
+    keys = ["vm"] * vm + ["docker"] * docker + ["s3"] * s3
+    for i, key in enumerate(keys):
+        resource: Dict = {"resource": key, "bindings": []}
+        if key == "vm":
+            resource["params"] = dict(VM_PARAMS)
+        elif key == "docker":
+            resource["params"] = dict(DOCKER_PARAMS)
+        region_resources[i % len(region_names)][f"{key}-{i}"] = resource
+
+    for resources in region_resources:
+        uids = list(resources)
+        sources = [uid for uid in uids if resources[uid]["resource"] != "s3"]
+        if len(uids) < 2 or not sources:
+            continue
+        for _ in range(round(len(sources) * binding_density)):
+            source = rng.choice(sources)
+            target = rng.choice(uids)
+            if target != source:
+                resources[source]["bindings"].append({"id": target, "direction": "to"})
+
+    return [
+        {
+            "cloud": ServiceProvider.AWS.value,
+            "regions": [
+                {"region": region, "resources": resources} for region, resources in zip(region_names, region_resources)
+            ],
+        }
+    ]
+
+
+def generate_sized_mapping(
+    size: int, binding_density: float = 1.0, regions: int = 1, mix: Dict[str, float] = None, seed: int = 0
+) -> List[Dict]:
+    """Mapping of `size` resources, split between resource types according to `mix`"""
+    mix = mix or DEFAULT_MIX
+    counts = {key: int(size * share) for key, share in mix.items()}
+    # Rounding leftovers go to the first type, so that the mapping has exactly `size` resources
+    first = next(iter(counts))
+    counts[first] += size - sum(counts.values())
+    return generate_mapping(
+        vm=counts.get("vm", 0),
+        docker=counts.get("docker", 0),
+        s3=counts.get("s3", 0),
+        binding_density=binding_density,
+        regions=regions,
+        seed=seed,
+    )
+
+
+def _get_region_names(count: int) -> List[str]:
+    settings = get_cloud_provider_settings().get(ServiceProvider.AWS)
+    regions = [settings.default_region] + sorted(
+        region for region in settings.regions if region != settings.default_region
+    )
+    if not 1 <= count <= len(regions):
+        raise ValueError(f"Region count should be between 1 and {len(regions)}")
+    return regions[:count]
@@ -0,0 +1,15 @@
+"""
+Timing helpers shared by the benchmarks.
+"""
+import time
+from typing import Callable
+
+
+def best_time(run: Callable, repeat: int) -> float:
+    """Best wall time of `repeat` calls of `run`, the least disturbed by other processes"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
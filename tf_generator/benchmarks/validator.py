@@ -0,0 +1,61 @@
+"""
+Benchmark of the compiled validator against the `schema` library walk it replaces.
+
+Validates mappings of increasing size (with 5 bindings per resource) with both and reports the best time of each
+and the speedup.
+
+Usage (from the tf_generator/ directory):
+    python -m benchmarks.validator --max-resources 10000
+"""
+import argparse
+import json
+from typing import Dict, List
+
+import schema_validator
+from benchmarks.high_level_map import BINDINGS_PER_RESOURCE, generate_mapping
+from benchmarks.timing import best_time
+
+
+def run(sizes: List[int], repeat: int) -> List[Dict]:
+    # Compile outside of the timings, as it happens once per process
+    schema_validator.get_compiled_map_schema()
+    results = []
+    for size in sizes:
+        mapping = [generate_mapping(size, size * BINDINGS_PER_RESOURCE)]
+        assert schema_validator.validate(mapping) == schema_validator.validate_with_schema_library(mapping)
+        schema_seconds = best_time(lambda: schema_validator.validate_with_schema_library(mapping), repeat)
+        compiled_seconds = best_time(lambda: schema_validator.validate(mapping), repeat)
+        results.append(
+            {
+                "resources": size,
+                "schema_seconds": schema_seconds,
+                "compiled_seconds": compiled_seconds,
+                "speedup": schema_seconds / compiled_seconds,
+            }
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-resources", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    sizes = [args.max_resources // 100, args.max_resources // 10, args.max_resources]
+    results = run(sizes, args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'resources':>10} {'schema':>12} {'compiled':>12} {'speedup':>8}")
+    for result in results:
+        print(
+            f"{result['resources']:>10} {result['schema_seconds'] * 1000:>10.1f}ms "
+            f"{result['compiled_seconds'] * 1000:>10.1f}ms {result['speedup']:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""
+Content-addressed cache of built Terraform configurations.
+
+Builds are keyed by a canonical hash of the mapping, the build options and the version of the resource catalog and
+templates, so any change to one of them is a miss rather than a stale hit. Stores are pluggable: an in-memory LRU
+for warm Lambda containers, or a size-bounded directory for the CLI.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from config import (
+    BASE_DIR,
+    TEMPLATES_DIR,
+    BUILD_CACHE,
+    BUILD_CACHE_DIR,
+    BUILD_CACHE_MAX_ENTRIES,
+    BUILD_CACHE_MAX_BYTES,
+    BUILD_CACHE_TTL,
+)
+
+# Bump when the generator output changes for reasons the catalog and template versions don't capture
+BUILD_CACHE_VERSION = "1"
+CATALOG_DIR = os.path.join(BASE_DIR, "data")
+
+RegionTemplates = Dict[str, str]
+
+
+class BuildCacheMode:
+    MEMORY = "memory"
+    DISK = "disk"
+    NONE = "none"
+
+
+@lru_cache(maxsize=None)
+def get_catalog_version() -> str:
+    """Hash of the resource catalog and template sources, computed once per process"""
+    digest = hashlib.sha256(BUILD_CACHE_VERSION.encode("utf-8"))
+    for directory in (CATALOG_DIR, TEMPLATES_DIR):
+        for root, dirs, files in os.walk(directory):
+            dirs.sort()
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                digest.update(os.path.relpath(path, BASE_DIR).encode("utf-8"))
+                with open(path, "rb") as f:
+                    digest.update(f.read())
+    return digest.hexdigest()
+
+
+def get_build_key(mapping: Any, **options) -> str:
+    canonical = json.dumps(
+        {"mapping": mapping, "options": options, "catalog": get_catalog_version()},
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class CacheStore(ABC):
+    """Storage of built configurations by key, counting its own evictions and expirations"""
+
+    def __init__(self, ttl: Optional[float] = BUILD_CACHE_TTL):
+        self.ttl = ttl
+        self.evictions = 0
+        self.expirations = 0
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[RegionTemplates]:
+        pass
+
+    @abstractmethod
+    def set(self, key: str, value: RegionTemplates):
+        pass
+
+    @abstractmethod
+    def clear(self):
+        pass
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+    def is_expired(self, stored_at: float) -> bool:
+        return bool(self.ttl) and time.time() - stored_at > self.ttl
+
+
+class MemoryCacheStore(CacheStore):
+    """LRU of at most `max_entries` builds, kept in the memory of the process"""
+
+    def __init__(self, max_entries: int = BUILD_CACHE_MAX_ENTRIES, ttl: Optional[float] = BUILD_CACHE_TTL):
+        super().__init__(ttl)
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, RegionTemplates]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[RegionTemplates]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if self.is_expired(stored_at):
+                del self._entries[key]
+                self.expirations += 1
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: RegionTemplates):
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DiskCacheStore(CacheStore):
+    """
+    Builds stored as one JSON file per key in `directory`, shared by every process using it. When the files grow
+    over `max_bytes`, the least recently used ones are deleted.
+    """
+
+    SUFFIX = ".json"
+
+    def __init__(
+        self,
+        directory: str = BUILD_CACHE_DIR,
+        max_bytes: int = BUILD_CACHE_MAX_BYTES,
+        ttl: Optional[float] = BUILD_CACHE_TTL,
+    ):
+        super().__init__(ttl)
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def _get_path(self, key: str) -> str:
+        return os.path.join(self.directory, key + self.SUFFIX)
+
+    def get(self, key: str) -> Optional[RegionTemplates]:
+        path = self._get_path(key)
+        try:
+            with open(path, "r") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if self.is_expired(entry["stored_at"]):
+            self._remove(path)
+            with self._lock:
+                self.expirations += 1
+            return None
+        # The modification time is the last use, for LRU eviction
+        os.utime(path)
+        return entry["value"]
+
+    def set(self, key: str, value: RegionTemplates):
+        path = self._get_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"stored_at": time.time(), "value": value}, f)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def _evict(self):
+        files = []
+        for name in os.listdir(self.directory):
+            if name.endswith(self.SUFFIX):
+                try:
+                    stat = os.stat(os.path.join(self.directory, name))
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in files)
+        for _, size, name in sorted(files):
+            if total <= self.max_bytes:
+                break
+            self._remove(os.path.join(self.directory, name))
+            total -= size
+            with self._lock:
+                self.evictions += 1
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith(self.SUFFIX):
+                self._remove(os.path.join(self.directory, name))
+
+    def __len__(self) -> int:
+        return sum(1 for name in os.listdir(self.directory) if name.endswith(self.SUFFIX))
+
+
+class BuildCache:
+    def __init__(self, store: CacheStore):
+        self.store = store
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get_or_build(self, mapping: Any, build: Callable[[], RegionTemplates], **options) -> RegionTemplates:
+        """Cached configurations of the mapping built with the given options, calling `build` on a miss"""
+        key = get_build_key(mapping, **options)
+        value = self.store.get(key)
+        with self._lock:
+            if value is not None:
+                self.hits += 1
+                return value
+            self.misses += 1
+
+        value = build()
+        self.store.set(key, value)
+        return value
+
+    def clear(self):
+        self.store.clear()
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "store": type(self.store).__name__,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.store.evictions,
+                "expirations": self.store.expirations,
+                "ttl": self.store.ttl,
+                "size": len(self.store),
+            }
+
+
+def create_build_cache(mode: str = BUILD_CACHE, directory: str = BUILD_CACHE_DIR) -> Optional[BuildCache]:
+    if mode == BuildCacheMode.MEMORY:
+        return BuildCache(MemoryCacheStore())
+    if mode == BuildCacheMode.DISK:
+        return BuildCache(DiskCacheStore(directory))
+    if mode == BuildCacheMode.NONE:
+        return None
+    raise ValueError(f"Unknown build cache mode {mode}")
+
+
+_build_cache: Optional[BuildCache] = None
+_build_cache_lock = threading.Lock()
+
+
+def get_build_cache() -> Optional[BuildCache]:
+    """Build cache of this process, configured by BUILD_CACHE, or None if caching is disabled"""
+    global _build_cache
+    if _build_cache is None:
+        with _build_cache_lock:
+            if _build_cache is None:
+                _build_cache = create_build_cache()
+    return _build_cache
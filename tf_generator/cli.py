@@ -1,24 +1,46 @@
 import argparse
+import asyncio
 import json
 import os
-from typing import Optional, List, Tuple
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from typing import TYPE_CHECKING, Optional, List, Tuple, Dict, Iterable
 
 import cloup
 from cloup.constraints import mutually_exclusive
 from dotenv import load_dotenv
 
-import schema_validator
+import build_cache
+import operations
 import template_writer
-from config import TEMPLATES_MAP_PATH, RESOURCE_SETTINGS
-from generator import TerraformGenerator
+from build_cache import BuildCacheMode
+from config import (
+    TEMPLATES_MAP_PATH,
+    TEMPLATES_BUNDLE_DIR,
+    BUILD_CACHE_DIR,
+    SERVER_HOST,
+    SERVER_PORT,
+    SERVER_WORKERS,
+    SERVER_MAX_CONCURRENCY,
+    SERVER_MAX_PENDING,
+)
 from mapping_loader import load_mapping
-from models.data_model import ServiceProvider
-from models.tf_type_mapping import ResourceDetails
+
+# The generator and model stack are imported by the commands using them, so that `--help` and light commands don't
+# pay for loading them
+if TYPE_CHECKING:
+    from models.high_level_items import HighLevelMap
+    from models.mapping_parser import ParseResult
+    from models.tf_type_mapping import ResourceDetails
 
 load_dotenv()
 
 
 def get_parser():
+    from models.data_model import ServiceProvider
+
     parser = argparse.ArgumentParser()
     parser.add_argument("provider", choices=[a for a in ServiceProvider])
     parser.add_argument("--compute", type=str)
@@ -31,6 +53,8 @@ def get_parser():
 
 
 def parse_old():
+    from generator import TerraformGenerator
+
     parser = get_parser()
     args = parser.parse_args()
 
@@ -58,10 +82,13 @@ def cli():
 @cloup.option_group(
     "Data Sources",
     cloup.option(
+        "files",
         "--file",
         "-f",
+        multiple=True,
         help="""Path to mapping file, in either JSON or YAML formats
-    Valid filetypes: .json .yml .yaml""",
+    Valid filetypes: .json .yml .yaml
+    Can be repeated, and can be a directory or a glob pattern to build several mappings""",
     ),
     cloup.option("--data", "-d", help="Inline JSON mapping"),
     constraint=mutually_exclusive,
@@ -71,29 +98,212 @@ def cli():
     "--out",
     "-o",
     default=None,
-    help="Path to output file (Recommended to use .tf suffix). If none supplied, will print output to stdout",
+    help="""Path to output file (Recommended to use .tf suffix). If none supplied, will print output to stdout.
+    When building several mappings, path to the output directory instead""",
+)
+@cloup.option(
+    "out_dir",
+    "--out-dir",
+    default=None,
+    help="""Path to an output directory, where the configuration is split into providers.tf, variables.tf,
+    outputs.tf and a file per generated item, in a directory per region if there are several. Files whose content
+    is unchanged aren't rewritten, and files generated by a previous build but not this one are removed.
+    Implies --deterministic, pass --seed to keep names, and so files, unchanged while the mapping is edited""",
+)
+@cloup.option(
+    "--jobs",
+    "-j",
+    type=int,
+    default=1,
+    help="""Number of processes used to build several mappings, or the regions of a mapping, in parallel.
+    With 1, the regions of a mapping are rendered in a pool of REGION_WORKERS processes""",
+)
+@cloup.option(
+    "--deterministic",
+    is_flag=True,
+    default=False,
+    help="Derive generated ids and names from the mapping, so that the same mapping always builds the same output",
+)
+@cloup.option(
+    "--seed",
+    default=None,
+    help="Derive generated ids and names from this seed instead, to keep them stable while the mapping is edited",
+)
+@cloup.option(
+    "cache_dir",
+    "--cache-dir",
+    default=None,
+    help=f"""Reuse configurations built from the same mappings, cached in this directory (e.g. {BUILD_CACHE_DIR}).
+    Only used with --deterministic or --seed, as other builds generate new names every time""",
+)
+@cloup.option(
+    "--profile",
+    is_flag=True,
+    default=False,
+    help="Print the time spent in each phase of the build, which then runs in a single process without cache",
+)
+@cloup.option(
+    "profile_output",
+    "--profile-output",
+    default=None,
+    help="Profile the build with cProfile and save the stats to this file, for pstats or snakeviz (implies --profile)",
 )
-def build(file, data, output_path):
+def build(files, data, output_path, out_dir, jobs, deterministic, seed, cache_dir, profile, profile_output):
     """
     Generate Terraform configuration from Cloudblocks mapping file
     """
-    if file:
-        data = load_mapping(file)
-    else:
-        data = json.loads(data)
+    import batch_builder
+    from profiler import BuildProfiler
+
+    if out_dir and output_path:
+        exit("Use either --out or --out-dir")
+    if files and batch_builder.is_batch_input(files):
+        if out_dir:
+            exit("--out-dir builds a single mapping, use --out to build several")
+        if profile or profile_output:
+            exit("--profile builds a single mapping")
+        _build_batch(files, output_path, jobs, deterministic, cache_dir, seed)
+        return
+
+    profiler = BuildProfiler(cprofile=bool(profile_output)) if profile or profile_output else None
+    with profiler.phase("load") if profiler else nullcontext():
+        if files:
+            data = load_mapping(files[0])
+        else:
+            data = json.loads(data)
 
-    if not _validate(data, verbose=True)[0]:
+    with profiler.phase("parse") if profiler else nullcontext():
+        parsed = _parse(data, verbose=True)
+    if not parsed.ok:
         exit("Input was invalid, please run validate to make sure it's valid")
 
-    templates = _build(data)
+    if out_dir:
+        # Random names would change every file on every build
+        deterministic = True
+        if seed is None:
+            print("Names are derived from the mapping, pass --seed to keep them stable while it is edited.")
+        print("Building Terraform from configuration...")
+        with profiler.phase("build") if profiler else nullcontext():
+            region_files = operations.build_files(data, deterministic, seed, parsed.maps, split_items=True)
+        with profiler.phase("write") if profiler else nullcontext():
+            _write_out_dir(region_files, out_dir)
+    else:
+        if profiler:
+            print("Building Terraform from configuration...")
+            region_templates = profiler.build(data, parsed.maps, deterministic, seed)
+        else:
+            region_templates = _build(data, jobs, deterministic, seed, cache_dir, parsed.maps)
+
+        with profiler.phase("write") if profiler else nullcontext():
+            _write_output(region_templates, output_path)
+
+    if profiler:
+        build_profile = profiler.finish(profile_output)
+        print(build_profile.describe())
+        if profile_output:
+            print(f"Saved cProfile stats to {os.path.abspath(profile_output)}.")
+
+
+def _write_out_dir(region_files: Dict[str, Dict[str, str]], out_dir: str):
+    print(f"Writing Terraform to {os.path.abspath(out_dir)}...")
+    result = template_writer.write_region_files(out_dir, region_files)
+    print(
+        f"Finished writing: {len(result.written)} files written, {len(result.unchanged)} unchanged, "
+        f"{len(result.removed)} removed."
+    )
+
+
+def _write_output(region_templates: Dict[str, Iterable[str]], output_path: Optional[str]):
     if output_path:
-        print(f"Writing Terraform to {os.path.abspath(output_path)}...")
-        template_writer.write(output_path, templates)
+        if len(region_templates) > 1:
+            print(
+                f"Writing Terraform for {len(region_templates)} regions to {os.path.abspath(template_writer.get_regions_dir(output_path))}..."
+            )
+        else:
+            print(f"Writing Terraform to {os.path.abspath(output_path)}...")
+        template_writer.write_regions(output_path, region_templates)
         print("Finished writing.")
+    elif len(region_templates) == 1:
+        sys.stdout.writelines(next(iter(region_templates.values())))
+        print()
     else:
-        print(templates)
+        for key, template in region_templates.items():
+            print(f"###### Region: {key} ######")
+            sys.stdout.writelines(template)
+            print()
+
+
+@cli.command()
+@cloup.option(
+    "--file",
+    "-f",
+    required=True,
+    help="""Path to mapping file, in either JSON or YAML formats
+    Valid filetypes: .json .yml .yaml""",
+)
+@cloup.option(
+    "output_path",
+    "--out",
+    "-o",
+    required=True,
+    help="Path to output file (Recommended to use .tf suffix)",
+)
+@cloup.option(
+    "--templates",
+    "watch_templates",
+    is_flag=True,
+    default=False,
+    help="Also rebuild when the templates change",
+)
+@cloup.option("--interval", type=float, default=0.5, help="Seconds between checks for changes")
+@cloup.option("--debounce", type=float, default=0.2, help="Seconds files must stay unchanged before rebuilding")
+def watch(file, output_path, watch_templates, interval, debounce):
+    """
+    Rebuild Terraform configuration whenever the mapping file changes
+    """
+    import watcher
 
-    return templates
+    mapping_watcher = watcher.MappingWatcher(file, output_path, watch_templates, interval, debounce)
+    print(f"Watching {', '.join(os.path.abspath(path) for path in mapping_watcher.watched_paths)}, Ctrl+C to stop...")
+    try:
+        mapping_watcher.run()
+    except KeyboardInterrupt:
+        print("Stopped watching.")
+
+
+@cli.command()
+@cloup.option("--host", default=SERVER_HOST, help="Address to listen on")
+@cloup.option("--port", type=int, default=SERVER_PORT, help="Port to listen on, 0 for any free port")
+@cloup.option("--workers", type=int, default=SERVER_WORKERS, help="Number of worker processes handling requests")
+@cloup.option(
+    "--max-concurrency",
+    type=int,
+    default=SERVER_MAX_CONCURRENCY,
+    help="Number of requests handled at once",
+)
+@cloup.option(
+    "--max-pending",
+    type=int,
+    default=SERVER_MAX_PENDING,
+    help="Number of requests waiting to be handled before new ones are rejected with 429",
+)
+def serve(host, port, workers, max_concurrency, max_pending):
+    """
+    Serve the API over HTTP, as a long-lived alternative to the Lambda handler
+    """
+    import server
+
+    generator_server = server.GeneratorServer(host, port, workers, max_concurrency, max_pending)
+
+    async def _serve():
+        await generator_server.start()
+        print(f"Serving on http://{generator_server.host}:{generator_server.port} with {workers} worker(s)...")
+        await generator_server.serve_forever()
+
+    try:
+        asyncio.run(_serve())
+    except KeyboardInterrupt:
+        print("Stopped serving.")
 
 
 @cli.command()
@@ -126,6 +336,57 @@ def validate(file, data):
     return _validate(data, verbose=True)[0]
 
 
+@cli.command()
+@cloup.option_group(
+    "Data Sources",
+    cloup.option(
+        "--file",
+        "-f",
+        help="""
+        Path to mapping file, in either JSON or YAML formats
+        Valid filetypes: .json .yml .yaml""",
+    ),
+    cloup.option("--data", "-d", type=str, help="Inline JSON mapping"),
+    constraint=mutually_exclusive,
+)
+@cloup.option(
+    "output_format",
+    "--format",
+    type=cloup.Choice(["dot", "json"]),
+    default="dot",
+    help="Export format of the graph",
+)
+@cloup.option(
+    "output_path",
+    "--out",
+    "-o",
+    default=None,
+    help="Path to output file. If none supplied, will print output to stdout",
+)
+def graph(file, data, output_format, output_path):
+    """
+    Export the dependency graph of the generated Terraform resources
+    """
+    if file:
+        data = load_mapping(file)
+    else:
+        data = json.loads(data)
+
+    if not _validate(data)[0]:
+        exit("Input was invalid, please run validate to make sure it's valid")
+
+    dependency_graph = operations.graph(data)
+    if output_format == "json":
+        out = dependency_graph.to_json(pretty=True)
+    else:
+        out = dependency_graph.to_dot()
+
+    if output_path:
+        template_writer.write(output_path, out + "\n")
+    else:
+        print(out)
+
+
 @cli.command()
 @cloup.argument(
     "keyword",
@@ -172,31 +433,113 @@ def search(keyword: Optional[str], cloud: Optional[str], tags: Optional[List[str
             print(resource.to_yaml())
 
 
-def _build(data):
+@cli.command()
+@cloup.option(
+    "output_dir",
+    "--out",
+    "-o",
+    default=TEMPLATES_BUNDLE_DIR,
+    help="Directory to write the precompiled templates to",
+)
+def compile_templates(output_dir):
+    """
+    Precompile templates into a bundle that is loaded instead of the template sources
+    """
+    import template_loader
+
+    print(f"Compiling templates into {os.path.abspath(output_dir)}...")
+    count = template_loader.compile_bundle(output_dir)
+    print(f"Compiled {count} templates.")
+
+
+def _build(
+    data,
+    jobs: int = 1,
+    deterministic: bool = False,
+    seed: Optional[str] = None,
+    cache_dir: Optional[str] = None,
+    hl_maps: Optional[List["HighLevelMap"]] = None,
+) -> Dict[str, Iterable[str]]:
+    import batch_builder
+
     print("Building Terraform from configuration...")
-    generator = TerraformGenerator()
-    templates = generator.generate_template_from_json(data)
-    print("Build done.")
-    return templates
+    cache = build_cache.create_build_cache(BuildCacheMode.DISK, cache_dir) if cache_dir else None
+    if jobs <= 1:
+        region_templates = operations.build_regions(
+            data, deterministic=deterministic, seed=seed, cache=cache, hl_maps=hl_maps
+        )
+    else:
+        # Regions are rendered in separate processes rather than threads, to actually run in parallel
+        with ProcessPoolExecutor(max_workers=jobs, initializer=batch_builder.preload) as executor:
+            region_templates = operations.build_regions(data, executor, deterministic, seed, cache, hl_maps)
+    if cache and (deterministic or seed is not None):
+        print("Reused cached build." if cache.hits else "Cached build.")
+    return region_templates
+
+
+def _build_batch(
+    files: Tuple[str, ...],
+    output_dir: Optional[str],
+    jobs: int,
+    deterministic: bool = False,
+    cache_dir: Optional[str] = None,
+    seed: Optional[str] = None,
+):
+    import batch_builder
+
+    if not output_dir:
+        exit("An output directory (--out) is required when building several mappings")
+
+    input_paths = batch_builder.expand_inputs(files)
+    if not input_paths:
+        exit("No mapping files found")
+
+    output_paths = [batch_builder.get_output_path(path, output_dir) for path in input_paths]
+    if len(set(output_paths)) != len(output_paths):
+        exit("Several mapping files have the same file name, their outputs would overwrite each other")
+
+    os.makedirs(output_dir, exist_ok=True)
+    print(f"Building {len(input_paths)} mappings into {os.path.abspath(output_dir)} with {jobs} job(s)...")
+    start = time.perf_counter()
+    results = batch_builder.build_files(
+        list(zip(input_paths, output_paths)), workers=jobs, deterministic=deterministic, cache_dir=cache_dir, seed=seed
+    )
+    elapsed = time.perf_counter() - start
 
+    for result in results:
+        status = "OK" if result.ok else "FAILED"
+        print(f"{status:<7} {result.seconds * 1000:>9.1f}ms  {result.input_path} -> {result.output_path}")
+        if not result.ok:
+            print(f"        {result.error}")
 
-def _validate(data, verbose=False) -> Tuple[bool, Optional[str]]:
+    failures = [result for result in results if not result.ok]
+    print(f"Built {len(results) - len(failures)}/{len(results)} mappings in {elapsed:.2f}s.")
+    if failures:
+        exit(f"{len(failures)} mapping(s) failed to build")
+
+
+def _parse(data, verbose=False) -> "ParseResult":
     print("Checking whether configuration is valid...")
-    is_valid, err_message = schema_validator.validate(data)
+    result = operations.parse(data)
 
-    if is_valid:
+    if result.ok:
         print("Configuration is valid.")
     elif verbose:
-        print(err_message)
+        print(result.message)
     else:
         print("Configuration isn't valid.")
 
-    return is_valid, err_message
+    return result
+
+
+def _validate(data, verbose=False) -> Tuple[bool, Optional[str]]:
+    result = _parse(data, verbose)
+    return result.ok, result.message
 
 
-def _search(keyword: Optional[str], cloud: Optional[str], tags: Optional[List[str]]) -> List[ResourceDetails]:
+def _search(keyword: Optional[str], cloud: Optional[str], tags: Optional[List[str]]) -> List["ResourceDetails"]:
     try:
-        return RESOURCE_SETTINGS.search(keyword, cloud, tags)
+        return operations.search(keyword, cloud, tags)
     except KeyError as e:
         raise e
 
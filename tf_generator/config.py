@@ -1,35 +1,112 @@
 import json
 import os
-
-import boto3
-
-from models.provider_config import CloudConfig
-from models.tf_type_mapping import ResourceMap
+from functools import lru_cache
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
+TEMPLATES_CACHE_SIZE = int(os.getenv("TEMPLATES_CACHE_SIZE", 64))
+TEMPLATES_BYTECODE_CACHE_DIR = os.getenv("TEMPLATES_BYTECODE_CACHE_DIR")
+TEMPLATES_BUNDLE_DIR = os.getenv("TEMPLATES_BUNDLE_DIR", os.path.join(BASE_DIR, "compiled_templates"))
+TEMPLATES_LOADER_MODE = os.getenv("TEMPLATES_LOADER_MODE", "auto")
 
 AWS_REGION = "us-west-1"
 
 TEMPLATES_BUCKET = "cloudblocks-templates"
-GENERATED_TF_BUCKET = "cloudblocks-generated-tf"
+GENERATED_TF_BUCKET = os.getenv("GENERATED_TF_BUCKET", "cloudblocks-generated-tf")
 
 AWS_ACCESS_KEY_ID = os.getenv("AWS_KEY_ID")
 AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_KEY")
 
+# Regions of a multi-region build are rendered in a pool of REGION_WORKERS processes, as rendering is CPU-bound and
+# threads wouldn't run it in parallel. "serial" renders them one after the other, the default on Lambda, which has
+# no shared memory for process pools
+REGION_WORKERS = int(os.getenv("REGION_WORKERS", min(8, os.cpu_count() or 1)))
+REGION_EXECUTOR = os.getenv("REGION_EXECUTOR", "serial" if os.getenv("AWS_LAMBDA_FUNCTION_NAME") else "process")
+
+# Size limit of the `build_batch` API action, whose mappings are built in the pool of REGION_WORKERS processes
+API_BATCH_MAX_SIZE = int(os.getenv("API_BATCH_MAX_SIZE", 50))
+
+# Cache of built configurations: "memory" (LRU, for warm Lambda containers), "disk" or "none"
+BUILD_CACHE = os.getenv("BUILD_CACHE", "memory")
+BUILD_CACHE_DIR = os.getenv("BUILD_CACHE_DIR", os.path.join("/tmp", "cloudblocks-build-cache"))
+BUILD_CACHE_MAX_ENTRIES = int(os.getenv("BUILD_CACHE_MAX_ENTRIES", 128))
+BUILD_CACHE_MAX_BYTES = int(os.getenv("BUILD_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+BUILD_CACHE_TTL = float(os.getenv("BUILD_CACHE_TTL", 3600))
+
+# Lambda handler metrics (CloudWatch embedded metric format) and event logging
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+METRICS_NAMESPACE = os.getenv("METRICS_NAMESPACE", "Cloudblocks")
+# Share of requests whose event is logged, failed requests are always logged
+LOG_EVENT_SAMPLE_RATE = float(os.getenv("LOG_EVENT_SAMPLE_RATE", 0.01))
+# Body of logged events: "redact" (size only), "truncate" (to LOG_EVENT_BODY_MAX_CHARS) or "full"
+LOG_EVENT_BODY = os.getenv("LOG_EVENT_BODY", "redact")
+LOG_EVENT_BODY_MAX_CHARS = int(os.getenv("LOG_EVENT_BODY_MAX_CHARS", 1024))
+
+# HTTP server (cli.py serve)
+SERVER_HOST = os.getenv("SERVER_HOST", "127.0.0.1")
+SERVER_PORT = int(os.getenv("SERVER_PORT", 8080))
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", os.cpu_count() or 1))
+# Requests handled at once, and waiting beyond those before new ones are rejected with 429
+SERVER_MAX_CONCURRENCY = int(os.getenv("SERVER_MAX_CONCURRENCY", SERVER_WORKERS))
+SERVER_MAX_PENDING = int(os.getenv("SERVER_MAX_PENDING", 4 * SERVER_WORKERS))
+SERVER_KEEP_ALIVE_TIMEOUT = float(os.getenv("SERVER_KEEP_ALIVE_TIMEOUT", 15))
+SERVER_MAX_BODY_BYTES = int(os.getenv("SERVER_MAX_BODY_BYTES", 16 * 1024 * 1024))
+# Whether identical concurrent build and validate requests share a single computation
+SERVER_COALESCE = os.getenv("SERVER_COALESCE", "true").lower() == "true"
+
+# Build results larger than this are uploaded to GENERATED_TF_BUCKET and returned as a presigned URL instead, as
+# Lambda responses are limited to 6 MB. 0 disables offloading
+RESULT_OFFLOAD_THRESHOLD_BYTES = int(os.getenv("RESULT_OFFLOAD_THRESHOLD_BYTES", 5 * 1024 * 1024))
+RESULT_OFFLOAD_PREFIX = os.getenv("RESULT_OFFLOAD_PREFIX", "results/")
+# Size of the parts of multipart uploads (S3 requires at least 5 MB), and parts uploaded at once
+RESULT_OFFLOAD_PART_BYTES = int(os.getenv("RESULT_OFFLOAD_PART_BYTES", 8 * 1024 * 1024))
+RESULT_OFFLOAD_WORKERS = int(os.getenv("RESULT_OFFLOAD_WORKERS", 4))
+RESULT_OFFLOAD_URL_EXPIRY = int(os.getenv("RESULT_OFFLOAD_URL_EXPIRY", 3600))
+
+# Rendered fragments of low-level items kept for incremental rebuilds
+FRAGMENT_CACHE_MAX_ENTRIES = int(os.getenv("FRAGMENT_CACHE_MAX_ENTRIES", 4096))
+
 TEMPLATES_MAP_PATH = os.path.join(BASE_DIR, "data", "templates_map.json")
 
 _CLOUD_PROVIDER_CONFIG_PATH = os.path.join(BASE_DIR, "data", "cloud_providers.json")
-with open(_CLOUD_PROVIDER_CONFIG_PATH, "r") as f:
-    CLOUD_PROVIDER_SETTINGS = CloudConfig.from_dict(json.load(f))
-
 _CLOUD_RESOURCES_CONFIG_PATH = os.path.join(BASE_DIR, "data", "resources.json")
-with open(_CLOUD_RESOURCES_CONFIG_PATH, "r") as f:
-    RESOURCE_SETTINGS = ResourceMap.from_dict(json.load(f))
+
+
+@lru_cache(maxsize=None)
+def get_cloud_provider_settings():
+    """Return the cloud provider settings, parsing them on first use."""
+    from models.provider_config import CloudConfig
+
+    with open(_CLOUD_PROVIDER_CONFIG_PATH, "r") as f:
+        return CloudConfig.from_dict(json.load(f))
+
+
+@lru_cache(maxsize=None)
+def get_resource_settings():
+    """Return the resource catalog, parsing it on first use."""
+    from models.tf_type_mapping import ResourceMap
+
+    with open(_CLOUD_RESOURCES_CONFIG_PATH, "r") as f:
+        return ResourceMap.from_dict(json.load(f))
+
+
+_LAZY_SETTINGS = {
+    "CLOUD_PROVIDER_SETTINGS": get_cloud_provider_settings,
+    "RESOURCE_SETTINGS": get_resource_settings,
+}
+
+
+def __getattr__(name):
+    # Keeps `config.CLOUD_PROVIDER_SETTINGS` and `config.RESOURCE_SETTINGS` working without loading them on import
+    if name in _LAZY_SETTINGS:
+        return _LAZY_SETTINGS[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def get_aws_secret(var_key):
     """Return the secret value from an AWS secret."""
+    import boto3
+
     secrets_client = boto3.client("secretsmanager")
     secret = secrets_client.get_secret_value(SecretId=f"arn:aws:secretsmanager:{var_key}")
     return secret["SecretString"]
@@ -1,13 +1,17 @@
+import atexit
 import os
-from typing import Dict, Optional, List, Set
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Dict, Optional, List, Set, Iterator, TextIO, Iterable, Tuple, Union
 
 from jinja2 import Template
 
-from config import BASE_DIR, TEMPLATES_DIR
+from config import REGION_EXECUTOR, REGION_WORKERS, get_cloud_provider_settings, get_resource_settings
+
 from models.data_model import ServiceProvider
+from models.dependency_graph import DependencyGraph
 from models.high_level_items import (
     HighLevelResource,
-    HighLevelBindingDirection,
     HighLevelMap,
 )
 from models.low_level_items_aws import (
@@ -15,7 +19,6 @@ from models.low_level_items_aws import (
     EC2Docker,
     VPC,
     TerraformGeneratorAWS,
-    generate_id,
     CloudblocksValidationException,
     S3PublicWebsite,
     LowLevelStorageItem,
@@ -24,54 +27,138 @@ from models.low_level_items_aws import (
     EC2,
     LoggingS3Bucket,
 )
+from models.fragment_cache import FragmentCache
+from models.mapping_parser import parse_mapping
+from models.naming import NameGenerator
 from models.tf_type_mapping import ResourceCategory
-from template_loader import load_template
+from template_loader import load_template, get_registry
+from template_writer import MAIN_FILE_NAME, OUTPUTS_FILE_NAME, PROVIDERS_FILE_NAME, VARIABLES_FILE_NAME
 
-BASE_TEMPLATE_PATH = os.path.join(TEMPLATES_DIR, "base.tf.template")
-PROVIDER_TEMPLATE_PATH_AWS = os.path.join(TEMPLATES_DIR, "providers", "aws.tf.template")
+BASE_TEMPLATE_NAME = "base.tf.template"
+PROVIDER_TEMPLATE_NAME_AWS = "providers/aws.tf.template"
 
 
 class TerraformGenerator:
-    def __init__(self, base_template: str = None):
+    """
+    State of a single build: the low-level items mapped so far and the names generated for them.
+    `GeneratorEngine` creates one per region it builds, passing the compiled `base` template it holds.
+    """
+
+    def __init__(
+        self,
+        base_template: str = None,
+        names: Optional[NameGenerator] = None,
+        fragment_cache: Optional[FragmentCache] = None,
+        base: Optional[Template] = None,
+    ):
+        self.names = names or NameGenerator()
+        self.fragment_cache = fragment_cache
+        # Uids of the low-level items rendered by the last generation, rather than reused from the fragment cache
+        self.rendered: List[str] = []
         self.ll_map: Dict[str, LowLevelAWSItem] = {}
         self.ll_list: List[LowLevelAWSItem] = []
         self.logging_bucket = self.setup_logging_bucket()
-        if base_template:
-            self.base = Template(base_template)
+        if base is not None:
+            self.base = base
+        elif base_template:
+            self.base = get_registry().from_string(base_template)
         else:
             self.get_base_template()
 
     def get_base_template(self):
-        with open(BASE_TEMPLATE_PATH, "r") as f:
-            self.base = Template(f.read())
+        self.base = load_template(BASE_TEMPLATE_NAME)
 
     def get_provider_template(self, provider: str, region: str) -> str:
         if provider == ServiceProvider.AWS:
-            return load_template(PROVIDER_TEMPLATE_PATH_AWS).render({"region": region})
+            return load_template(PROVIDER_TEMPLATE_NAME_AWS).render({"region": region})
         else:
             raise KeyError(f"No provider named [{provider}] found")
 
     def generate_template_from_json(self, json_data: List[Dict]) -> str:
-        hl_arr = json_to_high_level_list(json_data)
-        # for region, resources in hl_arr.region_resources:
-        region = list(hl_arr.region_resources.keys())[0]
-        self.generate_low_level_aws_map(hl_arr)
-        generator = TerraformGeneratorAWS(self.ll_map, self.ll_list)
-        provider_template = self.get_provider_template("aws", region)
-        out = self.base.render(
+        return "".join(self.generate_template_chunks(json_data))
+
+    def write_template_from_json(self, json_data: List[Dict], fp: TextIO):
+        for chunk in self.generate_template_chunks(json_data):
+            fp.write(chunk)
+
+    def generate_template_chunks(self, json_data: List[Dict]) -> Iterator[str]:
+        """
+        Render the Terraform configuration for the given single-region mapping as a stream of chunks, in output order.
+        Every item's fragments are rendered and held before the first chunk, as the variables of all items come before
+        their resources: streaming saves joining the document into one string, not holding its content.
+        """
+        hl_map, region = _get_single_region(json_to_high_level_list(json_data))
+        return self.generate_region_chunks(hl_map, region)
+
+    def generate_region_chunks(self, hl_map: HighLevelMap, region: str) -> Iterator[str]:
+        """Render one region of an already parsed map, as in `generate_template_chunks`"""
+        self.generate_low_level_aws_map(hl_map, region)
+        return self.render_low_level_chunks(hl_map.cloud_provider, region)
+
+    def generate_region_files(self, hl_map: HighLevelMap, region: str, split_items: bool = False) -> Dict[str, str]:
+        """
+        Render one region of an already parsed map split into providers, variables, main and outputs files.
+        With `split_items`, the resources of each low-level item are in a file of their own rather than in main.
+        """
+        self.generate_low_level_aws_map(hl_map, region)
+        generator = TerraformGeneratorAWS(self.ll_map, self.ll_list, self.fragment_cache, self.names.seed)
+        files = {PROVIDERS_FILE_NAME: self.get_provider_template(hl_map.cloud_provider, region)}
+        variables, main, outputs = [], [], []
+        for item, config in generator.generate_item_configs():
+            if config.main:
+                if split_items:
+                    files[item.file_name] = config.main
+                else:
+                    main.append(config.main)
+            if config.variables:
+                variables.append(config.variables)
+            if config.outputs:
+                outputs.append(config.outputs)
+        self.rendered = generator.rendered
+        files[VARIABLES_FILE_NAME] = "".join(variables)
+        if not split_items:
+            files[MAIN_FILE_NAME] = "".join(main)
+        files[OUTPUTS_FILE_NAME] = "".join(outputs)
+        return files
+
+    def render_low_level_chunks(self, cloud_provider: ServiceProvider, region: str) -> Iterator[str]:
+        """Render the low-level items mapped so far, for the provider of the given region"""
+        generator = TerraformGeneratorAWS(self.ll_map, self.ll_list, self.fragment_cache, self.names.seed)
+        provider_template = self.get_provider_template(cloud_provider, region)
+        fragments = generator.generate_fragments()
+        self.rendered = generator.rendered
+        return self.base.generate(
             {
                 "providers": provider_template,
-                "services": [generator.generate_string_template()],
+                "services": [fragments],
             }
         )
-        return out
+
+    @staticmethod
+    def generate_region_templates(
+        json_data: Union[Dict, List[Dict]],
+        executor: Optional[Executor] = None,
+        deterministic: bool = False,
+        seed: Optional[str] = None,
+        hl_maps: Optional[List[HighLevelMap]] = None,
+    ) -> Dict[str, Iterable[str]]:
+        """Build the mapping with the engine shared by the process, see `GeneratorEngine.build`"""
+        return get_engine().build(json_data, executor, deterministic, seed, hl_maps)
+
+    def generate_dependency_graph(self, json_data: List[Dict]) -> DependencyGraph:
+        for hl_map in json_to_high_level_list(json_data):
+            _check_region_bindings(hl_map)
+            for region in hl_map.region_resources:
+                self.generate_low_level_aws_map(hl_map, region)
+        return DependencyGraph(self.ll_list)
 
     def add_low_level_item(self, item: LowLevelAWSItem):
         self.ll_map[item.uid] = item
         self.ll_list.append(item)
 
-    def generate_low_level_aws_map(self, input_arr: HighLevelMap):
-        for item in input_arr.resources:
+    def generate_low_level_aws_map(self, input_arr: HighLevelMap, region: Optional[str] = None):
+        resources = input_arr.region_resources[region] if region else input_arr.resources
+        for item in resources:
             if item.uid not in self.ll_map:
                 if item.category == ResourceCategory.DOCKER:
                     self.high_to_low_mapping_docker(item)
@@ -83,15 +170,11 @@ class TerraformGenerator:
                     self.high_to_low_mapping_storage(item)
 
     def setup_logging_bucket(self) -> LoggingS3Bucket:
-        return LoggingS3Bucket(generate_id())
+        uid = self.names.generate_id("logging-bucket")
+        return LoggingS3Bucket(uid, bucket_name=self.names.generate_name("s3", uid))
 
     def high_to_low_mapping_storage(self, storage: HighLevelResource):
         s3: Optional[LowLevelStorageItem] = None
-        for _ in (x for x in storage.bindings if x.direction == HighLevelBindingDirection.TO):
-            raise CloudblocksValidationException("Storage item cannot bind TO another element")
-        for _ in (x for x in storage.bindings if x.target.category == ResourceCategory.DATABASE):
-            raise CloudblocksValidationException("Storage item cannot bind with a database")
-
         is_versioning_enabled: Optional[bool] = None
         if "versioning_enabled" in storage.params:
             is_versioning_enabled = bool(storage.params["versioning_enabled"])
@@ -103,15 +186,14 @@ class TerraformGenerator:
         if not s3:
             if "bucket_name" in storage.params:
                 bucket_name = storage.params["bucket_name"]
-                assert isinstance(bucket_name, str)
                 self.add_low_level_item(S3(storage.uid, self.logging_bucket, is_versioning_enabled, bucket_name))
             else:
-                self.add_low_level_item(S3(storage.uid, self.logging_bucket, is_versioning_enabled))
+                bucket_name = self.names.generate_name("s3", storage.uid)
+                self.add_low_level_item(S3(storage.uid, self.logging_bucket, is_versioning_enabled, bucket_name))
 
     def high_to_low_mapping_compute(self, compute: HighLevelResource):
         needs_internet_access = False
         if "is_public" in compute.params:
-            assert compute.params["is_public"] in ["true", "false"]
             needs_internet_access = bool(compute.params["is_public"])
 
         vpc: Optional[VPC] = None
@@ -130,10 +212,12 @@ class TerraformGenerator:
         if not vpc:
             az_count: Optional[int] = None
             if "az_count" in compute.params:
-                assert str(compute.params["az_count"]).isnumeric()
                 az_count = int(str(compute.params["az_count"]))
             vpc = VPC(
-                generate_id(), logging_bucket=self.logging_bucket, az_count=az_count, is_public=needs_internet_access
+                self.names.generate_id("vpc", compute.uid),
+                logging_bucket=self.logging_bucket,
+                az_count=az_count,
+                is_public=needs_internet_access,
             )
             self.add_low_level_item(vpc)
 
@@ -152,31 +236,24 @@ class TerraformGenerator:
         aws_ami: Optional[str] = None
         image_regex: Optional[str] = None
         if "aws_ami" in compute.params:
-            assert isinstance(compute.params["aws_ami"], str)
             aws_ami = compute.params["aws_ami"]
         else:
-            assert isinstance(compute.params["image_regex"], str)
             image_regex = compute.params["image_regex"]
 
-        assert isinstance(compute.params["aws_instance_type"], str)
         aws_ec2_instance_type: str = compute.params["aws_instance_type"]
 
         instance_count: Optional[int] = None
         if "instance_count" in compute.params:
-            assert str(compute.params["instance_count"]).isnumeric()
             instance_count = int(str(compute.params["instance_count"]))
 
         user_data: Optional[str] = None
         if "init_script" in compute.params:
-            assert isinstance(compute.params["init_script"], str)
             user_data = compute.params["init_script"]
 
         ssh_pubkey: Optional[str] = None
         if "public_key" in compute.params:
-            assert isinstance(compute.params["public_key"], str)
             ssh_pubkey = compute.params["public_key"]
         elif "public_key_path" in compute.params:
-            assert isinstance(compute.params["public_key_path"], str)
             with open(os.path.expanduser(compute.params["public_key_path"])) as f:
                 ssh_pubkey = f.read().rstrip("\n")
         ssh_enabled: Optional[bool] = None
@@ -211,9 +288,8 @@ class TerraformGenerator:
         if not vpc:
             az_count: Optional[int] = None
             if "az_count" in docker.params:
-                assert str(docker.params["az_count"]).isnumeric()
                 az_count = int(str(docker.params["az_count"]))
-            vpc = VPC(generate_id(), az_count=az_count, logging_bucket=self.logging_bucket)
+            vpc = VPC(self.names.generate_id("vpc", docker.uid), az_count=az_count, logging_bucket=self.logging_bucket)
             self.add_low_level_item(vpc)
 
         linked_storage: Set[LowLevelStorageItem] = set()
@@ -229,70 +305,53 @@ class TerraformGenerator:
                 assert isinstance(storage, LowLevelStorageItem)
                 linked_storage.add(storage)
 
-        cluster_name: Optional[str] = None
-
         if "aws_ecs_cluster_name" in docker.params:
-            assert isinstance(docker.params["aws_ecs_cluster_name"], str)
-            cluster_name = docker.params["aws_ecs_cluster_name"]
+            cluster_name: str = docker.params["aws_ecs_cluster_name"]
+        else:
+            cluster_name = self.names.generate_name("ecs", docker.uid)
 
         aws_ami: Optional[str] = None
         image_regex: Optional[str] = None
         if "aws_ami" in docker.params:
-            assert isinstance(docker.params["aws_ami"], str)
             aws_ami = docker.params["aws_ami"]
         else:
-            assert isinstance(docker.params["image_regex"], str)
             image_regex = docker.params["image_regex"]
 
-        assert isinstance(docker.params["aws_instance_type"], str)
         aws_ec2_instance_type: str = docker.params["aws_instance_type"]
 
-        assert isinstance(docker.params["image_url"], str)
         image_url: str = docker.params["image_url"]
 
-        assert isinstance(docker.params["container_name"], str)
         container_name: str = docker.params["container_name"]
 
         cpu_cores: Optional[int] = None
         if "cpu_cores" in docker.params:
-            assert str(docker.params["cpu_cores"]).isnumeric()
             cpu_cores = int(str(docker.params["cpu_cores"]))
 
         memory: Optional[int] = None
         if "memory" in docker.params:
-            assert str(docker.params["memory"]).isnumeric()
             memory = int(str(docker.params["memory"]))
 
         desired_count: Optional[int] = None
         if "desired_count" in docker.params:
-            assert str(docker.params["desired_count"]).isnumeric()
             desired_count = int(str(docker.params["desired_count"]))
 
-        assert isinstance(docker.params["healthcheck_path"], str)
         healthcheck_path: str = docker.params["healthcheck_path"]
 
-        assert str(docker.params["autoscale_min"]).isnumeric()
         autoscale_min = int(str(docker.params["autoscale_min"]))
 
-        assert str(docker.params["autoscale_max"]).isnumeric()
         autoscale_max = int(str(docker.params["autoscale_max"]))
 
-        assert str(docker.params["autoscale_target"]).isnumeric()
         autoscale_target = int(str(docker.params["autoscale_target"]))
 
         ssh_pubkey: Optional[str] = None
         if "ssh_pubkey" in docker.params:
-            assert isinstance(docker.params["ssh_pubkey"], str)
             ssh_pubkey = docker.params["ssh_pubkey"]
 
         if "is_public" in docker.params:
-            assert docker.params["is_public"] in ["true", "false"]
             needs_internet_access = bool(docker.params["is_public"])
 
-        assert isinstance(docker.params["volume_path"], str)
         volume_path: str = docker.params["volume_path"]
 
-        assert isinstance(docker.params["volume_name"], str)
         volume_name: str = docker.params["volume_name"]
 
         ec2 = EC2Docker(
@@ -303,6 +362,7 @@ class TerraformGenerator:
             image_regex=image_regex,
             aws_ec2_instance_type=aws_ec2_instance_type,
             aws_ecs_cluster_name=cluster_name,
+            task_definition_family_name=self.names.generate_name("taskdef", docker.uid),
             image_url=image_url,
             container_name=container_name,
             volume_path=volume_path,
@@ -330,9 +390,242 @@ class TerraformGenerator:
         pass
 
 
-def json_to_high_level_list(data: List[Dict]) -> HighLevelMap:
-    # TODO: Add support for multiple clouds (this is hard coded to a single cloud instance)
-    return HighLevelMap.from_dict(data[0])
+class GeneratorEngine:
+    """
+    Builds mappings with resources loaded once: the resource catalog, the cloud settings and the compiled templates.
+
+    The engine holds no state of its own beyond those, which are never modified, while everything a build maps or
+    generates lives in the `TerraformGenerator` created for each region. A single engine can therefore serve
+    concurrent builds from many threads, and be kept across warm Lambda invocations (see `get_engine`).
+    """
+
+    def __init__(self, preload: bool = True):
+        if preload:
+            get_resource_settings()
+            get_cloud_provider_settings()
+            get_registry().preload()
+        self.base = load_template(BASE_TEMPLATE_NAME)
+
+    def build(
+        self,
+        mapping: Union[Dict, List[Dict]],
+        executor: Optional[Executor] = None,
+        deterministic: bool = False,
+        seed: Optional[str] = None,
+        hl_maps: Optional[List[HighLevelMap]] = None,
+    ) -> Dict[str, Iterable[str]]:
+        """
+        Render every region of every cloud in the mapping into its own Terraform configuration, keyed by
+        "<cloud>-<region>". Regions are rendered concurrently on `executor`, by default the process pool of
+        `get_region_pool`, or one after the other if there is none.
+        A single region is streamed as in `generate_template_chunks` instead.
+        In deterministic mode, generated ids and names are derived from the mapping (or `seed`) and the region.
+        Pass `hl_maps` if the mapping was already parsed, to not parse it again.
+        """
+        if hl_maps is None:
+            hl_maps = json_to_high_level_list(mapping)
+        regions = get_regions(hl_maps)
+        names = NameGenerator.from_mapping(mapping, seed) if deterministic or seed is not None else NameGenerator()
+        if len(regions) == 1:
+            key, hl_map, region = regions[0]
+            return {key: self.new_generator(names.scoped(key)).generate_region_chunks(hl_map, region)}
+
+        if executor is None:
+            executor = get_region_pool()
+        if executor is None:
+            return {key: [self.build_region(hl_map, region, names.scoped(key))] for key, hl_map, region in regions}
+
+        # Process pools can't be sent the engine, so regions are rendered by their workers' own engine
+        build_region = render_region if isinstance(executor, ProcessPoolExecutor) else self.build_region
+        futures = {
+            key: executor.submit(build_region, hl_map, region, names.scoped(key)) for key, hl_map, region in regions
+        }
+        return {key: [future.result()] for key, future in futures.items()}
+
+    def build_files(
+        self,
+        mapping: Union[Dict, List[Dict]],
+        deterministic: bool = False,
+        seed: Optional[str] = None,
+        hl_maps: Optional[List[HighLevelMap]] = None,
+        split_items: bool = False,
+    ) -> Dict[str, Dict[str, str]]:
+        """Like `build`, with every region's configuration split into files by `generate_region_files`"""
+        if hl_maps is None:
+            hl_maps = json_to_high_level_list(mapping)
+        names = NameGenerator.from_mapping(mapping, seed) if deterministic or seed is not None else NameGenerator()
+        return {
+            key: self.new_generator(names.scoped(key)).generate_region_files(hl_map, region, split_items)
+            for key, hl_map, region in get_regions(hl_maps)
+        }
+
+    def build_region(self, hl_map: HighLevelMap, region: str, names: Optional[NameGenerator] = None) -> str:
+        return "".join(self.new_generator(names).generate_region_chunks(hl_map, region))
+
+    def new_generator(
+        self, names: Optional[NameGenerator] = None, fragment_cache: Optional[FragmentCache] = None
+    ) -> TerraformGenerator:
+        """Fresh state for a single build"""
+        return TerraformGenerator(names=names, fragment_cache=fragment_cache, base=self.base)
+
+
+_engine: Optional[GeneratorEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> GeneratorEngine:
+    """The engine shared by every build in the process, created on first use"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = GeneratorEngine()
+    return _engine
+
+
+def reset_engine():
+    """Drop the shared engine, e.g. after templates changed, so that the next build loads them again"""
+    global _engine
+    with _engine_lock:
+        _engine = None
+
+
+def json_to_high_level_list(data: Union[Dict, List[Dict]]) -> List[HighLevelMap]:
+    """Parse and validate the mapping, raising a CloudblocksValidationException with every error in it"""
+    return parse_mapping(data).get_maps()
+
+
+def get_region_key(cloud_provider: str, region: str) -> str:
+    return f"{cloud_provider}-{region}"
+
+
+def get_regions(hl_maps: List[HighLevelMap]) -> List[Tuple[str, HighLevelMap, str]]:
+    """Every region of the parsed maps, keyed by "<cloud>-<region>" """
+    out = []
+    keys = set()
+    for hl_map in hl_maps:
+        _check_region_bindings(hl_map)
+        cloud = hl_map.cloud_provider.value
+        for region in hl_map.region_resources:
+            key = get_region_key(cloud, region)
+            if key in keys:
+                raise CloudblocksValidationException(f"Region {region} of cloud {cloud} is defined more than once")
+            keys.add(key)
+            out.append((key, hl_map, region))
+    return out
+
+
+class RegionExecutorMode:
+    PROCESS = "process"
+    SERIAL = "serial"
+
+
+_region_executor_mode = REGION_EXECUTOR
+_region_pool: Optional[ProcessPoolExecutor] = None
+_region_pool_lock = threading.Lock()
+
+
+def set_region_executor_mode(mode: str):
+    """
+    Render the regions of multi-region builds in the shared process pool, or serially, e.g. in processes that are
+    already workers of a pool
+    """
+    global _region_executor_mode, _region_pool
+    with _region_pool_lock:
+        _region_executor_mode = mode
+        if mode != RegionExecutorMode.PROCESS and _region_pool is not None:
+            _region_pool.shutdown(wait=False)
+            _region_pool = None
+
+
+def get_region_pool() -> Optional[Executor]:
+    """
+    Process pool rendering the regions of multi-region builds by default, and the mappings of API batch builds,
+    created on first use with workers that load the engine when they start. None if regions should be rendered
+    serially.
+    """
+    global _region_executor_mode, _region_pool
+    if _region_executor_mode != RegionExecutorMode.PROCESS or REGION_WORKERS <= 1:
+        return None
+    if _region_pool is None:
+        with _region_pool_lock:
+            if _region_pool is None:
+                try:
+                    _region_pool = ProcessPoolExecutor(max_workers=REGION_WORKERS, initializer=_init_region_worker)
+                except OSError:
+                    # Process pools need shared memory for their queues, which isn't available everywhere
+                    _region_executor_mode = RegionExecutorMode.SERIAL
+                    return None
+    return _region_pool
+
+
+def shutdown_region_pool():
+    """Stop the workers of the region pool, if it was created, rather than leaving them to interpreter exit"""
+    global _region_pool
+    with _region_pool_lock:
+        if _region_pool is not None:
+            _region_pool.shutdown(cancel_futures=True)
+            _region_pool = None
+
+
+atexit.register(shutdown_region_pool)
+
+
+def _init_region_worker():
+    # Workers render the regions of the builds they are sent serially, rather than in the pool of their parent
+    # process, inherited when they were forked
+    global _region_executor_mode, _region_pool
+    _region_executor_mode, _region_pool = RegionExecutorMode.SERIAL, None
+    get_engine()
+
+
+def render_regions_incremental(
+    json_data: Union[Dict, List[Dict]],
+    fragment_cache: FragmentCache,
+    seed: Optional[str] = None,
+    hl_maps: Optional[List[HighLevelMap]] = None,
+) -> Tuple[Dict[str, str], Dict[str, List[str]]]:
+    """
+    Render every region like `generate_region_templates` with deterministic names from `seed` (or the cache's own),
+    reusing the fragments of unchanged items. Returns the templates and the uids of the re-rendered items, by region.
+    """
+    names = NameGenerator(seed or fragment_cache.seed)
+    templates: Dict[str, str] = {}
+    rendered: Dict[str, List[str]] = {}
+    if hl_maps is None:
+        hl_maps = json_to_high_level_list(json_data)
+    for key, hl_map, region in get_regions(hl_maps):
+        generator = get_engine().new_generator(names.scoped(key), fragment_cache)
+        templates[key] = "".join(generator.generate_region_chunks(hl_map, region))
+        rendered[key] = generator.rendered
+    return templates, rendered
+
+
+def render_region(hl_map: HighLevelMap, region: str, names: Optional[NameGenerator] = None) -> str:
+    """Render one region of a map, as a top-level function so that it can be sent to a process pool"""
+    return get_engine().build_region(hl_map, region, names)
+
+
+def _get_single_region(hl_maps: List[HighLevelMap]) -> Tuple[HighLevelMap, str]:
+    regions = [(hl_map, region) for hl_map in hl_maps for region in hl_map.region_resources]
+    if len(regions) != 1:
+        raise CloudblocksValidationException(
+            f"Mapping defines {len(regions)} regions, use generate_region_templates to render one configuration per region"
+        )
+    return regions[0]
+
+
+def _check_region_bindings(hl_map: HighLevelMap):
+    # Every region is rendered into its own configuration, which cannot reference resources of another one
+    for resource in hl_map.resources:
+        region = hl_map.get_region(resource.uid)
+        for binding in resource.bindings:
+            target_region = hl_map.get_region(binding.target.uid)
+            if target_region != region:
+                raise CloudblocksValidationException(
+                    f"Resource {resource.uid} in region {region} cannot bind to {binding.target.uid} "
+                    f"in region {target_region}"
+                )
 
 
 def is_internet_needed(input_arr: List[HighLevelResource]) -> bool:
@@ -1,8 +1,6 @@
 import json
 from typing import Dict
 
-import yaml
-
 
 class MappingFileTypes:
     JSON = ["json"]
@@ -30,5 +28,7 @@ def _load_json_mapping(file_path: str) -> Dict:
 
 
 def _load_yaml_mapping(file_path: str) -> Dict:
+    import yaml
+
     with open(file_path, "r") as f:
         return yaml.load(f, yaml.BaseLoader)
@@ -0,0 +1,125 @@
+"""
+Structured metrics and sampled event logging for the Lambda handler.
+
+Metrics are printed as CloudWatch embedded metric format (EMF) JSON lines, which CloudWatch turns into metrics
+without any API call. Events are only logged for a sample of requests (and for failed ones), with their body
+replaced by its size unless configured otherwise, so that logging costs don't grow with the mappings sent.
+"""
+import json
+import random
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, TextIO
+
+from config import (
+    LOG_EVENT_BODY,
+    LOG_EVENT_BODY_MAX_CHARS,
+    LOG_EVENT_SAMPLE_RATE,
+    METRICS_ENABLED,
+    METRICS_NAMESPACE,
+)
+from response_format import EncodedBody
+
+
+class Unit:
+    MILLISECONDS = "Milliseconds"
+    BYTES = "Bytes"
+    COUNT = "Count"
+
+
+class LogEventBody:
+    REDACT = "redact"
+    TRUNCATE = "truncate"
+    FULL = "full"
+
+
+class MetricsRecorder:
+    """Metrics, dimensions and properties of one request, emitted together as a single EMF record"""
+
+    def __init__(self, namespace: str = METRICS_NAMESPACE):
+        self.namespace = namespace
+        self.dimensions: Dict[str, str] = {}
+        self.metrics: Dict[str, float] = {}
+        self.units: Dict[str, str] = {}
+        self.properties: Dict[str, Any] = {}
+
+    def put_metric(self, name: str, value: float, unit: str = Unit.COUNT):
+        self.metrics[name] = value
+        self.units[name] = unit
+
+    def put_dimension(self, name: str, value: str):
+        self.dimensions[name] = value
+
+    def set_property(self, name: str, value: Any):
+        self.properties[name] = value
+
+    @contextmanager
+    def time_phase(self, name: str) -> Iterator[None]:
+        """Record the time spent in the block as the `<name>Latency` metric"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.put_metric(f"{name}Latency", (time.perf_counter() - start) * 1000, Unit.MILLISECONDS)
+
+    def to_emf(self, timestamp: Optional[float] = None) -> Dict[str, Any]:
+        timestamp = time.time() if timestamp is None else timestamp
+        return {
+            "_aws": {
+                "Timestamp": int(timestamp * 1000),
+                "CloudWatchMetrics": [
+                    {
+                        "Namespace": self.namespace,
+                        "Dimensions": [list(self.dimensions)],
+                        "Metrics": [{"Name": name, "Unit": self.units[name]} for name in self.metrics],
+                    }
+                ],
+            },
+            **self.properties,
+            **self.dimensions,
+            **self.metrics,
+        }
+
+    def flush(self, stream: TextIO = None):
+        if METRICS_ENABLED and self.metrics:
+            print(json.dumps(self.to_emf()), file=stream or sys.stdout)
+
+
+def should_log_event(sample_rate: float = LOG_EVENT_SAMPLE_RATE) -> bool:
+    return sample_rate >= 1 or (sample_rate > 0 and random.random() < sample_rate)
+
+
+def redact_event(
+    event: Dict[str, Any], mode: str = LOG_EVENT_BODY, max_chars: int = LOG_EVENT_BODY_MAX_CHARS
+) -> Dict[str, Any]:
+    """The event to log, with its body replaced by its size, or truncated, depending on `mode`"""
+    body = event.get("body")
+    if not isinstance(body, str) or mode == LogEventBody.FULL:
+        return event
+    if mode == LogEventBody.TRUNCATE and len(body) <= max_chars:
+        return event
+
+    out = dict(event)
+    if mode == LogEventBody.TRUNCATE:
+        out["body"] = body[:max_chars]
+        out["bodyTruncated"] = True
+    else:
+        out["body"] = None
+        out["bodyRedacted"] = True
+    out["bodySize"] = len(body)
+    return out
+
+
+def get_response_size(response: Any) -> int:
+    """Approximate size of a response in characters, without serialising it"""
+    if isinstance(response, EncodedBody):
+        return len(response.data)
+    if isinstance(response, str):
+        return len(response)
+    if isinstance(response, dict):
+        return sum(len(str(key)) + get_response_size(value) for key, value in response.items())
+    if isinstance(response, (list, tuple)):
+        # Lines of a configuration, joined back with newlines by clients
+        return sum(get_response_size(item) for item in response) + max(len(response) - 1, 0)
+    return len(str(response))
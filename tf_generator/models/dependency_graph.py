@@ -0,0 +1,110 @@
+import json
+from typing import Dict, Iterable, List, Tuple, TYPE_CHECKING
+
+from models.exceptions import CloudblocksValidationException
+
+if TYPE_CHECKING:
+    from models.low_level_items_aws import LowLevelAWSItem
+
+
+class DependencyCycleException(CloudblocksValidationException):
+    pass
+
+
+class DependencyGraph:
+    """
+    Dependency graph of low-level items, built from their `depends_on` sets.
+
+    Items are ordered so that every item comes after all of its (transitive) dependencies. Ties are broken by the
+    order the items were given in, then by uid, so the same items always produce the same order.
+    Dependencies missing from `items` (e.g. the shared logging bucket) are discovered and included in the graph.
+    """
+
+    def __init__(self, items: Iterable["LowLevelAWSItem"]):
+        items = list(items)
+        self._rank: Dict[str, int] = {item.uid: i for i, item in reversed(list(enumerate(items)))}
+        self.roots: List["LowLevelAWSItem"] = items
+        self.nodes: Dict[str, "LowLevelAWSItem"] = {}
+        self.dependencies: Dict[str, List["LowLevelAWSItem"]] = {}
+        self.order: List["LowLevelAWSItem"] = self._sort()
+
+    def _sort_key(self, item: "LowLevelAWSItem") -> Tuple[int, str]:
+        return self._rank.get(item.uid, len(self.roots)), item.uid
+
+    def _sorted_dependencies(self, item: "LowLevelAWSItem") -> List["LowLevelAWSItem"]:
+        return sorted(item.depends_on, key=self._sort_key)
+
+    def _sort(self) -> List["LowLevelAWSItem"]:
+        """Iterative depth-first post-order traversal, O(V + E) apart from sorting each item's dependencies"""
+        order: List["LowLevelAWSItem"] = []
+        done = set()
+        in_progress = set()
+
+        for root in self.roots:
+            if root.uid in done:
+                continue
+            stack = [(root, iter(self._get_dependencies(root)))]
+            in_progress.add(root.uid)
+            while stack:
+                item, deps = stack[-1]
+                for dep in deps:
+                    if dep.uid in done:
+                        continue
+                    if dep.uid in in_progress:
+                        path = [x.uid for x, _ in stack]
+                        cycle = path[path.index(dep.uid) :] + [dep.uid]
+                        raise DependencyCycleException(f"Dependency cycle found: {' -> '.join(cycle)}", errors=cycle)
+                    in_progress.add(dep.uid)
+                    stack.append((dep, iter(self._get_dependencies(dep))))
+                    break
+                else:
+                    stack.pop()
+                    in_progress.remove(item.uid)
+                    done.add(item.uid)
+                    order.append(item)
+        return order
+
+    def _get_dependencies(self, item: "LowLevelAWSItem") -> List["LowLevelAWSItem"]:
+        if item.uid not in self.dependencies:
+            self.nodes[item.uid] = item
+            self.dependencies[item.uid] = self._sorted_dependencies(item)
+        return self.dependencies[item.uid]
+
+    def topological_order(self) -> List["LowLevelAWSItem"]:
+        return list(self.order)
+
+    def generations(self) -> List[List["LowLevelAWSItem"]]:
+        """Group items into generations, where every item only depends on items of earlier generations"""
+        level: Dict[str, int] = {}
+        out: List[List["LowLevelAWSItem"]] = []
+        for item in self.order:
+            level[item.uid] = 1 + max((level[dep.uid] for dep in self.dependencies[item.uid]), default=-1)
+            if level[item.uid] == len(out):
+                out.append([])
+            out[level[item.uid]].append(item)
+        return out
+
+    @property
+    def edges(self) -> List[Tuple[str, str]]:
+        return [(item.uid, dep.uid) for item in self.order for dep in self.dependencies[item.uid]]
+
+    def to_dict(self) -> Dict:
+        return {
+            "nodes": [{"id": item.uid, "type": type(item).__name__} for item in self.order],
+            "edges": [{"from": uid, "to": dep_uid} for uid, dep_uid in self.edges],
+            "generations": [[item.uid for item in generation] for generation in self.generations()],
+        }
+
+    def to_json(self, pretty=False) -> str:
+        if pretty:
+            return json.dumps(self.to_dict(), indent=2)
+        return json.dumps(self.to_dict())
+
+    def to_dot(self) -> str:
+        lines = ["digraph dependencies {", "  rankdir=LR;"]
+        for item in self.order:
+            lines.append(f'  "{item.uid}" [label="{type(item).__name__}\\n{item.uid}"];')
+        for uid, dep_uid in self.edges:
+            lines.append(f'  "{uid}" -> "{dep_uid}";')
+        lines.append("}")
+        return "\n".join(lines)
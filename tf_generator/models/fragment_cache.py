@@ -0,0 +1,84 @@
+import hashlib
+import json
+import uuid
+from typing import Any, Iterable, Optional, Protocol
+
+from models.low_level_items_aws import LowLevelAWSItem, TerraformConfig
+
+# Attributes that aren't inputs of the rendered configuration, or are covered by the keys of the dependencies
+IGNORED_ATTRIBUTES = {"template", "variables", "outputs", "depends_on"}
+
+
+class FragmentStore(Protocol):
+    def get(self, key: str) -> Optional[TerraformConfig]:
+        ...
+
+    def set(self, key: str, value: TerraformConfig):
+        ...
+
+    def clear(self):
+        ...
+
+    def __len__(self) -> int:
+        ...
+
+
+class FragmentCache:
+    """
+    Rendered configuration of each low-level item, keyed by the item's own inputs plus the keys of its dependencies,
+    so that rebuilding a mapping only re-renders the items whose inputs changed.
+
+    Generated names are part of an item's inputs, so builds sharing a cache use deterministic names: the cache's own
+    `seed` for a single mapping rebuilt as it is edited, or a seed per mapping when the cache is shared by several.
+    Keys also include that seed, so that builds with different seeds never share fragments, and `catalog_version`,
+    the version of the resource catalog and templates the fragments were rendered with.
+    """
+
+    def __init__(self, store: FragmentStore, catalog_version: str, seed: Optional[str] = None):
+        self.store = store
+        self.catalog_version = catalog_version
+        self.seed = seed or uuid.uuid4().hex
+
+    def get_key(self, item: LowLevelAWSItem, dependency_keys: Iterable[str], seed: Optional[str] = None) -> str:
+        inputs = {
+            name: _describe(value) for name, value in sorted(vars(item).items()) if name not in IGNORED_ATTRIBUTES
+        }
+        template = getattr(item, "template", None)
+        canonical = json.dumps(
+            {
+                "type": type(item).__name__,
+                "template": getattr(template, "name", None),
+                "inputs": inputs,
+                "dependencies": sorted(dependency_keys),
+                "seed": seed,
+                "catalog": self.catalog_version,
+            },
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[TerraformConfig]:
+        return self.store.get(key)
+
+    def set(self, key: str, config: TerraformConfig):
+        self.store.set(key, config)
+
+    def clear(self):
+        self.store.clear()
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+
+def _describe(value: Any) -> Any:
+    # Other items are referred to by uid, their content is captured by their own key
+    if isinstance(value, LowLevelAWSItem):
+        return {"uid": value.uid}
+    if isinstance(value, (set, frozenset)):
+        return sorted((_describe(x) for x in value), key=lambda x: json.dumps(x, sort_keys=True, default=str))
+    if isinstance(value, (list, tuple)):
+        return [_describe(x) for x in value]
+    if isinstance(value, dict):
+        return {str(k): _describe(v) for k, v in value.items()}
+    return value
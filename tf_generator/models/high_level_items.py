@@ -1,11 +1,10 @@
-import itertools
 from dataclasses import dataclass
 from enum import auto
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Tuple, ValuesView
 
 from strenum import LowercaseStrEnum
 
-from config import RESOURCE_SETTINGS, CLOUD_PROVIDER_SETTINGS
+from config import get_resource_settings
 from models.data_model import ServiceProvider
 from models.low_level_items_aws import LowLevelAWSItem, LowLevelComputeItem, CloudblocksValidationException
 from models.tf_type_mapping import ResourceDetails, ResourceCategory
@@ -38,11 +37,12 @@ class HighLevelResource(JsonSerialisable):
         key: str,
         bindings: List["HighLevelBinding"] = None,
         params: Dict[str, object] = None,
+        details: Optional[ResourceDetails] = None,
     ):
         self.uid: str = uid
         self.bindings: List[HighLevelBinding] = bindings or []
         self.params: Dict[str, object] = params or {}
-        self.resource: ResourceDetails = RESOURCE_SETTINGS.get(key)
+        self.resource: ResourceDetails = details or get_resource_settings().get(key)
 
     @classmethod
     def from_dict(cls, d: Dict, uid: str = None):
@@ -89,64 +89,49 @@ class HighLevelMap(JsonSerialisable):
     cloud_provider: ServiceProvider
     region_resources: Dict[str, List[HighLevelResource]]
 
+    def __post_init__(self):
+        # Indexes for constant time lookups, kept outside of the dataclass fields
+        self._resources: Dict[str, HighLevelResource] = {}
+        self._regions: Dict[str, str] = {}
+        for region, resources in self.region_resources.items():
+            for resource in resources:
+                if resource.uid in self._resources:
+                    raise CloudblocksValidationException(
+                        f"Duplicate resource uid {resource.uid} found in regions {self._regions[resource.uid]} and {region}"
+                    )
+                self._resources[resource.uid] = resource
+                self._regions[resource.uid] = region
+
     @classmethod
     def from_dict(cls, d: Dict):
-        cloud_provider = ServiceProvider.get(d.get("cloud", ServiceProvider.AWS.value))
-        cloud_provider_config = CLOUD_PROVIDER_SETTINGS.get(cloud_provider)
-
-        region = d.get("region", cloud_provider_config.default_region)
-        bindings: List[Dict] = []
-        if "regions" not in d:
-            resources, new_bindings = cls._extract_resources(d["resources"])
-            bindings.extend(new_bindings)
-            instance = cls(cloud_provider, {region: resources})
-
-        else:
-            resources = {}
-            for region_resources in d["regions"]:
-                region = region_resources.get("region")
-                resources[region], new_bindings = cls._extract_resources(region_resources["resources"])
-                bindings.extend(new_bindings)
-            instance = cls(cloud_provider, resources)
-
-        for binding in bindings:
-            resource = instance.get(binding["from"])
-            resource.bindings.append(
-                HighLevelBinding(target=instance.get(binding["to"]), direction=binding["direction"])
-            )
-        return instance
-
-    @staticmethod
-    def _extract_resources(d: Dict) -> Tuple[List[HighLevelResource], List[Dict]]:
-        resources: List[HighLevelResource] = []
-        bindings: List[Dict] = []
-        for key, value in d.items():
-            resources.append(HighLevelResource.from_dict(value, uid=key))
-            bindings.extend(
-                [
-                    {"from": key, "to": binding["id"], "direction": binding["direction"]}
-                    for binding in value.get("bindings", [])
-                ]
-            )
-        return resources, bindings
+        """
+        Parse a single cloud of a mapping, raising a CloudblocksValidationException with every error in it.
+        Params aren't checked, see `mapping_parser.parse_mapping` for the validation done before generating.
+        """
+        from models.mapping_parser import ParseResult, parse_cloud_mapping
 
-    @staticmethod
-    def _get_resource_from_key(resources: List[HighLevelResource], uid: str) -> HighLevelResource:
-        for resource in resources:
-            if resource.uid == uid:
-                return resource
-
-        raise KeyError(f"No resource with uid {uid} found")
+        result = ParseResult()
+        hl_map = parse_cloud_mapping(d, "", result.errors, check_params=False)
+        result.maps = [hl_map] if hl_map else []
+        return result.get_maps()[0]
 
     @property
-    def resources(self) -> List[HighLevelResource]:
-        return list(itertools.chain(*self.region_resources.values()))
+    def resources(self) -> ValuesView[HighLevelResource]:
+        # A live view of the index, rather than a list copied on every access
+        return self._resources.values()
 
     def __getitem__(self, item):
         return self.get(item)
 
     def get(self, uid: str, region: Optional[str] = None) -> HighLevelResource:
-        if region:
-            return self._get_resource_from_key(self.region_resources[region], uid)
+        resource = self._resources.get(uid)
+        if resource is None or (region and self._regions[uid] != region):
+            raise KeyError(f"No resource with uid {uid} found")
+
+        return resource
+
+    def get_region(self, uid: str) -> str:
+        if uid not in self._regions:
+            raise KeyError(f"No resource with uid {uid} found")
 
-        return self._get_resource_from_key(self.resources, uid)
+        return self._regions[uid]
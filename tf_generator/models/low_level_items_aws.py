@@ -1,31 +1,28 @@
 import os
 import uuid
 from dataclasses import dataclass
-from typing import Optional, Dict, Set, List
+from typing import TYPE_CHECKING, Optional, Dict, Set, List, Iterator, Tuple
 
 import petname
 from jinja2 import Template
 
 from config import TEMPLATES_DIR
 from models.data_model import ServiceTemplate
+from models.dependency_graph import DependencyGraph
+from models.exceptions import CloudblocksValidationException
 from template_loader import load_template
 
+if TYPE_CHECKING:
+    from models.fragment_cache import FragmentCache
+
 BASE_TEMPLATE_PATH = os.path.join(TEMPLATES_DIR, "base.tf.template")
 
 
 class TemplateLoader:
-    EC2 = os.path.join(TEMPLATES_DIR, "ec2/main.tf.template")
-    VPC = os.path.join(TEMPLATES_DIR, "vpc/main.tf.template")
-    DOCKER = os.path.join(TEMPLATES_DIR, "ecs/main.tf.template")
-    S3 = os.path.join(TEMPLATES_DIR, "s3/main.tf.template")
-
-
-class CloudblocksValidationException(Exception):
-    def __init__(self, message, errors=None):
-        super().__init__(message)
-        if errors is None:
-            errors = []
-        self.errors = errors
+    EC2 = "ec2/main.tf.template"
+    VPC = "vpc/main.tf.template"
+    DOCKER = "ecs/main.tf.template"
+    S3 = "s3/main.tf.template"
 
 
 @dataclass
@@ -46,6 +43,11 @@ class LowLevelAWSItem:
     variables: Template
     outputs: Template
 
+    @property
+    def file_name(self) -> str:
+        """File of this item's configuration, when a configuration is split into a file per item"""
+        return f"{type(self).__name__.lower()}-{self.uid}.tf"
+
     def generate_config(self) -> TerraformConfig:
         raise NotImplementedError()
 
@@ -224,6 +226,7 @@ class EC2Docker(LowLevelComputeItem):
         memory: Optional[int] = None,
         desired_count: Optional[int] = None,
         aws_ecs_cluster_name: Optional[str] = None,
+        task_definition_family_name: Optional[str] = None,
         ssh_pubkey: Optional[str] = None,
         needs_internet_access=False,
         linked_storage: Set[LowLevelStorageItem] = None,
@@ -246,7 +249,9 @@ class EC2Docker(LowLevelComputeItem):
         self.aws_ami = aws_ami
         self.image_regex = image_regex
         self.aws_ec2_instance_type = aws_ec2_instance_type
-        self.task_definition_family_name = f"taskdef-{new_id}-{petname.Generate(3)}"
+        if task_definition_family_name is None:
+            task_definition_family_name = f"taskdef-{new_id}-{petname.Generate(3)}"
+        self.task_definition_family_name = task_definition_family_name
         self.image_url = image_url
         if not cpu_cores:
             cpu_cores = 10
@@ -314,7 +319,8 @@ class S3(LowLevelStorageItem):
     ):
         if not depends_on:
             depends_on = set()
-        depends_on.add(logging_bucket)
+        if logging_bucket is not self:
+            depends_on.add(logging_bucket)
         self.logging_bucket = logging_bucket
         super().__init__(new_id, depends_on)
         self.template = load_template(TemplateLoader.S3)
@@ -367,52 +373,81 @@ class S3PublicWebsite(LowLevelStorageItem):
         return TerraformConfig(out_template, out_variables, out_outputs)
 
 
-def compile_item(compiled, item, out_outputs, out_template, out_variables):
-    if not compiled.get(item.uid):
-        config = item.generate_config()
-        out_template += config.main if config.main else ""
-        out_variables += config.variables if config.variables else ""
-        out_outputs += config.outputs if config.outputs else ""
-        compiled[item.uid] = True
-        return out_outputs, out_template, out_variables
-    else:
-        return out_outputs, out_template, out_variables
-
-
-class TerraformGeneratorAWS:
-    def __init__(self, ll_map: Dict[str, LowLevelAWSItem], ll_list: List[LowLevelAWSItem]):
-        self.ll_map = ll_map
-        self.ll_list = ll_list
+@dataclass
+class ServiceFragments:
+    """Rendered configuration of a group of items, kept as separate fragments rather than one string"""
 
-    def generate_string_template(self) -> ServiceTemplate:
-        compiled: Dict[str, bool] = {item.uid: False for item in self.ll_list}
-        out_template = ""
-        out_variables = ""
-        out_outputs = ""
+    service_name: str
+    template: List[str]
+    variables: List[str]
+    outputs: List[str]
 
-        for item in self.ll_list:
-            if len(item.depends_on) > 0:
-                for dep in item.depends_on:
-                    out_outputs, out_template, out_variables = compile_item(
-                        compiled, dep, out_outputs, out_template, out_variables
-                    )
-            # checking one more time in case it was already generated via dependencies
-            if not compiled[item.uid]:
-                out_outputs, out_template, out_variables = compile_item(
-                    compiled, item, out_outputs, out_template, out_variables
-                )
-
-        out = ServiceTemplate(
-            service_name="All services",
+    def to_service_template(self) -> ServiceTemplate:
+        return ServiceTemplate(
+            service_name=self.service_name,
             uri="",
             outputs_uri=None,
             variables_uri=None,
-            template=out_template,
-            variables=out_variables,
-            outputs=out_outputs,
+            template="".join(self.template),
+            variables="".join(self.variables),
+            outputs="".join(self.outputs),
         )
+
+
+class TerraformGeneratorAWS:
+    def __init__(
+        self,
+        ll_map: Dict[str, LowLevelAWSItem],
+        ll_list: List[LowLevelAWSItem],
+        fragment_cache: Optional["FragmentCache"] = None,
+        seed: Optional[str] = None,
+    ):
+        self.ll_map = ll_map
+        self.ll_list = ll_list
+        self.fragment_cache = fragment_cache
+        # Seed of the names generated for the items, keying their fragments
+        self.seed = seed
+        # Uids of the items rendered by the last generation, rather than reused from the fragment cache
+        self.rendered: List[str] = []
+
+    def generate_configs(self) -> Iterator[TerraformConfig]:
+        return (config for _, config in self.generate_item_configs())
+
+    def generate_item_configs(self) -> Iterator[Tuple[LowLevelAWSItem, TerraformConfig]]:
+        self.rendered = []
+        keys: Dict[str, str] = {}
+        for item in DependencyGraph(self.ll_list).topological_order():
+            if self.fragment_cache is None:
+                self.rendered.append(item.uid)
+                yield item, item.generate_config()
+                continue
+
+            # Dependencies come first in topological order, so their keys are known
+            key = self.fragment_cache.get_key(
+                item, (keys[dependency.uid] for dependency in item.depends_on), self.seed
+            )
+            keys[item.uid] = key
+            config = self.fragment_cache.get(key)
+            if config is None:
+                config = item.generate_config()
+                self.fragment_cache.set(key, config)
+                self.rendered.append(item.uid)
+            yield item, config
+
+    def generate_fragments(self) -> ServiceFragments:
+        out = ServiceFragments(service_name="All services", template=[], variables=[], outputs=[])
+        for config in self.generate_configs():
+            if config.main:
+                out.template.append(config.main)
+            if config.variables:
+                out.variables.append(config.variables)
+            if config.outputs:
+                out.outputs.append(config.outputs)
         return out
 
+    def generate_string_template(self) -> ServiceTemplate:
+        return self.generate_fragments().to_service_template()
+
 
 def generate_id() -> str:
     return uuid.uuid4().hex
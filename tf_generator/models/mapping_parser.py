@@ -0,0 +1,236 @@
+"""
+Single pass over a mapping that validates it and builds its HighLevelMaps at the same time.
+
+Every cloud, region, resource and binding is visited once: each resource is checked against the compiled resource
+and params schemas of `models/schemas.py` right before it is constructed, and bindings are resolved against the
+resources of their cloud. Errors are collected with their JSON pointer rather than raised at the first one.
+"""
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from config import get_cloud_provider_settings, get_resource_settings
+from models.data_model import ServiceProvider
+from models.exceptions import CloudblocksValidationException
+from models.high_level_items import HighLevelBinding, HighLevelBindingDirection, HighLevelMap, HighLevelResource
+from models.schema_compiler import CompiledSchema, ValidationError, compile_schema, escape_pointer
+from models.schemas import PARAMS_SCHEMAS, RESOURCE_ITEM_SCHEMA, get_cloud_regions
+from models.tf_type_mapping import ResourceCategory
+
+CLOUD_KEYS = frozenset(["cloud", "regions", "region", "resources"])
+REGION_KEYS = frozenset(["region", "resources"])
+
+
+@dataclass
+class ParseResult:
+    maps: List[HighLevelMap] = field(default_factory=list)
+    errors: List[ValidationError] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    @property
+    def message(self) -> Optional[str]:
+        return "\n".join(str(error) for error in self.errors) if self.errors else None
+
+    def get_maps(self) -> List[HighLevelMap]:
+        """The parsed maps, raising a CloudblocksValidationException with every error if the mapping is invalid"""
+        if self.errors:
+            raise CloudblocksValidationException(self.message, self.errors)
+        return self.maps
+
+
+@lru_cache(maxsize=None)
+def _get_resource_item_schema() -> CompiledSchema:
+    return compile_schema(RESOURCE_ITEM_SCHEMA)
+
+
+@lru_cache(maxsize=None)
+def _get_params_schemas() -> Dict[ResourceCategory, CompiledSchema]:
+    return {category: compile_schema(schema) for category, schema in PARAMS_SCHEMAS.items()}
+
+
+def parse_mapping(data: Union[Dict, List[Dict]], check_params: bool = True) -> ParseResult:
+    """
+    Parse a mapping, either a list of clouds or just the resources of the default cloud. With `check_params`,
+    the params of each resource are also checked against those its category needs to be generated.
+    """
+    result = ParseResult()
+    if isinstance(data, dict):
+        hl_map = _parse_resources_only(data, result.errors, check_params)
+        if hl_map:
+            result.maps.append(hl_map)
+    elif isinstance(data, list):
+        for i, cloud_mapping in enumerate(data):
+            hl_map = parse_cloud_mapping(cloud_mapping, f"/{i}", result.errors, check_params, require_cloud=True)
+            if hl_map:
+                result.maps.append(hl_map)
+    else:
+        result.errors.append(ValidationError("", f"{data!r} should be a list of clouds or an object of resources"))
+
+    if result.errors:
+        result.maps = []
+    return result
+
+
+def _parse_resources_only(data: Dict, errors: List[ValidationError], check_params: bool) -> Optional[HighLevelMap]:
+    cloud_provider = ServiceProvider.get(ServiceProvider.AWS.value)
+    region = get_cloud_provider_settings().get(cloud_provider).default_region
+    parser = _CloudParser(errors, check_params)
+    parser.add_region(region, data, "")
+    return parser.build(cloud_provider)
+
+
+def parse_cloud_mapping(
+    d: Any, path: str, errors: List[ValidationError], check_params: bool = True, require_cloud: bool = False
+) -> Optional[HighLevelMap]:
+    """Parse one cloud of a mapping, appending its errors. Returns None if it has any."""
+    if not isinstance(d, dict):
+        errors.append(ValidationError(path, f"{d!r} should be an object"))
+        return None
+    error_count = len(errors)
+    errors.extend(ValidationError(path, f"Wrong key {key!r}") for key in d if key not in CLOUD_KEYS)
+
+    cloud = d.get("cloud")
+    cloud_regions = get_cloud_regions()
+    if cloud is None:
+        if require_cloud:
+            errors.append(ValidationError(path, "Missing key 'cloud'"))
+        cloud = ServiceProvider.AWS.value
+    if not isinstance(cloud, str) or cloud not in cloud_regions:
+        errors.append(
+            ValidationError(
+                f"{path}/cloud", f"Cloud provider {cloud} not recognised. Valid clouds: {sorted(cloud_regions)}"
+            )
+        )
+        return None
+    cloud_provider = ServiceProvider.get(cloud)
+
+    parser = _CloudParser(errors, check_params)
+    if "regions" in d:
+        regions = d["regions"]
+        if not isinstance(regions, list):
+            errors.append(ValidationError(f"{path}/regions", f"{regions!r} should be a list"))
+            return None
+        for i, region_mapping in enumerate(regions):
+            _parse_region(parser, region_mapping, f"{path}/regions/{i}", cloud_regions[cloud], cloud)
+    else:
+        region = d.get("region", get_cloud_provider_settings().get(cloud_provider).default_region)
+        if not isinstance(region, str):
+            errors.append(ValidationError(f"{path}/region", f"{region!r} should be of type str"))
+            return None
+        parser.add_region(region, d.get("resources", {}), f"{path}/resources")
+
+    if len(errors) > error_count:
+        return None
+    return parser.build(cloud_provider)
+
+
+def _parse_region(parser: "_CloudParser", d: Any, path: str, cloud_regions, cloud: str):
+    errors = parser.errors
+    if not isinstance(d, dict):
+        errors.append(ValidationError(path, f"{d!r} should be an object"))
+        return
+    errors.extend(ValidationError(path, f"Wrong key {key!r}") for key in d if key not in REGION_KEYS)
+    region = d.get("region")
+    if region is None:
+        errors.append(ValidationError(path, "Missing key 'region'"))
+        return
+    if region not in cloud_regions:
+        errors.append(
+            ValidationError(
+                f"{path}/region",
+                f"Region {region} not recognised for cloud provider {cloud}. Valid regions: {sorted(cloud_regions)}",
+            )
+        )
+        return
+    if region in parser.region_resources:
+        errors.append(ValidationError(f"{path}/region", f"Region {region} of cloud {cloud} is defined more than once"))
+        return
+    parser.add_region(region, d.get("resources", {}), f"{path}/resources")
+
+
+class _CloudParser:
+    """Resources of one cloud, with their bindings resolved once every region has been added"""
+
+    def __init__(self, errors: List[ValidationError], check_params: bool = True):
+        self.errors = errors
+        self.check_params = check_params
+        self.region_resources: Dict[str, List[HighLevelResource]] = {}
+        self.resources: Dict[str, Tuple[HighLevelResource, str]] = {}
+        self.bindings: List[Tuple[HighLevelResource, List, str]] = []
+
+    def add_region(self, region: str, resources: Any, path: str):
+        region_resources = self.region_resources.setdefault(region, [])
+        if not isinstance(resources, dict):
+            self.errors.append(ValidationError(path, f"{resources!r} should be an object"))
+            return
+        for uid, d in resources.items():
+            resource_path = f"{path}/{escape_pointer(uid)}"
+            resource = self._parse_resource(uid, d, resource_path)
+            if resource is None:
+                continue
+            if uid in self.resources:
+                self.errors.append(
+                    ValidationError(
+                        resource_path,
+                        f"Duplicate resource uid {uid} found in regions {self.resources[uid][1]} and {region}",
+                    )
+                )
+                continue
+            self.resources[uid] = (resource, region)
+            region_resources.append(resource)
+            self.bindings.append((resource, d.get("bindings") or [], resource_path))
+
+    def _parse_resource(self, uid: Any, d: Any, path: str) -> Optional[HighLevelResource]:
+        errors = _get_resource_item_schema().errors(d)
+        if not isinstance(uid, str):
+            errors.append(ValidationError(path, f"Resource uid {uid!r} should be of type str"))
+        if errors:
+            self.errors.extend(ValidationError(path + error.path, error.message) for error in errors)
+            return None
+
+        key = str(d["resource"])
+        try:
+            details = get_resource_settings().get(key)
+        except KeyError as e:
+            self.errors.append(ValidationError(f"{path}/resource", str(e.args[0])))
+            return None
+
+        params = d.get("params") or {}
+        params_schema = _get_params_schemas().get(details.category) if self.check_params else None
+        if params_schema:
+            params_errors = params_schema.errors(params)
+            if params_errors:
+                self.errors.extend(
+                    ValidationError(f"{path}/params" + error.path, error.message) for error in params_errors
+                )
+                return None
+        return HighLevelResource(uid=uid, key=key, params=params, details=details)
+
+    def build(self, cloud_provider: ServiceProvider) -> Optional[HighLevelMap]:
+        for resource, bindings, path in self.bindings:
+            for i, binding in enumerate(bindings):
+                binding_path = f"{path}/bindings/{i}"
+                target = self.resources.get(binding["id"])
+                if target is None:
+                    self.errors.append(
+                        ValidationError(f"{binding_path}/id", f"No resource with uid {binding['id']} found")
+                    )
+                    continue
+                direction = HighLevelBindingDirection.match_string(str(binding["direction"]))
+                self._check_binding(resource, target[0], direction, binding_path)
+                resource.bindings.append(HighLevelBinding(direction=direction, target=target[0]))
+        if self.errors:
+            return None
+        return HighLevelMap(cloud_provider, self.region_resources)
+
+    def _check_binding(
+        self, resource: HighLevelResource, target: HighLevelResource, direction: HighLevelBindingDirection, path: str
+    ):
+        if resource.category == ResourceCategory.STORAGE:
+            if direction == HighLevelBindingDirection.TO:
+                self.errors.append(ValidationError(f"{path}/direction", "Storage item cannot bind TO another element"))
+            if target.category == ResourceCategory.DATABASE:
+                self.errors.append(ValidationError(f"{path}/id", "Storage item cannot bind with a database"))
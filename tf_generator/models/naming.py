@@ -0,0 +1,72 @@
+import hashlib
+import json
+import uuid
+from typing import Any, Optional, Tuple
+
+import petname
+
+# Same word lists and length limit as petname.Generate(3)
+PETNAME_MAX_LETTERS = 6
+PETNAME_WORDS = tuple(
+    tuple(word for word in words if len(word) <= PETNAME_MAX_LETTERS)
+    for words in (petname.adverbs, petname.adjectives, petname.names)
+)
+
+
+class NameGenerator:
+    """
+    Source of the ids and name suffixes generated for low-level items.
+
+    Unseeded, ids are random uuids and suffixes random petnames, as before. Seeded, every id and suffix is derived
+    from the seed and the path it is generated for (scope + role + resource uid), so identical inputs render
+    byte-identical output.
+    """
+
+    def __init__(self, seed: Optional[str] = None, scope: Tuple[str, ...] = ()):
+        self.seed = seed
+        self.scope = scope
+
+    @property
+    def is_deterministic(self) -> bool:
+        return self.seed is not None
+
+    @classmethod
+    def from_mapping(cls, mapping: Any, seed: Optional[str] = None) -> "NameGenerator":
+        """
+        Deterministic names for the given mapping. Without an explicit seed, names are derived from the mapping
+        content, so any change to the mapping changes them; pass a seed to keep names stable across edits.
+        """
+        if seed is None:
+            seed = mapping_digest(mapping)
+        return cls(seed)
+
+    def scoped(self, *scope: str) -> "NameGenerator":
+        return NameGenerator(self.seed, self.scope + scope)
+
+    def _digest(self, path: Tuple[str, ...]) -> bytes:
+        key = "\0".join((self.seed,) + self.scope + path)
+        return hashlib.sha256(key.encode("utf-8")).digest()
+
+    def generate_id(self, *path: str) -> str:
+        if not self.is_deterministic:
+            return uuid.uuid4().hex
+        return self._digest(("id",) + path).hex()[:32]
+
+    def generate_suffix(self, *path: str) -> str:
+        if not self.is_deterministic:
+            return petname.Generate(3)
+        digest = self._digest(("suffix",) + path)
+        return "-".join(
+            words[int.from_bytes(digest[i * 4 : i * 4 + 4], "big") % len(words)]
+            for i, words in enumerate(PETNAME_WORDS)
+        )
+
+    def generate_name(self, prefix: str, uid: str) -> str:
+        """Globally unique resource name, e.g. "s3-<uid>-<suffix>" """
+        return f"{prefix}-{uid}-{self.generate_suffix(prefix, uid)}"
+
+
+def mapping_digest(mapping: Any) -> str:
+    """Stable hash of a mapping's content, independent of key order"""
+    canonical = json.dumps(mapping, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
@@ -0,0 +1,299 @@
+"""
+Compiles `schema` library definitions into nested checking functions.
+
+The `schema` library interprets a definition on every call, tries every branch of an `Or` and stops at the first
+error. Compiled checkers dispatch on precomputed key sets once per definition, pick the `Or` branch matching the
+type of the data, and collect every error with the JSON pointer of the value it applies to. Like the `schema`
+library, custom `error` messages are formatted with the value they apply to.
+"""
+from typing import Any, Callable, Dict, List, NamedTuple, Optional as TypingOptional, Tuple
+
+from schema import And, Optional, Or, Schema, Use
+
+
+class ValidationError(NamedTuple):
+    path: str
+    message: str
+
+    def __str__(self) -> str:
+        return f"{self.path or '/'}: {self.message}"
+
+
+# Returns the validated (and converted) value, or INVALID after appending to the errors
+Checker = Callable[[Any, str, List[ValidationError]], Any]
+INVALID = object()
+ITERABLE_TYPES = (list, tuple, set, frozenset)
+
+
+class OneOf:
+    """Predicate accepting any of a fixed set of values, which the compiler turns into a frozenset lookup"""
+
+    def __init__(self, values, name: str = "value"):
+        self.values = frozenset(values)
+        self.name = name
+
+    def __call__(self, value) -> bool:
+        return value in self.values
+
+    def __repr__(self) -> str:
+        return f"OneOf({sorted(self.values)})"
+
+
+class ExtraCheck:
+    """
+    Mixin for `Schema` subclasses with checks beyond their definition, returning (relative pointer, message) pairs
+    for the compiled validator to report alongside the errors of the definition.
+    """
+
+    def extra_errors(self, data: Dict) -> List[Tuple[str, str]]:
+        return []
+
+
+def escape_pointer(key: Any) -> str:
+    return str(key).replace("~", "~0").replace("/", "~1")
+
+
+class CompiledSchema:
+    def __init__(self, schema: Any):
+        self.schema = schema
+        self._check = _compile(schema)
+
+    def errors(self, data: Any) -> List[ValidationError]:
+        errors: List[ValidationError] = []
+        self._check(data, "", errors)
+        return errors
+
+    def is_valid(self, data: Any) -> bool:
+        return not self.errors(data)
+
+
+def compile_schema(schema: Any) -> CompiledSchema:
+    return CompiledSchema(schema)
+
+
+def _compile(schema: Any) -> Checker:
+    if isinstance(schema, Or):
+        return _compile_or(schema)
+    if isinstance(schema, And):
+        return _compile_and(schema)
+    if isinstance(schema, Use):
+        return _compile_use(schema)
+    if isinstance(schema, Schema):
+        return _compile_schema(schema)
+    if isinstance(schema, dict):
+        return _compile_dict(schema)
+    if isinstance(schema, ITERABLE_TYPES):
+        return _compile_iterable(schema)
+    if isinstance(schema, type):
+        return _compile_type(schema)
+    if isinstance(schema, OneOf):
+        return _compile_one_of(schema)
+    if callable(schema):
+        return _compile_predicate(schema)
+    return _compile_literal(schema)
+
+
+def _get_root_types(schema: Any) -> TypingOptional[Tuple[type, ...]]:
+    """Types the data must have to possibly match, used to choose which `Or` branch to report errors for"""
+    if isinstance(schema, Or):
+        return None
+    if isinstance(schema, And):
+        return _get_root_types(schema._args[0]) if schema._args else None
+    if isinstance(schema, Use):
+        return None
+    if isinstance(schema, Schema):
+        return _get_root_types(schema._schema)
+    if isinstance(schema, dict):
+        return (dict,)
+    if isinstance(schema, ITERABLE_TYPES):
+        return (type(schema),)
+    if isinstance(schema, type):
+        return (schema,)
+    return None
+
+
+def _compile_schema(schema: Schema) -> Checker:
+    check = _compile(schema._schema)
+    if not isinstance(schema, ExtraCheck):
+        return check
+
+    def check_extra(data, path, errors):
+        error_count = len(errors)
+        value = check(data, path, errors)
+        if isinstance(data, dict):
+            errors.extend(ValidationError(path + pointer, message) for pointer, message in schema.extra_errors(data))
+        return INVALID if len(errors) > error_count else value
+
+    return check_extra
+
+
+def _compile_or(schema: Or) -> Checker:
+    branches = [(_compile(arg), _get_root_types(arg)) for arg in schema._args]
+    message = schema._error
+
+    def check_or(data, path, errors):
+        candidate_errors = None
+        for check, root_types in branches:
+            branch_errors: List[ValidationError] = []
+            value = check(data, path, branch_errors)
+            if not branch_errors:
+                return value
+            if candidate_errors is None and (root_types is None or isinstance(data, root_types)):
+                candidate_errors = branch_errors
+        if message:
+            errors.append(ValidationError(path, message.format(data)))
+        elif candidate_errors is None:
+            errors.append(ValidationError(path, f"{data!r} does not match any of the allowed types"))
+        else:
+            errors.extend(candidate_errors)
+        return INVALID
+
+    return check_or
+
+
+def _compile_and(schema: And) -> Checker:
+    checks = [_compile(arg) for arg in schema._args]
+    message = schema._error
+
+    def check_and(data, path, errors):
+        for check in checks:
+            check_errors: List[ValidationError] = []
+            value = check(data, path, check_errors)
+            if check_errors:
+                errors.extend([ValidationError(path, message.format(data))] if message else check_errors)
+                return INVALID
+            data = value
+        return data
+
+    return check_and
+
+
+def _compile_use(schema: Use) -> Checker:
+    function = schema._callable
+    message = schema._error
+
+    def check_use(data, path, errors):
+        try:
+            return function(data)
+        except Exception as e:
+            errors.append(
+                ValidationError(path, message.format(data) if message else f"{function!r}({data!r}) raised {e!r}")
+            )
+            return INVALID
+
+    return check_use
+
+
+def _compile_dict(schema: Dict) -> Checker:
+    literal_keys: Dict[Any, Checker] = {}
+    type_keys: List[Tuple[Any, Checker]] = []
+    required = []
+    for key, value_schema in schema.items():
+        is_optional = isinstance(key, Optional)
+        key_schema = key._schema if is_optional else key
+        check_value = _compile(value_schema)
+        if isinstance(key_schema, type):
+            type_keys.append((key_schema, check_value))
+        else:
+            literal_keys[key_schema] = check_value
+        if not is_optional:
+            required.append(key_schema)
+    required_literals = frozenset(key for key in required if not isinstance(key, type))
+    required_types = tuple(key for key in required if isinstance(key, type))
+    type_key_tuple = tuple(key for key, _ in type_keys)
+
+    def check_dict(data, path, errors):
+        if not isinstance(data, dict):
+            errors.append(ValidationError(path, f"{data!r} should be an object"))
+            return INVALID
+        error_count = len(errors)
+        covered_types = set()
+        for key, value in data.items():
+            check_value = literal_keys.get(key)
+            if check_value is None and type_key_tuple and isinstance(key, type_key_tuple):
+                for key_type, check_type_value in type_keys:
+                    if isinstance(key, key_type):
+                        check_value = check_type_value
+                        covered_types.add(key_type)
+                        break
+            if check_value is None:
+                errors.append(ValidationError(path, f"Wrong key {key!r}"))
+                continue
+            check_value(value, f"{path}/{escape_pointer(key)}", errors)
+        for key in sorted(required_literals - data.keys(), key=str):
+            errors.append(ValidationError(path, f"Missing key {key!r}"))
+        for key_type in required_types:
+            if key_type not in covered_types:
+                errors.append(ValidationError(path, f"Missing key of type {key_type.__name__}"))
+        return INVALID if len(errors) > error_count else data
+
+    return check_dict
+
+
+def _compile_iterable(schema) -> Checker:
+    iterable_type = type(schema)
+    check_item = _compile(Or(*schema)) if len(schema) != 1 else _compile(next(iter(schema)))
+
+    def check_iterable(data, path, errors):
+        if not isinstance(data, iterable_type):
+            errors.append(ValidationError(path, f"{data!r} should be a {iterable_type.__name__}"))
+            return INVALID
+        error_count = len(errors)
+        for i, item in enumerate(data):
+            check_item(item, f"{path}/{i}", errors)
+        return INVALID if len(errors) > error_count else data
+
+    return check_iterable
+
+
+def _compile_type(schema: type) -> Checker:
+    if schema is object:
+        return lambda data, path, errors: data
+
+    def check_type(data, path, errors):
+        # Like the schema library, booleans aren't accepted as integers
+        if isinstance(data, schema) and not (schema is int and isinstance(data, bool)):
+            return data
+        errors.append(ValidationError(path, f"{data!r} should be of type {schema.__name__}"))
+        return INVALID
+
+    return check_type
+
+
+def _compile_one_of(schema: OneOf) -> Checker:
+    values = schema.values
+    message = f"should be a {schema.name}, one of {sorted(str(value) for value in values)}"
+
+    def check_one_of(data, path, errors):
+        try:
+            if data in values:
+                return data
+        except TypeError:
+            pass
+        errors.append(ValidationError(path, f"{data!r} {message}"))
+        return INVALID
+
+    return check_one_of
+
+
+def _compile_predicate(schema: Callable) -> Checker:
+    def check_predicate(data, path, errors):
+        try:
+            if schema(data):
+                return data
+        except Exception:
+            pass
+        errors.append(ValidationError(path, f"{data!r} should satisfy {getattr(schema, '__name__', schema)!r}"))
+        return INVALID
+
+    return check_predicate
+
+
+def _compile_literal(schema: Any) -> Checker:
+    def check_literal(data, path, errors):
+        if data == schema:
+            return data
+        errors.append(ValidationError(path, f"{data!r} should be {schema!r}"))
+        return INVALID
+
+    return check_literal
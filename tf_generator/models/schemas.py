@@ -1,67 +1,175 @@
-from typing import Dict
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Tuple
 
 from schema import Schema, And, Use, Optional, Or, SchemaError
 
-from config import CLOUD_PROVIDER_SETTINGS
+from config import get_cloud_provider_settings, get_resource_settings
 from models.data_model import ResourceCategory
 from models.high_level_items import HIGH_LEVEL_BINDING_DIRECTIONS
+from models.schema_compiler import ExtraCheck, OneOf
 
 DEFAULT_PROVIDER = "aws"
 
 
-class CloudSchema(Schema):
+@lru_cache(maxsize=None)
+def get_cloud_regions() -> Dict[str, FrozenSet[str]]:
+    cloud_provider_settings = get_cloud_provider_settings()
+    return {
+        cloud: frozenset(cloud_provider_settings.get(cloud).regions) for cloud in cloud_provider_settings.providers
+    }
+
+
+@lru_cache(maxsize=None)
+def get_resource_keys() -> FrozenSet[str]:
+    return frozenset(resource.key for resource in get_resource_settings().resources)
+
+
+def is_resource_key(key: str) -> bool:
+    # Keys of the catalog are looked up case-insensitively
+    return key.lower() in get_resource_keys()
+
+
+class CloudSchema(ExtraCheck, Schema):
     def validate(self, data: Dict, _is_region_schema=True, **kwargs):
         # TODO: set defaults by per-client feature flag
         super(CloudSchema, self).validate(data, _is_region_schema=False, kwargs=kwargs)
         if not _is_region_schema:  # Needed to avoid improper recursion
             return data
 
+        errors = self.extra_errors(data)
+        if errors:
+            raise SchemaError(errors[0][1])
+        return data
+
+    def extra_errors(self, data: Dict) -> List[Tuple[str, str]]:
+        cloud_regions = get_cloud_regions()
         cloud_provider = data.get("cloud")
         if not cloud_provider:
             cloud_provider = DEFAULT_PROVIDER
 
-        if cloud_provider not in CLOUD_PROVIDER_SETTINGS.providers:
-            raise SchemaError(
-                f"Cloud provider {cloud_provider} not recognised. Valid clouds: {CLOUD_PROVIDER_SETTINGS.providers}"
+        if cloud_provider not in cloud_regions:
+            return [
+                (
+                    "/cloud",
+                    f"Cloud provider {cloud_provider} not recognised. Valid clouds: {sorted(cloud_regions)}",
+                )
+            ]
+
+        regions = data.get("regions")
+        if not isinstance(regions, list):
+            return []
+
+        cloud_provider_regions = cloud_regions[cloud_provider]
+        invalid_regions = [
+            (i, d.get("region"))
+            for i, d in enumerate(regions)
+            if isinstance(d, dict) and d.get("region") not in cloud_provider_regions
+        ]
+        if invalid_regions:
+            message = (
+                f"Regions {[region for _, region in invalid_regions]} not recognised for cloud provider "
+                f"{cloud_provider}. Valid regions: {sorted(cloud_provider_regions)}"
             )
+            return [(f"/regions/{i}/region", message) for i, _ in invalid_regions]
+        return []
 
-        if "regions" not in data:
-            return data
 
-        cloud_provider_regions = CLOUD_PROVIDER_SETTINGS.get(cloud_provider).regions
-        invalid_regions = []
-        for d in data.get("regions"):
-            region = d.get("region")
-            if region not in cloud_provider_regions:
-                invalid_regions.append(region)
+BINDING_SCHEMA = {
+    "id": str,
+    "direction": And(Use(str), OneOf(HIGH_LEVEL_BINDING_DIRECTIONS, "binding direction")),
+}
+
+RESOURCE_ITEM_SCHEMA = {
+    "resource": And(str, is_resource_key, error="No resource with key {} found"),
+    Optional("bindings"): Optional([BINDING_SCHEMA]),
+    Optional("params"): Or({str: object}, {}),
+}
+
+RESOURCE_SCHEMA = Schema({str: RESOURCE_ITEM_SCHEMA})
 
-        if invalid_regions:
-            raise SchemaError(
-                f"""Regions {invalid_regions} not recognised for cloud provider {cloud_provider}.
-                Valid regions:{cloud_provider_regions}"""
-            )
 
+class ParamsSchema(ExtraCheck, Schema):
+    """Params of a resource category, of which at least one of `required_any` must be given"""
+
+    def __init__(self, schema, required_any: Tuple[str, ...] = (), **kwargs):
+        super().__init__(schema, **kwargs)
+        self.required_any = required_any
+
+    def validate(self, data: Dict, **kwargs):
+        super().validate(data, **kwargs)
+        errors = self.extra_errors(data)
+        if errors:
+            raise SchemaError(errors[0][1])
         return data
 
+    def extra_errors(self, data: Dict) -> List[Tuple[str, str]]:
+        if self.required_any and not any(key in data for key in self.required_any):
+            return [("", f"One of the params {list(self.required_any)} is required")]
+        return []
 
-BINDING_SCHEMA = {
-    "id": str,
-    "direction": And(Use(str), lambda s: s in HIGH_LEVEL_BINDING_DIRECTIONS),
-}
 
-RESOURCE_SCHEMA = Schema(
+def is_numeric(value) -> bool:
+    return str(value).isnumeric()
+
+
+IS_PUBLIC_SCHEMA = OneOf(["true", "false"], "boolean string")
+IMAGE_PARAMS = ("aws_ami", "image_regex")
+
+COMPUTE_PARAMS_SCHEMA = ParamsSchema(
+    {
+        Optional("is_public"): IS_PUBLIC_SCHEMA,
+        Optional("az_count"): is_numeric,
+        Optional("aws_ami"): str,
+        Optional("image_regex"): str,
+        "aws_instance_type": str,
+        Optional("instance_count"): is_numeric,
+        Optional("init_script"): str,
+        Optional("public_key"): str,
+        Optional("public_key_path"): str,
+        Optional(str): object,
+    },
+    required_any=IMAGE_PARAMS,
+)
+
+DOCKER_PARAMS_SCHEMA = ParamsSchema(
     {
-        str: {
-            "resource": And(
-                Use(str),
-                Use(lambda s: s in ResourceCategory.values(), error=f'"Resource not recognised as valid resource'),
-            ),
-            Optional("bindings"): Optional([BINDING_SCHEMA]),
-            Optional("params"): Or({str: object}, {}),
-        }
+        Optional("is_public"): IS_PUBLIC_SCHEMA,
+        Optional("az_count"): is_numeric,
+        Optional("aws_ecs_cluster_name"): str,
+        Optional("aws_ami"): str,
+        Optional("image_regex"): str,
+        "aws_instance_type": str,
+        "image_url": str,
+        "container_name": str,
+        Optional("cpu_cores"): is_numeric,
+        Optional("memory"): is_numeric,
+        Optional("desired_count"): is_numeric,
+        "healthcheck_path": str,
+        "autoscale_min": is_numeric,
+        "autoscale_max": is_numeric,
+        "autoscale_target": is_numeric,
+        Optional("ssh_pubkey"): str,
+        "volume_path": str,
+        "volume_name": str,
+        Optional(str): object,
+    },
+    required_any=IMAGE_PARAMS,
+)
+
+STORAGE_PARAMS_SCHEMA = ParamsSchema(
+    {
+        Optional("bucket_name"): str,
+        Optional(str): object,
     }
 )
 
+# Params the generator relies on, by category of resource
+PARAMS_SCHEMAS = {
+    ResourceCategory.COMPUTE: COMPUTE_PARAMS_SCHEMA,
+    ResourceCategory.DOCKER: DOCKER_PARAMS_SCHEMA,
+    ResourceCategory.STORAGE: STORAGE_PARAMS_SCHEMA,
+}
+
 NETWORK_SCHEMA = {
     "id": str,
     Optional("availability_zones"): [str],
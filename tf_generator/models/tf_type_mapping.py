@@ -1,5 +1,6 @@
+import re
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Union
+from typing import Dict, List, Optional, Union, Set, Iterable
 
 from models.data_model import ServiceProvider, ResourceCategory
 from models.utils import JsonSerialisable
@@ -75,23 +76,133 @@ class ResourceDetails(JsonSerialisable):
             or keyword in resource.tags
             or keyword in resource.clouds
             or keyword in resource.description.lower()
-            or keyword in resource.params
+            or keyword in resource.param_names
         )
 
+    @property
+    def param_names(self) -> List[str]:
+        return [param["param"] for param in self.params if isinstance(param, dict) and "param" in param]
+
+
+NGRAM_SIZE = 3
+
+
+def _tokenise(text: str) -> List[str]:
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+class ResourceIndex:
+    """
+    Lookup and search indexes over the resource catalog, built once when the catalog is loaded.
+
+    Keyword search narrows candidates down through an inverted index of the tokens of every searchable field, and
+    of the n-grams of those tokens to find the tokens a keyword is part of, then confirms them against
+    `ResourceDetails.matches_keyword` semantics using precomputed lowercase fields.
+    """
+
+    def __init__(self, resources: List[ResourceDetails]):
+        self.by_key: Dict[str, ResourceDetails] = {}
+        self.by_tag: Dict[str, Set[str]] = {}
+        self.by_cloud: Dict[str, Set[str]] = {}
+        self.tokens: Dict[str, Set[str]] = {}
+        self.position: Dict[str, int] = {}
+        self.sort_rank: Dict[str, int] = {}
+        self._descriptions: Dict[str, str] = {}
+        # Substrings of up to NGRAM_SIZE characters of every indexed token, to the tokens containing them
+        self.ngrams: Dict[str, Set[str]] = {}
+
+        for position, resource in enumerate(resources):
+            self.by_key.setdefault(resource.key, resource)
+            self.position.setdefault(resource.key, position)
+            self._descriptions[resource.key] = resource.description.lower()
+            for tag in resource.tags:
+                self.by_tag.setdefault(tag, set()).add(resource.key)
+            for cloud in resource.clouds:
+                self.by_cloud.setdefault(cloud.value, set()).add(resource.key)
+
+            fields = [
+                resource.key,
+                resource.category.value,
+                resource.description,
+                *resource.tags,
+                *resource.param_names,
+            ]
+            fields.extend(cloud.value for cloud in resource.clouds)
+            for field in fields:
+                for token in _tokenise(field):
+                    self.tokens.setdefault(token, set()).add(resource.key)
+
+        for token in self.tokens:
+            for size in range(1, NGRAM_SIZE + 1):
+                for start in range(len(token) - size + 1):
+                    self.ngrams.setdefault(token[start : start + size], set()).add(token)
+
+        for rank, key in enumerate(sorted(self.by_key)):
+            self.sort_rank[key] = rank
+
+    def _token_candidates(self, token: str) -> Set[str]:
+        if len(token) <= NGRAM_SIZE:
+            indexed_tokens = self.ngrams.get(token, set())
+        else:
+            # Tokens containing every n-gram of a longer token may still not contain the token itself
+            ngram_tokens = [
+                self.ngrams.get(token[i : i + NGRAM_SIZE], set()) for i in range(len(token) - NGRAM_SIZE + 1)
+            ]
+            indexed_tokens = {indexed for indexed in set.intersection(*ngram_tokens) if token in indexed}
+
+        candidates = set()
+        for indexed_token in indexed_tokens:
+            candidates.update(self.tokens[indexed_token])
+        return candidates
+
+    def _matches_keyword(self, key: str, keyword: str) -> bool:
+        resource = self.by_key[key]
+        return (
+            keyword == key
+            or keyword in resource.category
+            or keyword in resource.tags
+            or keyword in resource.clouds
+            or keyword in self._descriptions[key]
+            or keyword in resource.param_names
+        )
+
+    def match_keyword(self, keyword: str) -> Set[str]:
+        keyword = keyword.lower()
+        tokens = _tokenise(keyword)
+        if tokens:
+            # Every token of a matching keyword is part of some indexed token of the resource
+            candidates = set.intersection(*(self._token_candidates(token) for token in tokens))
+        else:
+            candidates = set(self.by_key)
+
+        return {key for key in candidates if self._matches_keyword(key, keyword)}
+
+    def match_cloud(self, cloud: str) -> Set[str]:
+        return self.by_cloud.get(cloud, set())
+
+    def match_tag(self, tag: str) -> Set[str]:
+        return self.by_tag.get(tag, set())
+
+    def ordered(self, keys: Iterable[str], sort_results: bool) -> List[ResourceDetails]:
+        rank = self.sort_rank if sort_results else self.position
+        return [self.by_key[key] for key in sorted(keys, key=rank.__getitem__)]
+
 
 @dataclass
 class ResourceMap(JsonSerialisable):
     resources: List[ResourceDetails]
 
+    def __post_init__(self):
+        self._index = ResourceIndex(self.resources)
+
     @classmethod
     def from_dict(cls, d: Union[List, Dict]):
         return cls(resources=[ResourceDetails.from_dict(x) for x in d])
 
     def get(self, key: str) -> ResourceDetails:
         key = key.lower()
-        for resource in self.resources:
-            if resource.key == key:
-                return resource
+        if key in self._index.by_key:
+            return self._index.by_key[key]
 
         raise KeyError(f"No resource with key {key} found")
 
@@ -107,23 +218,19 @@ class ResourceMap(JsonSerialisable):
         if not results:
             raise KeyError("No resources found matching your search")
 
-        if sort_results and results:
-            return sorted(list(results))
-
-        return list(results)
+        return self._index.ordered(results, sort_results)
 
-    def _filter_resources(self, keyword, cloud, tags):
-        results = self.resources
+    def _filter_resources(self, keyword, cloud, tags) -> Set[str]:
+        results = set(self._index.by_key)
 
         if keyword:
-            keyword = keyword.lower()
-            results = filter(lambda x: ResourceDetails.matches_keyword(x, keyword), self.resources)
+            results &= self._index.match_keyword(keyword)
 
         if cloud:
-            results = filter(lambda x: ResourceDetails.matches_cloud(x, cloud), results)
+            results &= self._index.match_cloud(cloud)
 
         if tags:
             for tag in tags:
-                results = filter(lambda x: ResourceDetails.matches_tag(x, tag), results)
+                results &= self._index.match_tag(tag)
 
         return results
@@ -4,8 +4,6 @@ from enum import Enum
 from itertools import chain
 from typing import Dict
 
-import yaml
-
 
 @dataclass
 class JsonSerialisable:
@@ -35,4 +33,6 @@ class JsonSerialisable:
         return json.dumps(self.to_dict())
 
     def to_yaml(self) -> str:
+        import yaml
+
         return yaml.dump(self.to_dict())
@@ -0,0 +1,109 @@
+"""
+Actions shared by the CLI and the API handler.
+
+Heavy dependencies (Jinja, the schema library, the model stack) are imported inside each action rather than at
+module level, so that importing this module - and `api_handler` with it - stays cheap on Lambda cold starts.
+"""
+from concurrent.futures import Executor
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+if TYPE_CHECKING:
+    from build_cache import BuildCache
+    from models.fragment_cache import FragmentCache
+    from models.high_level_items import HighLevelMap
+    from models.mapping_parser import ParseResult
+
+
+def build(data: Union[Dict, List[Dict]]) -> str:
+    return "".join(build_chunks(data))
+
+
+def build_chunks(data: Union[Dict, List[Dict]]) -> Iterator[str]:
+    from generator import get_engine
+
+    return get_engine().new_generator().generate_template_chunks(data)
+
+
+def create_fragment_cache(seed: Optional[str] = None) -> "FragmentCache":
+    """Fragment cache for incremental builds, holding up to FRAGMENT_CACHE_MAX_ENTRIES fragments in memory"""
+    from build_cache import MemoryCacheStore, get_catalog_version
+    from config import FRAGMENT_CACHE_MAX_ENTRIES
+    from models.fragment_cache import FragmentCache
+
+    return FragmentCache(MemoryCacheStore(FRAGMENT_CACHE_MAX_ENTRIES, ttl=None), get_catalog_version(), seed)
+
+
+def build_regions(
+    data: Union[Dict, List[Dict]],
+    executor: Optional[Executor] = None,
+    deterministic: bool = False,
+    seed: Optional[str] = None,
+    cache: Optional["BuildCache"] = None,
+    hl_maps: Optional[List["HighLevelMap"]] = None,
+) -> Dict[str, Iterable[str]]:
+    """
+    Build every region of the mapping. Pass the maps returned by `parse` to not parse the mapping again.
+    Only deterministic or seeded builds go through `cache`, as other builds must generate new names every time.
+    Cached builds are stored, and so returned, as one string per region rather than streamed.
+    """
+    from generator import get_engine
+
+    engine = get_engine()
+    if cache is None or not (deterministic or seed is not None):
+        return engine.build(data, executor, deterministic, seed, hl_maps)
+
+    def _build_joined() -> Dict[str, str]:
+        region_templates = engine.build(data, executor, deterministic, seed, hl_maps)
+        return {key: "".join(template) for key, template in region_templates.items()}
+
+    region_templates = cache.get_or_build(data, _build_joined, deterministic=deterministic, seed=seed)
+    return {key: [template] for key, template in region_templates.items()}
+
+
+def build_files(
+    data: Union[Dict, List[Dict]],
+    deterministic: bool = False,
+    seed: Optional[str] = None,
+    hl_maps: Optional[List["HighLevelMap"]] = None,
+    split_items: bool = False,
+) -> Dict[str, Dict[str, str]]:
+    """Build every region of the mapping split into files, by file name, with a file per item if `split_items`"""
+    from generator import get_engine
+
+    return get_engine().build_files(data, deterministic, seed, hl_maps, split_items)
+
+
+def build_incremental(
+    data: Union[Dict, List[Dict]],
+    fragment_cache: "FragmentCache",
+    seed: Optional[str] = None,
+    hl_maps: Optional[List["HighLevelMap"]] = None,
+) -> Tuple[Dict[str, str], Dict[str, List[str]]]:
+    """Build every region, re-rendering only the items changed since the previous build with the same cache"""
+    from generator import render_regions_incremental
+
+    return render_regions_incremental(data, fragment_cache, seed, hl_maps)
+
+
+def graph(data: Union[Dict, List[Dict]]):
+    from generator import TerraformGenerator
+
+    return TerraformGenerator().generate_dependency_graph(data)
+
+
+def parse(data: Union[Dict, List[Dict]]) -> "ParseResult":
+    """Validate the mapping and build its maps in a single pass, collecting every error"""
+    from models.mapping_parser import parse_mapping
+
+    return parse_mapping(data)
+
+
+def validate(data: Union[Dict, List[Dict]]) -> Tuple[bool, Optional[str]]:
+    result = parse(data)
+    return result.ok, result.message
+
+
+def search(keyword: Optional[str], cloud: Optional[str], tags: Optional[List[str]]) -> List:
+    from config import get_resource_settings
+
+    return get_resource_settings().search(keyword, cloud, tags)
@@ -0,0 +1,119 @@
+"""
+Per-phase profiling of a build, to tell where a slow build spends its time.
+
+Callers time their own steps (loading, parsing, writing) with `BuildProfiler.phase`, and build through
+`BuildProfiler.build`, which maps and renders each region sequentially and without caches so that the low-level
+mapping and the rendering are timed apart and comparable between runs.
+"""
+import cProfile
+import io
+import pstats
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Union
+
+from generator import get_engine, get_regions
+from models.high_level_items import HighLevelMap
+from models.naming import NameGenerator
+from template_loader import get_registry
+
+PROFILE_STATS_LIMIT = 25
+
+
+@dataclass
+class BuildProfile:
+    phases: Dict[str, float] = field(default_factory=dict)
+    counts: Dict[str, int] = field(default_factory=dict)
+    # Functions taking the most cumulative time, if the build ran under cProfile
+    stats: Optional[str] = None
+
+    @property
+    def seconds(self) -> float:
+        return sum(self.phases.values())
+
+    def to_json(self) -> Dict:
+        out: Dict = {"phases": self.phases, "seconds": self.seconds, "counts": self.counts}
+        if self.stats is not None:
+            out["stats"] = self.stats
+        return out
+
+    def describe(self) -> str:
+        lines = [f"{'phase':<12} {'time':>10} {'share':>6}"]
+        for name, seconds in self.phases.items():
+            share = seconds / self.seconds if self.seconds else 0
+            lines.append(f"{name:<12} {seconds * 1000:>8.1f}ms {share:>6.0%}")
+        lines.append(f"{'total':<12} {self.seconds * 1000:>8.1f}ms")
+        lines.append(", ".join(f"{name.replace('_', ' ')}: {count}" for name, count in self.counts.items()))
+        return "\n".join(lines)
+
+
+class BuildProfiler:
+    def __init__(self, cprofile: bool = False):
+        self.profile = BuildProfile()
+        self._cprofile = cProfile.Profile() if cprofile else None
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        if self._cprofile:
+            self._cprofile.enable()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.profile.phases[name] = self.profile.phases.get(name, 0) + time.perf_counter() - start
+            if self._cprofile:
+                self._cprofile.disable()
+
+    def build(
+        self,
+        data: Union[Dict, List[Dict]],
+        hl_maps: List[HighLevelMap],
+        deterministic: bool = False,
+        seed: Optional[str] = None,
+    ) -> Dict[str, List[str]]:
+        """Build every region of the parsed mapping like `operations.build_regions`, timing each phase"""
+        engine = get_engine()
+        registry = get_registry()
+        lookups_before = _get_template_lookups(registry)
+        names = NameGenerator.from_mapping(data, seed) if deterministic or seed is not None else NameGenerator()
+        regions = get_regions(hl_maps)
+        generators = [engine.new_generator(names.scoped(key)) for key, _, _ in regions]
+
+        with self.phase("low_level"):
+            for generator, (_, hl_map, region) in zip(generators, regions):
+                generator.generate_low_level_aws_map(hl_map, region)
+
+        region_templates: Dict[str, List[str]] = {}
+        with self.phase("render"):
+            for generator, (key, hl_map, region) in zip(generators, regions):
+                region_templates[key] = ["".join(generator.render_low_level_chunks(hl_map.cloud_provider, region))]
+
+        resources = [resource for hl_map in hl_maps for resource in hl_map.resources]
+        self.profile.counts.update(
+            {
+                "regions": len(regions),
+                "resources": len(resources),
+                "bindings": sum(len(resource.bindings) for resource in resources),
+                "low_level_items": sum(len(generator.ll_list) for generator in generators),
+                # Items and providers look their template up in the registry, the engine holds the base one
+                "templates_rendered": _get_template_lookups(registry) - lookups_before + len(regions),
+                "bytes": sum(len(template.encode()) for [template] in region_templates.values()),
+            }
+        )
+        return region_templates
+
+    def finish(self, stats_path: Optional[str] = None) -> BuildProfile:
+        """The profile of the build, saving the cProfile stats to `stats_path` if given"""
+        if self._cprofile:
+            if stats_path:
+                self._cprofile.dump_stats(stats_path)
+            out = io.StringIO()
+            pstats.Stats(self._cprofile, stream=out).sort_stats("cumulative").print_stats(PROFILE_STATS_LIMIT)
+            self.profile.stats = out.getvalue()
+        return self.profile
+
+
+def _get_template_lookups(registry) -> int:
+    stats = registry.stats()
+    return stats["hits"] + stats["misses"]
@@ -0,0 +1,115 @@
+"""
+Formats of the `build` action's result, chosen per request with its "format" field.
+
+- "lines" (default): the configuration as a list of lines, or a list per region
+- "string": the configuration as a single string, or a string per region
+- "gzip": the "string" result (JSON if there are several regions), gzip compressed
+- "zip" / "tar": an archive with the providers, variables, main and outputs files of the configuration, in a
+  directory per region if there are several. Tar archives are sent gzip compressed.
+
+Compressed formats are returned as an `EncodedBody`, which the Lambda handler sends base64 encoded and the HTTP
+server sends as is, with their Content-Type and Content-Encoding.
+"""
+import base64
+import io
+import json
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Union
+
+# Fixed modification time of archived files, so that the same configuration always makes the same archive
+ARCHIVE_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+
+class ResponseFormat:
+    LINES = "lines"
+    STRING = "string"
+    GZIP = "gzip"
+    ZIP = "zip"
+    TAR = "tar"
+
+    @classmethod
+    def values(cls) -> List[str]:
+        return [cls.LINES, cls.STRING, cls.GZIP, cls.ZIP, cls.TAR]
+
+    @classmethod
+    def is_archive(cls, response_format: str) -> bool:
+        return response_format in (cls.ZIP, cls.TAR)
+
+
+@dataclass
+class EncodedBody:
+    data: bytes
+    content_type: str
+    content_encoding: Optional[str] = None
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        headers = {"Content-Type": self.content_type}
+        if self.content_encoding:
+            headers["Content-Encoding"] = self.content_encoding
+        return headers
+
+    def to_base64(self) -> str:
+        return base64.b64encode(self.data).decode()
+
+
+def to_lines(region_templates: Dict[str, Iterable[str]]) -> Union[List[str], Dict[str, List[str]]]:
+    return _per_region({key: "".join(template).split("\n") for key, template in region_templates.items()})
+
+
+def to_string(region_templates: Dict[str, Iterable[str]]) -> Union[str, Dict[str, str]]:
+    return _per_region({key: "".join(template) for key, template in region_templates.items()})
+
+
+def to_gzip(region_templates: Dict[str, Iterable[str]]) -> EncodedBody:
+    import gzip
+
+    result = to_string(region_templates)
+    if isinstance(result, str):
+        return EncodedBody(gzip.compress(result.encode(), mtime=0), "text/plain; charset=utf-8", "gzip")
+    return EncodedBody(gzip.compress(json.dumps(result).encode(), mtime=0), "application/json", "gzip")
+
+
+def to_archive(region_files: Dict[str, Dict[str, str]], response_format: str) -> EncodedBody:
+    """Archive of every file of every region, at the root of the archive if there is a single region"""
+    files = {
+        name if len(region_files) == 1 else f"{key}/{name}": content
+        for key, region in region_files.items()
+        for name, content in region.items()
+    }
+    if response_format == ResponseFormat.ZIP:
+        return EncodedBody(_zip(files), "application/zip")
+    if response_format == ResponseFormat.TAR:
+        return EncodedBody(_tar_gz(files), "application/x-tar", "gzip")
+    raise ValueError(f"{response_format} is not an archive format")
+
+
+def _per_region(result: Dict):
+    # A single region is returned by itself, as before mappings could span several
+    return next(iter(result.values())) if len(result) == 1 else result
+
+
+def _zip(files: Dict[str, str]) -> bytes:
+    import zipfile
+
+    out = io.BytesIO()
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, content in files.items():
+            archive.writestr(zipfile.ZipInfo(name, ARCHIVE_DATE_TIME), content, zipfile.ZIP_DEFLATED)
+    return out.getvalue()
+
+
+def _tar_gz(files: Dict[str, str]) -> bytes:
+    import gzip
+    import tarfile
+
+    out = io.BytesIO()
+    with tarfile.open(fileobj=out, mode="w") as archive:
+        for name, content in files.items():
+            data = content.encode()
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = time.mktime(ARCHIVE_DATE_TIME + (0, 0, -1))
+            archive.addfile(info, io.BytesIO(data))
+    return gzip.compress(out.getvalue(), mtime=0)
@@ -0,0 +1,167 @@
+"""
+Offload of large build results to S3.
+
+Results above RESULT_OFFLOAD_THRESHOLD_BYTES are uploaded to GENERATED_TF_BUCKET, in parts uploaded concurrently
+when larger than a part, and returned as a presigned URL with the SHA-256 digest of the uploaded body, so that
+clients can check what they download. Objects are keyed by that digest, so identical results share one object.
+
+The S3 client is created once per process with a connection pool sized for the concurrent part uploads, and reused
+by every request of a warm container.
+"""
+import hashlib
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from config import (
+    AWS_ACCESS_KEY_ID,
+    AWS_REGION,
+    AWS_SECRET_ACCESS_KEY,
+    GENERATED_TF_BUCKET,
+    RESULT_OFFLOAD_PART_BYTES,
+    RESULT_OFFLOAD_PREFIX,
+    RESULT_OFFLOAD_THRESHOLD_BYTES,
+    RESULT_OFFLOAD_URL_EXPIRY,
+    RESULT_OFFLOAD_WORKERS,
+)
+from metrics import get_response_size
+from response_format import EncodedBody
+
+
+@dataclass
+class OffloadedResult:
+    url: str
+    sha256: str
+    size: int
+    content_type: str
+    content_encoding: Optional[str]
+    expires_in: int
+
+    def to_json(self) -> Dict[str, Any]:
+        return {"offloaded": asdict(self)}
+
+
+@lru_cache(maxsize=None)
+def get_s3_client(max_pool_connections: int = RESULT_OFFLOAD_WORKERS):
+    """S3 client of this process, with enough pooled connections for the concurrent part uploads"""
+    import boto3
+    from botocore.config import Config
+
+    return boto3.client(
+        "s3",
+        region_name=AWS_REGION,
+        aws_access_key_id=AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
+        config=Config(max_pool_connections=max_pool_connections),
+    )
+
+
+def get_payload_size(result: Any) -> int:
+    """Size of a result once sent by the Lambda handler"""
+    if isinstance(result, EncodedBody):
+        # Base64 encoded
+        return (len(result.data) + 2) // 3 * 4
+    return len(json.dumps(result))
+
+
+class ResultOffloader:
+    def __init__(
+        self,
+        bucket: str = GENERATED_TF_BUCKET,
+        threshold: int = RESULT_OFFLOAD_THRESHOLD_BYTES,
+        prefix: str = RESULT_OFFLOAD_PREFIX,
+        part_size: int = RESULT_OFFLOAD_PART_BYTES,
+        workers: int = RESULT_OFFLOAD_WORKERS,
+        url_expiry: int = RESULT_OFFLOAD_URL_EXPIRY,
+        client=None,
+    ):
+        self.bucket = bucket
+        self.threshold = threshold
+        self.prefix = prefix
+        self.part_size = part_size
+        self.workers = workers
+        self.url_expiry = url_expiry
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = get_s3_client(self.workers)
+        return self._client
+
+    def get_offload_body(self, result: Any) -> Optional[EncodedBody]:
+        """
+        The body `result` is uploaded as if it is above the threshold, None if it can be returned as is. Results are
+        serialised once here, and `offload` uploads that body as is.
+        """
+        if self.threshold <= 0:
+            return None
+        if isinstance(result, EncodedBody):
+            return result if get_payload_size(result) > self.threshold else None
+        # Results well below the threshold aren't serialised just to measure them
+        if get_response_size(result) < self.threshold // 2:
+            return None
+        body = EncodedBody(json.dumps(result).encode(), "application/json")
+        return body if len(body.data) > self.threshold else None
+
+    def offload(self, result: EncodedBody) -> OffloadedResult:
+        body, content_type, content_encoding = result.data, result.content_type, result.content_encoding
+        digest = hashlib.sha256(body).hexdigest()
+        key = f"{self.prefix}{digest}"
+
+        extra = {"ContentType": content_type, "Metadata": {"sha256": digest}}
+        if content_encoding:
+            extra["ContentEncoding"] = content_encoding
+        if len(body) > self.part_size:
+            self._upload_multipart(key, body, extra)
+        else:
+            self.client.put_object(Bucket=self.bucket, Key=key, Body=body, **extra)
+
+        url = self.client.generate_presigned_url(
+            "get_object", Params={"Bucket": self.bucket, "Key": key}, ExpiresIn=self.url_expiry
+        )
+        return OffloadedResult(url, digest, len(body), content_type, content_encoding, self.url_expiry)
+
+    def _upload_multipart(self, key: str, body: bytes, extra: Dict):
+        upload_id = self.client.create_multipart_upload(Bucket=self.bucket, Key=key, **extra)["UploadId"]
+        view = memoryview(body)
+        offsets = range(0, len(body), self.part_size)
+
+        def upload_part(number: int) -> Dict:
+            start = offsets[number - 1]
+            response = self.client.upload_part(
+                Bucket=self.bucket,
+                Key=key,
+                UploadId=upload_id,
+                PartNumber=number,
+                Body=view[start : start + self.part_size].tobytes(),
+            )
+            return {"PartNumber": number, "ETag": response["ETag"]}
+
+        try:
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(offsets))) as executor:
+                parts: List[Dict] = list(executor.map(upload_part, range(1, len(offsets) + 1)))
+            self.client.complete_multipart_upload(
+                Bucket=self.bucket, Key=key, UploadId=upload_id, MultipartUpload={"Parts": parts}
+            )
+        except Exception:
+            # Parts of uploads never completed are stored (and billed) until aborted
+            self.client.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id)
+            raise
+
+
+_offloader: Optional[ResultOffloader] = None
+_offloader_lock = threading.Lock()
+
+
+def get_result_offloader() -> ResultOffloader:
+    """Offloader of this process, configured by the RESULT_OFFLOAD_* settings"""
+    global _offloader
+    if _offloader is None:
+        with _offloader_lock:
+            if _offloader is None:
+                _offloader = ResultOffloader()
+    return _offloader
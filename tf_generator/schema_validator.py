@@ -1,11 +1,31 @@
-from typing import Dict, Tuple, Optional
+from functools import lru_cache
+from typing import Dict, List, Tuple, Optional
 
 from schema import SchemaError
 
+from models.schema_compiler import CompiledSchema, ValidationError, compile_schema
 from models.schemas import MAP_SCHEMA
 
 
+@lru_cache(maxsize=None)
+def get_compiled_map_schema() -> CompiledSchema:
+    return compile_schema(MAP_SCHEMA)
+
+
 def validate(data: Dict) -> Tuple[bool, Optional[str]]:
+    errors = validate_all(data)
+    if errors:
+        return False, "\n".join(str(error) for error in errors)
+    return True, None
+
+
+def validate_all(data: Dict) -> List[ValidationError]:
+    """Every error in the mapping, each with the JSON pointer of the value it applies to"""
+    return get_compiled_map_schema().errors(data)
+
+
+def validate_with_schema_library(data: Dict) -> Tuple[bool, Optional[str]]:
+    """Reference implementation, stopping at the first error"""
     try:
         MAP_SCHEMA.validate(data)
     except SchemaError as e:
@@ -0,0 +1,308 @@
+"""
+Long-lived HTTP server for the same `version`/`action` protocol as the Lambda handler.
+
+Requests are POSTed as JSON to any path, and answered with the JSON result of `api_handler.handle` and its status
+code. Connections are kept alive between requests. Handling is CPU-bound, so it runs in a pool of worker processes
+warmed up on start (catalog, templates and generator engine loaded), while the event loop only does I/O.
+
+At most `max_concurrency` requests are handled at once and `max_pending` more wait for their turn; requests
+arriving beyond that are answered 429 straight away, so that clients back off rather than time out.
+Identical validate requests, and identical build requests with deterministic names, arriving while one is handled
+wait for its result rather than being handled again, without counting towards those limits.
+"""
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http import HTTPStatus
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import api_handler
+from config import (
+    SERVER_COALESCE,
+    SERVER_HOST,
+    SERVER_KEEP_ALIVE_TIMEOUT,
+    SERVER_MAX_BODY_BYTES,
+    SERVER_MAX_CONCURRENCY,
+    SERVER_MAX_PENDING,
+    SERVER_PORT,
+    SERVER_WORKERS,
+)
+from response_format import EncodedBody
+
+# Actions whose result only depends on the request, so that identical concurrent requests can share it. Builds only
+# depend on the request when their names are derived from the mapping or a seed, others generate new random names
+COALESCED_ACTIONS = frozenset(["build", "validate"])
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first one runs, and the calls made with that key while it
+    runs wait for it and share its result (or exception) instead of repeating the work. If the first call is
+    cancelled, with the request that made it, the calls waiting for it make it again instead.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Future] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, call: Callable[[], Awaitable[Any]]) -> Any:
+        while key in self._calls:
+            future = self._calls[key]
+            self.coalesced += 1
+            try:
+                # Shielded, so that a waiter going away doesn't cancel the call the others wait for
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # The call was cancelled rather than this waiter, the first waiter to resume makes it again
+                self.coalesced -= 1
+
+        self.calls += 1
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            result = await call()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Marks the exception as retrieved, in case no other call waited for it
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {"calls": self.calls, "coalesced": self.coalesced, "in_flight": len(self._calls)}
+
+
+def get_coalescing_key(request: Dict) -> Optional[str]:
+    """Key of requests computing the same result, None for those that shouldn't be coalesced"""
+    if request.get("action") not in COALESCED_ACTIONS or request.get("profile"):
+        return None
+    if request.get("action") == "build" and not (request.get("deterministic") or request.get("seed") is not None):
+        return None
+    return hashlib.sha256(json.dumps(request, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+
+def warm_up():
+    """Load everything a build needs in a worker process, before it serves its first request"""
+    import batch_builder
+    from generator import RegionExecutorMode, get_engine, set_region_executor_mode
+
+    batch_builder.preload()
+    get_engine()
+    # Requests are already handled in parallel by the workers, which don't start pools of their own
+    set_region_executor_mode(RegionExecutorMode.SERIAL)
+
+
+def _started() -> int:
+    # Trivial task submitted to each worker on start, so that the pool starts them all now rather than on demand
+    return os.getpid()
+
+
+def handle_request(version: str, action: str, data: Dict) -> Tuple[Any, int]:
+    """Handle a request in a worker process, as a top-level function so that it can be sent to a process pool"""
+    try:
+        return api_handler.handle(version, action, data)
+    except Exception as e:
+        return f"{type(e).__name__}: {e}", 500
+
+
+class GeneratorServer:
+    def __init__(
+        self,
+        host: str = SERVER_HOST,
+        port: int = SERVER_PORT,
+        workers: int = SERVER_WORKERS,
+        max_concurrency: int = SERVER_MAX_CONCURRENCY,
+        max_pending: int = SERVER_MAX_PENDING,
+        keep_alive_timeout: float = SERVER_KEEP_ALIVE_TIMEOUT,
+        max_body_bytes: int = SERVER_MAX_BODY_BYTES,
+        executor: Optional[Executor] = None,
+        coalesce: bool = SERVER_COALESCE,
+    ):
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+        self.keep_alive_timeout = keep_alive_timeout
+        self.max_body_bytes = max_body_bytes
+        self.executor = executor
+        self._own_executor = executor is None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.single_flight = SingleFlight() if coalesce else None
+        # Requests being handled or waiting for their turn
+        self.in_flight = 0
+        self.rejected = 0
+
+    async def start(self):
+        if self.executor is None:
+            self.executor = self._create_executor()
+        loop = asyncio.get_running_loop()
+        # Workers warm up when they start, before running their first task
+        await asyncio.gather(*(loop.run_in_executor(self.executor, _started) for _ in range(self.workers)))
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._server = await asyncio.start_server(self._serve_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.close()
+
+    async def close(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._own_executor and self.executor:
+            self.executor.shutdown()
+
+    def _create_executor(self) -> Executor:
+        # Forked workers would inherit the sockets of open connections, keeping them open after they are closed
+        context = multiprocessing.get_context("forkserver")
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=context, initializer=warm_up)
+
+    def _replace_executor(self, broken: Executor):
+        """Replace a pool broken by a worker dying, unless another request already did"""
+        if self._own_executor and self.executor is broken:
+            broken.shutdown(wait=False, cancel_futures=True)
+            self.executor = self._create_executor()
+
+    def stats(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"in_flight": self.in_flight, "rejected": self.rejected}
+        if self.single_flight:
+            out["coalescing"] = self.single_flight.stats()
+        return out
+
+    async def _serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            keep_alive = True
+            while keep_alive:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.keep_alive_timeout)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError):
+                    break
+                except asyncio.LimitOverrunError:
+                    writer.write(
+                        _format_response(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Headers too large", False)
+                    )
+                    break
+                try:
+                    method, path, headers, keep_alive = _parse_head(head)
+                    body = await self._read_body(reader, headers)
+                    status, result = await self._respond(method, path, body)
+                except HttpError as e:
+                    status, result, keep_alive = e.status, str(e), False
+                except Exception as e:
+                    # The request was read in full, so the connection can still serve the next one
+                    status, result = HTTPStatus.INTERNAL_SERVER_ERROR, f"{type(e).__name__}: {e}"
+                writer.write(_format_response(status, result, keep_alive))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _read_body(self, reader: asyncio.StreamReader, headers: Dict[str, str]) -> bytes:
+        if "chunked" in headers.get("transfer-encoding", ""):
+            raise HttpError(HTTPStatus.LENGTH_REQUIRED, "Chunked requests aren't supported, send a Content-Length")
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+        if length > self.max_body_bytes:
+            raise HttpError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"Body exceeds {self.max_body_bytes} bytes")
+        return await reader.readexactly(length) if length else b""
+
+    async def _respond(self, method: str, path: str, body: bytes) -> Tuple[int, Any]:
+        if method == "GET" and path == "/health":
+            return HTTPStatus.OK, {"status": "ok", **self.stats()}
+        if method != "POST":
+            return HTTPStatus.METHOD_NOT_ALLOWED, f"Method {method} not allowed"
+        try:
+            request = json.loads(body)
+        except ValueError as e:
+            return HTTPStatus.BAD_REQUEST, f"Invalid JSON body: {e}"
+        if not isinstance(request, dict):
+            return HTTPStatus.BAD_REQUEST, "Body should be a JSON object"
+
+        key = get_coalescing_key(request) if self.single_flight else None
+        if key:
+            return await self.single_flight.do(key, lambda: self._handle(request))
+        return await self._handle(request)
+
+    async def _handle(self, request: Dict) -> Tuple[int, Any]:
+        if self.in_flight >= self.max_concurrency + self.max_pending:
+            self.rejected += 1
+            return HTTPStatus.TOO_MANY_REQUESTS, "Too many requests, retry later"
+        self.in_flight += 1
+        try:
+            async with self._semaphore:
+                result, status = await self._dispatch(request)
+        finally:
+            self.in_flight -= 1
+        return status, result
+
+    async def _dispatch(self, request: Dict) -> Tuple[Any, int]:
+        loop = asyncio.get_running_loop()
+        executor = self.executor
+        try:
+            return await loop.run_in_executor(
+                executor, handle_request, request.get("version"), request.get("action"), request
+            )
+        except BrokenProcessPool:
+            self._replace_executor(executor)
+            raise HttpError(HTTPStatus.SERVICE_UNAVAILABLE, "A worker process died, retry the request")
+
+
+def _parse_head(head: bytes) -> Tuple[str, str, Dict[str, str], bool]:
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, path, http_version = lines[0].split(" ", 2)
+    except ValueError:
+        raise HttpError(HTTPStatus.BAD_REQUEST, "Invalid request line")
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+    connection = headers.get("connection", "").lower()
+    keep_alive = connection == "keep-alive" if http_version == "HTTP/1.0" else connection != "close"
+    return method, path, headers, keep_alive
+
+
+def _format_response(status: int, result: Any, keep_alive: bool) -> bytes:
+    if isinstance(result, EncodedBody):
+        body, headers = result.data, result.headers
+    else:
+        body, headers = json.dumps(result).encode(), {"Content-Type": "application/json"}
+    head = (
+        f"HTTP/1.1 {int(status)} {HTTPStatus(status).phrase}\r\n"
+        + "".join(f"{name}: {value}\r\n" for name, value in headers.items())
+        + f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+        "\r\n"
+    )
+    return head.encode() + body
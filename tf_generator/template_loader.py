@@ -1,7 +1,183 @@
-from jinja2 import Template
+import compileall
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, MutableMapping, Any
 
+from jinja2 import BaseLoader, Environment, FileSystemBytecodeCache, FileSystemLoader, ModuleLoader, Template
 
-def load_template(path: str) -> Template:
-    with open(path, "r") as f:
-        data = f.read()
-        return Template(data)
+from config import (
+    TEMPLATES_BYTECODE_CACHE_DIR,
+    TEMPLATES_CACHE_SIZE,
+    TEMPLATES_DIR,
+    TEMPLATES_BUNDLE_DIR,
+    TEMPLATES_LOADER_MODE,
+)
+
+TEMPLATE_EXTENSIONS = ["template"]
+
+
+class TemplateLoaderMode:
+    SOURCE = "source"
+    PRECOMPILED = "precompiled"
+    # Use the precompiled bundle only if one has been built
+    AUTO = "auto"
+
+
+class PrecompiledLoader(BaseLoader):
+    """
+    Loads templates from a bundle written by `compile_bundle`, falling back to the template source
+    for anything missing from the bundle or modified after the bundle was built.
+    """
+
+    def __init__(self, bundle_dir: str, templates_dir: str = TEMPLATES_DIR):
+        self.bundle_dir = bundle_dir
+        self.templates_dir = templates_dir
+        self.module_loader = ModuleLoader(bundle_dir)
+        self.source_loader = FileSystemLoader(templates_dir)
+
+    def get_source(self, environment: Environment, template: str):
+        return self.source_loader.get_source(environment, template)
+
+    def list_templates(self):
+        return self.source_loader.list_templates()
+
+    def is_bundled(self, name: str) -> bool:
+        module_path = os.path.join(self.bundle_dir, ModuleLoader.get_module_filename(name))
+        source_path = os.path.join(self.templates_dir, *name.split("/"))
+        try:
+            return os.path.getmtime(module_path) >= os.path.getmtime(source_path)
+        except OSError:
+            return False
+
+    def load(
+        self, environment: Environment, name: str, globals: Optional[MutableMapping[str, Any]] = None
+    ) -> Template:
+        if self.is_bundled(name):
+            return self.module_loader.load(environment, name, globals)
+        return super().load(environment, name, globals)
+
+
+class TemplateRegistry:
+    """
+    Compiled Jinja templates shared by every generator and low-level item in the process.
+
+    Templates are addressed by their path relative to the templates directory (e.g. "vpc/main.tf.template"),
+    compiled once and kept in an LRU of `cache_size` entries. If `bytecode_cache_dir` is given, the compiled
+    bytecode is also persisted there so that new processes can skip parsing. If `bundle_dir` is given, templates
+    are imported from the precompiled bundle in that directory instead of being compiled from source.
+    """
+
+    def __init__(
+        self,
+        templates_dir: str = TEMPLATES_DIR,
+        cache_size: int = TEMPLATES_CACHE_SIZE,
+        bytecode_cache_dir: Optional[str] = None,
+        bundle_dir: Optional[str] = None,
+    ):
+        bytecode_cache = None
+        if bytecode_cache_dir:
+            os.makedirs(bytecode_cache_dir, exist_ok=True)
+            bytecode_cache = FileSystemBytecodeCache(bytecode_cache_dir)
+
+        loader: BaseLoader
+        if bundle_dir:
+            loader = PrecompiledLoader(bundle_dir, templates_dir)
+        else:
+            loader = FileSystemLoader(templates_dir)
+
+        # Jinja's own cache is disabled, the registry keeps its own LRU so that it can count hits and misses
+        self.environment = Environment(
+            loader=loader,
+            bytecode_cache=bytecode_cache,
+            cache_size=0,
+        )
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._templates: "OrderedDict[str, Template]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> Template:
+        with self._lock:
+            template = self._templates.get(name)
+            if template is not None:
+                self._templates.move_to_end(name)
+                self.hits += 1
+                return template
+            self.misses += 1
+
+        template = self.environment.get_template(name)
+
+        with self._lock:
+            self._templates[name] = template
+            self._templates.move_to_end(name)
+            while len(self._templates) > self.cache_size:
+                self._templates.popitem(last=False)
+        return template
+
+    def preload(self):
+        """Compile every template up front, e.g. when warming up a worker process"""
+        for name in self.environment.list_templates(extensions=TEMPLATE_EXTENSIONS):
+            self.get(name)
+
+    def from_string(self, source: str) -> Template:
+        return self.environment.from_string(source)
+
+    def clear(self):
+        with self._lock:
+            self._templates.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._templates)}
+
+
+_registry: Optional[TemplateRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> TemplateRegistry:
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = TemplateRegistry(
+                    bytecode_cache_dir=TEMPLATES_BYTECODE_CACHE_DIR,
+                    bundle_dir=_get_bundle_dir(TEMPLATES_LOADER_MODE),
+                )
+    return _registry
+
+
+def _get_bundle_dir(mode: str) -> Optional[str]:
+    if mode == TemplateLoaderMode.PRECOMPILED:
+        return TEMPLATES_BUNDLE_DIR
+    if mode == TemplateLoaderMode.AUTO and os.path.isdir(TEMPLATES_BUNDLE_DIR):
+        return TEMPLATES_BUNDLE_DIR
+    if mode not in (TemplateLoaderMode.SOURCE, TemplateLoaderMode.AUTO):
+        raise ValueError(f"Unknown template loader mode {mode}")
+    return None
+
+
+def load_template(name: str) -> Template:
+    return get_registry().get(name)
+
+
+def compile_bundle(target_dir: str = TEMPLATES_BUNDLE_DIR, templates_dir: str = TEMPLATES_DIR) -> int:
+    """
+    Precompile every template under `templates_dir` into Python modules (and their bytecode) in `target_dir`,
+    ready to be served by `PrecompiledLoader`. Returns the number of templates compiled.
+    """
+    environment = Environment(loader=FileSystemLoader(templates_dir))
+    compiled = []
+    environment.compile_templates(
+        target_dir,
+        extensions=TEMPLATE_EXTENSIONS,
+        zip=None,
+        log_function=compiled.append,
+        ignore_errors=False,
+    )
+    compileall.compile_dir(target_dir, quiet=1)
+    return len([message for message in compiled if message.startswith("Compiled")])
@@ -1,3 +1,130 @@
-def write(path: str, template: str):
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Union
+
+REGION_TEMPLATE_FILE_NAME = "main.tf"
+# Files a configuration is split into, Terraform loads every .tf file of a directory as one configuration
+PROVIDERS_FILE_NAME = "providers.tf"
+VARIABLES_FILE_NAME = "variables.tf"
+MAIN_FILE_NAME = REGION_TEMPLATE_FILE_NAME
+OUTPUTS_FILE_NAME = "outputs.tf"
+# Files written to an output directory by the last build, so that those it no longer generates can be removed
+MANIFEST_FILE_NAME = ".cloudblocks-manifest.json"
+WRITE_WORKERS = 8
+
+
+def write(path: str, template: Union[str, Iterable[str]]):
     with open(path, "w") as f:
-        f.write(template)
+        if isinstance(template, str):
+            f.write(template)
+        else:
+            f.writelines(template)
+
+
+def get_regions_dir(path: str) -> str:
+    root, extension = os.path.splitext(path)
+    return root if extension == ".tf" else path
+
+
+def write_regions(path: str, region_templates: Dict[str, Iterable[str]]):
+    """
+    Write a single region's configuration to `path`. Several regions are written to their own
+    `<path without .tf>/<cloud>-<region>/main.tf`, as each one is a separate Terraform configuration.
+    """
+    if len(region_templates) == 1:
+        write(path, next(iter(region_templates.values())))
+        return
+
+    regions_dir = get_regions_dir(path)
+    for key, template in region_templates.items():
+        os.makedirs(os.path.join(regions_dir, key), exist_ok=True)
+        write(os.path.join(regions_dir, key, REGION_TEMPLATE_FILE_NAME), template)
+
+
+@dataclass
+class WriteResult:
+    written: List[str] = field(default_factory=list)
+    unchanged: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+
+
+def write_if_changed(path: str, content: str) -> bool:
+    """
+    Write `content` to `path` unless the file already has that content, leaving its modification time untouched
+    for tools caching on it. Returns whether the file was written.
+    """
+    data = content.encode()
+    try:
+        # Files of a different size can't have the same content, and aren't read
+        if os.path.getsize(path) == len(data):
+            with open(path, "rb") as f:
+                if f.read() == data:
+                    return False
+    except FileNotFoundError:
+        pass
+    with open(path, "wb") as f:
+        f.write(data)
+    return True
+
+
+def is_inside(directory: str, name) -> bool:
+    """Whether relative path `name` is inside `directory`, rather than outside through an absolute path, .. or a link"""
+    if not isinstance(name, str) or not name:
+        return False
+    root = os.path.realpath(directory)
+    path = os.path.realpath(os.path.join(root, name))
+    return path != root and os.path.commonpath([root, path]) == root
+
+
+def write_files(directory: str, files: Dict[str, str], workers: int = WRITE_WORKERS) -> WriteResult:
+    """
+    Write files by path relative to `directory` concurrently, skipping those whose content is unchanged, and remove
+    the files written there by the previous call that aren't part of `files` anymore. Only files inside `directory`
+    are written or removed, whatever the manifest left there says.
+    """
+    os.makedirs(directory, exist_ok=True)
+    for name in files:
+        if not is_inside(directory, name):
+            raise ValueError(f"File {name} would be written outside of {directory}")
+    manifest_path = os.path.join(directory, MANIFEST_FILE_NAME)
+    try:
+        with open(manifest_path) as f:
+            previous = json.load(f)
+    except (FileNotFoundError, ValueError):
+        previous = []
+    if not isinstance(previous, list):
+        previous = []
+
+    for name in files:
+        os.makedirs(os.path.dirname(os.path.join(directory, name)), exist_ok=True)
+    result = WriteResult()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        changes = executor.map(lambda name: write_if_changed(os.path.join(directory, name), files[name]), files)
+        for name, written in zip(files, changes):
+            (result.written if written else result.unchanged).append(name)
+
+    for name in previous:
+        if name not in files and is_inside(directory, name):
+            try:
+                os.remove(os.path.join(directory, name))
+                result.removed.append(name)
+            except FileNotFoundError:
+                pass
+
+    with open(manifest_path, "w") as f:
+        json.dump(sorted(files), f, indent=2)
+    return result
+
+
+def write_region_files(directory: str, region_files: Dict[str, Dict[str, str]]) -> WriteResult:
+    """
+    Write the files of a single region's configuration to `directory`. Several regions are written to their own
+    `<directory>/<cloud>-<region>/`, as each one is a separate Terraform configuration.
+    """
+    if len(region_files) == 1:
+        return write_files(directory, next(iter(region_files.values())))
+    return write_files(
+        directory, {f"{key}/{name}": content for key, files in region_files.items() for name, content in files.items()}
+    )
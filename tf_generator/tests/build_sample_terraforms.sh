@@ -3,8 +3,4 @@ cd ..
 cd ..
 mkdir temp/
 cd tf_generator
-for file in tests/samples/*
-do
-  echo Building $file
-  python cli.py build -f $file -o ../temp/$(basename $file).tf
-done
+python cli.py build -f tests/samples -o ../temp/ --jobs 4
@@ -0,0 +1,150 @@
+import base64
+import copy
+import gzip
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+import api_handler
+import generator
+from config import BASE_DIR
+from mapping_loader import load_mapping
+
+SAMPLE_MAPPING = load_mapping(os.path.join(BASE_DIR, "tests", "samples", "basic_example.yaml"))
+MULTI_REGION_MAPPING = [
+    {
+        "cloud": "aws",
+        "regions": [
+            {"region": "eu-west-1", "resources": {"bucket-eu": {"resource": "s3"}}},
+            {"region": "us-east-1", "resources": {"bucket-us": {"resource": "s3"}}},
+        ],
+    }
+]
+
+
+def _generated_names(lines) -> set:
+    return set(re.findall(r'"([a-z0-9]+-[0-9a-f]{16,}[a-z0-9-]*)"', "\n".join(lines)))
+
+
+def test_build_batch_reports_status_per_mapping():
+    mappings = [
+        SAMPLE_MAPPING,
+        {"foo": "bar"},
+        [{"cloud": "aws", "resources": {"foo": {"resource": "unknown"}}}],
+        SAMPLE_MAPPING,
+    ]
+
+    results, status = api_handler.handle("1.0", "build_batch", {"mappings": mappings})
+
+    assert status == 200
+    assert [result["status"] for result in results] == [200, 422, 422, 200]
+    assert 'provider "aws" {' in results[0]["result"]
+    assert "No resource with key unknown found" in results[2]["result"]
+
+
+@pytest.mark.parametrize(
+    "data,expected_status",
+    [
+        pytest.param({}, 422, id="test_missing_mappings"),
+        pytest.param({"mappings": {"foo": "bar"}}, 422, id="test_mappings_not_a_list"),
+        pytest.param([SAMPLE_MAPPING], 422, id="test_list_request"),
+        pytest.param({"mappings": [SAMPLE_MAPPING], "format": "yaml"}, 422, id="test_unknown_format"),
+        pytest.param({"mappings": [SAMPLE_MAPPING] * (api_handler.API_BATCH_MAX_SIZE + 1)}, 413, id="test_too_many"),
+    ],
+)
+def test_build_batch_rejects_invalid_batch(data, expected_status: int):
+    _, status = api_handler.handle("1.0", "build_batch", data)
+    assert status == expected_status
+
+
+def test_build_batch_empty():
+    assert api_handler.handle("1.0", "build_batch", {"mappings": []}) == ([], 200)
+
+
+def test_build_batch_applies_build_options():
+    data = {"mappings": [SAMPLE_MAPPING], "deterministic": True}
+    (first,), _ = api_handler.handle("1.0", "build_batch", data)
+    (second,), _ = api_handler.handle("1.0", "build_batch", data)
+    (gzipped,), _ = api_handler.handle("1.0", "build_batch", {**data, "format": "gzip"})
+
+    assert first == second
+    assert gzipped["headers"] == {"Content-Type": "text/plain; charset=utf-8", "Content-Encoding": "gzip"}
+    assert gzip.decompress(base64.b64decode(gzipped["result"])).decode().split("\n") == first["result"]
+
+
+def test_build_batch_in_process_pool(monkeypatch):
+    mappings = [SAMPLE_MAPPING, MULTI_REGION_MAPPING, {"foo": "bar"}]
+    data = {"mappings": mappings, "deterministic": True}
+    monkeypatch.setattr(generator, "REGION_WORKERS", 2)
+    generator.set_region_executor_mode(generator.RegionExecutorMode.SERIAL)
+    serial, _ = api_handler.handle("1.0", "build_batch", data)
+
+    generator.set_region_executor_mode(generator.RegionExecutorMode.PROCESS)
+    try:
+        pooled, _ = api_handler.handle("1.0", "build_batch", data)
+        assert isinstance(generator.get_region_pool(), ProcessPoolExecutor)
+    finally:
+        generator.set_region_executor_mode(generator.RegionExecutorMode.SERIAL)
+        generator.set_region_executor_mode(generator.REGION_EXECUTOR)
+
+    assert [result["status"] for result in pooled] == [200, 200, 422]
+    assert pooled == serial
+
+
+def test_build_multi_region_returns_lines_per_region():
+    results, status = api_handler.handle("1.0", "build_batch", {"mappings": [MULTI_REGION_MAPPING]})
+
+    assert status == 200
+    assert list(results[0]["result"]) == ["aws-eu-west-1", "aws-us-east-1"]
+    assert '  default = "us-east-1"' in results[0]["result"]["aws-us-east-1"]
+
+
+@pytest.mark.parametrize("profile", [True, "cprofile"])
+def test_build_profile_reports_phases(profile):
+    results, status = api_handler.handle("1.0", "build", {"mapping": SAMPLE_MAPPING, "profile": profile})
+
+    assert status == 200
+    assert 'provider "aws" {' in results["result"]
+    assert list(results["profile"]["phases"]) == ["parse", "low_level", "render"]
+    counts = results["profile"]["counts"]
+    assert counts["resources"] == 2
+    assert counts["bindings"] == 2
+    assert counts["templates_rendered"] > counts["low_level_items"]
+    assert counts["bytes"] == len("\n".join(results["result"]).encode())
+    assert ("stats" in results["profile"]) == (profile == "cprofile")
+
+
+def test_build_profile_invalid_mapping():
+    results, status = api_handler.handle(
+        "1.0", "build", {"mapping": {"foo": {"resource": "unknown"}}, "profile": True}
+    )
+
+    assert status == 422
+    assert "unknown" in results["result"]
+    assert list(results["profile"]["phases"]) == ["parse"]
+
+
+def test_build_accepts_list_mapping_as_request():
+    results, status = api_handler.handle("1.0", "build", SAMPLE_MAPPING)
+
+    assert status == 200
+    assert 'provider "aws" {' in results
+
+
+def test_build_seed_keeps_names_stable_across_edits():
+    edited = copy.deepcopy(SAMPLE_MAPPING)
+    edited[0]["resources"]["server"]["params"]["aws_instance_type"] = "t3.micro"
+
+    before, _ = api_handler.handle("1.0", "build", {"mapping": SAMPLE_MAPPING, "seed": "stack"})
+    after, _ = api_handler.handle("1.0", "build", {"mapping": edited, "seed": "stack"})
+    other, _ = api_handler.handle("1.0", "build", {"mapping": SAMPLE_MAPPING, "seed": "other-stack"})
+
+    assert before != after
+    assert _generated_names(before) and _generated_names(before) == _generated_names(after)
+    assert _generated_names(before).isdisjoint(_generated_names(other))
+
+
+def test_build_rejects_invalid_seed():
+    assert api_handler.handle("1.0", "build", {"mapping": SAMPLE_MAPPING, "seed": 1})[1] == 422
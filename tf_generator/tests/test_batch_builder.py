@@ -0,0 +1,69 @@
+import os
+import shutil
+
+import pytest
+
+import batch_builder
+import operations
+from config import BASE_DIR
+from mapping_loader import load_mapping
+
+SAMPLE_PATH = os.path.join(BASE_DIR, "tests", "samples", "basic_example.yaml")
+
+
+@pytest.fixture
+def mappings_dir(tmp_path) -> str:
+    path = tmp_path / "mappings"
+    path.mkdir()
+    shutil.copy(SAMPLE_PATH, path / "first.yaml")
+    shutil.copy(SAMPLE_PATH, path / "second.yml")
+    (path / "invalid.json").write_text('{"foo": 42}')
+    (path / "notes.txt").write_text("not a mapping")
+    return str(path)
+
+
+@pytest.mark.parametrize(
+    "paths,expected",
+    [
+        pytest.param(["single.yaml"], False, id="test_single_file"),
+        pytest.param(["first.yaml", "second.yml"], True, id="test_multiple_files"),
+        pytest.param(["*.yaml"], True, id="test_glob"),
+    ],
+)
+def test_is_batch_input(paths, expected):
+    assert batch_builder.is_batch_input(paths) == expected
+
+
+def test_expand_inputs(mappings_dir: str):
+    expected = [os.path.join(mappings_dir, name) for name in ["first.yaml", "invalid.json", "second.yml"]]
+
+    assert batch_builder.expand_inputs([mappings_dir]) == expected
+    assert batch_builder.expand_inputs([os.path.join(mappings_dir, "*.y*ml")]) == [expected[0], expected[2]]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_build_files(workers: int, mappings_dir: str, tmp_path):
+    output_dir = str(tmp_path / "out")
+    os.makedirs(output_dir)
+    inputs = batch_builder.expand_inputs([mappings_dir])
+    jobs = [(path, batch_builder.get_output_path(path, output_dir)) for path in inputs]
+
+    results = batch_builder.build_files(jobs, workers=workers)
+
+    assert [(result.input_path, result.ok) for result in results] == [
+        (inputs[0], True),
+        (inputs[1], False),
+        (inputs[2], True),
+    ]
+    assert sorted(os.listdir(output_dir)) == ["first.yaml.tf", "second.yml.tf"]
+    assert "Invalid mapping" in results[1].error
+
+
+def test_build_files_with_seed(tmp_path):
+    output_path = str(tmp_path / "out.tf")
+
+    (result,) = batch_builder.build_files([(SAMPLE_PATH, output_path)], seed="stack")
+
+    assert result.ok
+    expected = operations.build_regions(load_mapping(SAMPLE_PATH), seed="stack")
+    assert open(output_path).read() == "".join(next(iter(expected.values())))
@@ -0,0 +1,38 @@
+import pytest
+
+from benchmarks import phases, regions as regions_benchmark
+from benchmarks.synthetic import generate_mapping, generate_sized_mapping
+from models.mapping_parser import parse_mapping
+from operations import build_regions
+
+
+@pytest.mark.parametrize("regions", [1, 3])
+def test_synthetic_mapping_builds(regions: int):
+    mapping = generate_mapping(vm=4, docker=2, s3=3, binding_density=2, regions=regions)
+
+    hl_maps = parse_mapping(mapping).get_maps()
+    assert len(hl_maps[0].resources) == 9
+    assert len(hl_maps[0].region_resources) == regions
+    assert len(build_regions(mapping, hl_maps=hl_maps)) == regions
+
+
+def test_synthetic_mapping_size():
+    mapping = generate_sized_mapping(101)
+    assert sum(len(region["resources"]) for region in mapping[0]["regions"]) == 101
+
+
+def test_compare_flags_regressions():
+    baseline = {"results": [{"resources": 10, "phases": {"parse": 0.010, "render": 0.010, "load": 0.0001}}]}
+    results = {"results": [{"resources": 10, "phases": {"parse": 0.011, "render": 0.020, "load": 0.0009}}]}
+
+    regressions = phases.compare(results, baseline, tolerance=0.2)
+
+    assert len(regressions) == 1
+    assert regressions[0].startswith("render of 10 resources")
+
+
+def test_regions_benchmark_reports_speedups():
+    results = regions_benchmark.run(regions=2, size=10, workers=2, repeat=1)
+
+    assert set(results["seconds"]) == {"largest_region", "serial", "threads", "processes"}
+    assert set(results["speedup"]) == {"threads", "processes"}
@@ -0,0 +1,99 @@
+import time
+
+import pytest
+
+import api_handler
+import build_cache
+from build_cache import BuildCache, CacheStore, DiskCacheStore, MemoryCacheStore, get_build_key
+
+MAPPING = [{"cloud": "aws", "resources": {"bucket": {"resource": "s3"}}}]
+
+
+def test_build_key_is_canonical():
+    reordered = [{"resources": {"bucket": {"resource": "s3"}}, "cloud": "aws"}]
+
+    assert get_build_key(MAPPING, deterministic=True) == get_build_key(reordered, deterministic=True)
+    assert get_build_key(MAPPING, deterministic=True) != get_build_key(MAPPING, deterministic=False)
+    assert get_build_key(MAPPING) != get_build_key([{"cloud": "aws", "resources": {}}])
+
+
+def test_cache_counts_hits_and_misses():
+    cache = BuildCache(MemoryCacheStore())
+    builds = []
+
+    for _ in range(3):
+        assert cache.get_or_build(MAPPING, lambda: builds.append(1) or {"aws-eu-west-1": "out"}) == {
+            "aws-eu-west-1": "out"
+        }
+
+    assert len(builds) == 1
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["hit_rate"] == pytest.approx(2 / 3)
+
+
+def test_incomplete_store_cannot_be_created():
+    class GetOnlyStore(CacheStore):
+        def get(self, key: str):
+            return None
+
+    with pytest.raises(TypeError):
+        GetOnlyStore()
+
+
+def test_memory_store_evicts_least_recently_used():
+    store = MemoryCacheStore(max_entries=2)
+    store.set("a", {"r": "a"})
+    store.set("b", {"r": "b"})
+    store.get("a")
+    store.set("c", {"r": "c"})
+
+    assert store.get("b") is None
+    assert store.get("a") == {"r": "a"}
+    assert store.evictions == 1
+
+
+@pytest.mark.parametrize("store_factory", [MemoryCacheStore, DiskCacheStore], ids=["memory", "disk"])
+def test_store_expires_entries(store_factory, tmp_path, monkeypatch):
+    store = store_factory(ttl=10) if store_factory is MemoryCacheStore else store_factory(str(tmp_path), ttl=10)
+    store.set("a", {"r": "a"})
+    assert store.get("a") == {"r": "a"}
+
+    now = time.time()
+    monkeypatch.setattr(build_cache.time, "time", lambda: now + 11)
+
+    assert store.get("a") is None
+    assert store.expirations == 1
+    assert len(store) == 0
+
+
+def test_disk_store_bounded_by_size(tmp_path):
+    store = DiskCacheStore(str(tmp_path), max_bytes=2500)
+    for key in "abc":
+        store.set(key, {"r": key * 1000})
+
+    assert store.get("a") is None
+    assert store.get("c") == {"r": "c" * 1000}
+    assert store.evictions == 1
+
+
+def test_api_reports_cache_stats():
+    api_handler.handle("1.0", "build", {"mapping": MAPPING, "deterministic": True})
+    before, _ = api_handler.handle("1.0", "cache_stats", {})
+    results, status = api_handler.handle("1.0", "build", {"mapping": MAPPING, "deterministic": True})
+    after, _ = api_handler.handle("1.0", "cache_stats", {})
+
+    assert status == 200
+    assert any('resource "aws_s3_bucket" "bucket-bucket"' in line for line in results)
+    assert after["hits"] == before["hits"] + 1
+    assert after["store"] == "MemoryCacheStore"
+
+
+def test_api_does_not_cache_random_names():
+    before, _ = api_handler.handle("1.0", "cache_stats", {})
+    first, _ = api_handler.handle("1.0", "build", {"mapping": MAPPING})
+    second, _ = api_handler.handle("1.0", "build", {"mapping": MAPPING})
+    after, _ = api_handler.handle("1.0", "cache_stats", {})
+
+    assert first != second
+    assert (after["hits"], after["misses"]) == (before["hits"], before["misses"])
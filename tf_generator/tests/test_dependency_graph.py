@@ -0,0 +1,78 @@
+from typing import Dict, List
+
+import pytest
+
+from models.dependency_graph import DependencyGraph, DependencyCycleException
+from models.low_level_items_aws import LowLevelAWSItem, LoggingS3Bucket, S3, VPC, EC2
+
+
+def _items(dependencies: Dict[str, List[str]]) -> Dict[str, LowLevelAWSItem]:
+    items = {uid: LowLevelAWSItem(uid) for uid in dependencies}
+    for uid, deps in dependencies.items():
+        items[uid].depends_on = {items[dep] for dep in deps}
+    return items
+
+
+@pytest.mark.parametrize(
+    "dependencies,roots,expected_order",
+    [
+        pytest.param({"a": [], "b": [], "c": []}, ["c", "a", "b"], ["c", "a", "b"], id="test_independent_keep_order"),
+        pytest.param({"a": ["b"], "b": ["c"], "c": []}, ["a"], ["c", "b", "a"], id="test_transitive_dependencies"),
+        pytest.param(
+            {"ec2": ["vpc", "s3"], "vpc": ["log"], "s3": ["log"], "log": []},
+            ["vpc", "s3", "ec2"],
+            ["log", "vpc", "s3", "ec2"],
+            id="test_shared_dependency",
+        ),
+        pytest.param(
+            {"x": ["z", "y"], "y": [], "z": []},
+            ["x", "y", "z"],
+            ["y", "z", "x"],
+            id="test_dependencies_ordered_by_roots",
+        ),
+        pytest.param(
+            {"x": ["z", "y"], "y": [], "z": []}, ["x"], ["y", "z", "x"], id="test_dependencies_ordered_by_uid"
+        ),
+    ],
+)
+def test_topological_order(dependencies: Dict[str, List[str]], roots: List[str], expected_order: List[str]):
+    items = _items(dependencies)
+    graph = DependencyGraph([items[uid] for uid in roots])
+
+    assert [item.uid for item in graph.topological_order()] == expected_order
+
+
+def test_generations():
+    items = _items({"ec2": ["vpc", "s3"], "vpc": ["log"], "s3": ["log"], "log": [], "other": []})
+    graph = DependencyGraph(items.values())
+
+    assert [[item.uid for item in generation] for generation in graph.generations()] == [
+        ["log", "other"],
+        ["vpc", "s3"],
+        ["ec2"],
+    ]
+
+
+@pytest.mark.parametrize(
+    "dependencies",
+    [
+        pytest.param({"a": ["a"]}, id="test_self_dependency"),
+        pytest.param({"a": ["b"], "b": ["c"], "c": ["a"]}, id="test_cycle"),
+    ],
+)
+def test_cycle_detected(dependencies: Dict[str, List[str]]):
+    items = _items(dependencies)
+    with pytest.raises(DependencyCycleException):
+        DependencyGraph(items.values())
+
+
+def test_low_level_items_graph():
+    logging_bucket = LoggingS3Bucket("log")
+    vpc = VPC("vpc", az_count=1, logging_bucket=logging_bucket)
+    s3 = S3("s3", logging_bucket)
+    ec2 = EC2("ec2", vpc, aws_ec2_instance_type="t2.micro", image_regex="amazon linux", linked_storage={s3})
+    graph = DependencyGraph([vpc, s3, ec2])
+
+    assert [item.uid for item in graph.topological_order()] == ["log", "vpc", "s3", "ec2"]
+    assert graph.edges == [("vpc", "log"), ("s3", "log"), ("ec2", "vpc"), ("ec2", "s3")]
+    assert '"ec2" -> "vpc";' in graph.to_dot()
@@ -0,0 +1,102 @@
+import copy
+import re
+
+import pytest
+
+import api_handler
+import operations
+from build_cache import MemoryCacheStore
+from generator import TerraformGenerator, render_regions_incremental
+from models.fragment_cache import FragmentCache
+
+VM_PARAMS = {"aws_instance_type": "t2.micro", "image_regex": "amazon linux"}
+MAPPING = [
+    {
+        "cloud": "aws",
+        "region": "eu-west-1",
+        "resources": {
+            "bucket": {"resource": "s3"},
+            "server": {"resource": "vm", "bindings": [{"id": "bucket", "direction": "to"}], "params": {**VM_PARAMS}},
+            "other": {"resource": "vm", "params": {**VM_PARAMS}},
+        },
+    }
+]
+
+
+def _with_params(uid: str, **params):
+    mapping = copy.deepcopy(MAPPING)
+    mapping[0]["resources"][uid].setdefault("params", {}).update(params)
+    return mapping
+
+
+def test_unchanged_mapping_is_not_rerendered():
+    cache = operations.create_fragment_cache()
+
+    _, first = render_regions_incremental(MAPPING, cache)
+    _, second = render_regions_incremental(copy.deepcopy(MAPPING), cache)
+
+    # Both VMs and their VPCs, the bucket and the logging bucket
+    assert len(first["aws-eu-west-1"]) == 6
+    assert {"bucket", "server", "other"} < set(first["aws-eu-west-1"])
+    assert second == {"aws-eu-west-1": []}
+
+
+@pytest.mark.parametrize(
+    "mapping,expected_rendered",
+    [
+        pytest.param(_with_params("other", instance_count=2), ["other"], id="test_changed_item"),
+        pytest.param(_with_params("bucket", versioning_enabled=False), ["bucket", "server"], id="test_dependents"),
+    ],
+)
+def test_only_changed_items_rerendered(mapping, expected_rendered):
+    cache = operations.create_fragment_cache()
+    render_regions_incremental(MAPPING, cache)
+
+    _, rendered = render_regions_incremental(mapping, cache)
+
+    assert sorted(rendered["aws-eu-west-1"]) == sorted(expected_rendered)
+
+
+def test_incremental_output_matches_full_build():
+    cache = operations.create_fragment_cache(seed="seed")
+    render_regions_incremental(MAPPING, cache)
+    mapping = _with_params("other", instance_count=2)
+
+    templates, _ = render_regions_incremental(mapping, cache)
+    expected = TerraformGenerator.generate_region_templates(mapping, seed="seed")
+
+    assert templates == {key: "".join(template) for key, template in expected.items()}
+
+
+def test_api_reports_rerendered_resources():
+    request = {"mapping": MAPPING, "seed": "api"}
+    api_handler.handle("1.0", "build_incremental", request)
+
+    results, status = api_handler.handle("1.0", "build_incremental", {**request, "mapping": _with_params("other")})
+
+    assert status == 200
+    assert results["rendered"] == {"aws-eu-west-1": []}
+    assert 'provider "aws" {' in results["result"]
+
+
+def test_api_names_differ_between_mappings_sharing_uids():
+    first = [{"cloud": "aws", "region": "eu-west-1", "resources": {"data": {"resource": "s3"}}}]
+    second = copy.deepcopy(first)
+    second[0]["resources"]["data"]["params"] = {"versioning_enabled": False}
+
+    first_results, _ = api_handler.handle("1.0", "build_incremental", {"mapping": first})
+    second_results, _ = api_handler.handle("1.0", "build_incremental", {"mapping": second})
+
+    first_names = set(re.findall(r'"(s3-data-[a-z-]+)"', "\n".join(first_results["result"])))
+    second_names = set(re.findall(r'"(s3-data-[a-z-]+)"', "\n".join(second_results["result"])))
+    assert first_names and second_names
+    assert first_names.isdisjoint(second_names)
+    assert "data" in second_results["rendered"]["aws-eu-west-1"]
+
+
+def test_fragments_keyed_by_catalog_version():
+    caches = [FragmentCache(MemoryCacheStore(ttl=None), version, seed="seed") for version in ("1", "2")]
+    for cache in caches:
+        render_regions_incremental(MAPPING, cache)
+
+    assert not set(caches[0].store._entries) & set(caches[1].store._entries)
@@ -0,0 +1,195 @@
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+
+from config import BASE_DIR
+import generator
+from generator import GeneratorEngine, RegionExecutorMode, TerraformGenerator, get_regions, json_to_high_level_list
+from mapping_loader import load_mapping
+from models.exceptions import CloudblocksValidationException
+from template_loader import get_registry
+
+SAMPLES_DIR = os.path.join(BASE_DIR, "tests", "samples")
+SAMPLE_FILES = [os.path.join(SAMPLES_DIR, name) for name in sorted(os.listdir(SAMPLES_DIR))]
+
+
+@pytest.mark.parametrize("path", SAMPLE_FILES)
+def test_template_chunks_stream_whole_document(path: str):
+    data = load_mapping(path)
+    generator = TerraformGenerator()
+
+    chunks = list(generator.generate_template_chunks(data))
+    out = io.StringIO()
+    generator.write_template_from_json(data, out)
+
+    assert len(chunks) > 1
+    assert out.getvalue() == "".join(chunks) == generator.generate_template_from_json(data)
+
+
+@pytest.mark.parametrize("path", SAMPLE_FILES)
+def test_template_sections_in_order(path: str):
+    out = TerraformGenerator().generate_template_from_json(load_mapping(path))
+
+    providers = out.index("# Auto-generated section: providers import")
+    variables = out.index("# Auto-generated section: variables")
+    resources = out.index("# Auto-generated section: resources")
+    outputs = out.index("# Auto-generated section: outputs")
+    assert providers < out.index('provider "aws"') < variables < resources < out.index('resource "') < outputs
+
+
+VM_PARAMS = {"aws_instance_type": "t2.micro", "image_regex": "amazon linux"}
+TEST_DATA_MULTI_REGION_MAPPING = [
+    {
+        "cloud": "aws",
+        "regions": [
+            {
+                "region": "eu-west-1",
+                "resources": {
+                    "bucket-eu": {"resource": "s3"},
+                    "vm-eu": {
+                        "resource": "vm",
+                        "bindings": [{"id": "bucket-eu", "direction": "to"}],
+                        "params": VM_PARAMS,
+                    },
+                },
+            },
+            {"region": "us-east-1", "resources": {"bucket-us": {"resource": "s3"}}},
+        ],
+    },
+    {"cloud": "aws", "region": "eu-central-1", "resources": {"vm-central": {"resource": "vm", "params": VM_PARAMS}}},
+]
+
+
+def test_get_regions():
+    regions = get_regions(json_to_high_level_list(TEST_DATA_MULTI_REGION_MAPPING))
+
+    assert [(key, [x.uid for x in hl_map.region_resources[region]]) for key, hl_map, region in regions] == [
+        ("aws-eu-west-1", ["bucket-eu", "vm-eu"]),
+        ("aws-us-east-1", ["bucket-us"]),
+        ("aws-eu-central-1", ["vm-central"]),
+    ]
+
+
+@pytest.mark.parametrize("use_process_pool", [False, True])
+def test_region_templates(use_process_pool: bool):
+    if use_process_pool:
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            region_templates = TerraformGenerator.generate_region_templates(TEST_DATA_MULTI_REGION_MAPPING, executor)
+    else:
+        region_templates = TerraformGenerator.generate_region_templates(TEST_DATA_MULTI_REGION_MAPPING)
+    templates = {key: "".join(template) for key, template in region_templates.items()}
+
+    assert list(templates) == ["aws-eu-west-1", "aws-us-east-1", "aws-eu-central-1"]
+    assert 'default = "eu-west-1"' in templates["aws-eu-west-1"]
+    assert 'resource "aws_instance" "ec2_instance_vm-eu"' in templates["aws-eu-west-1"]
+    assert 'resource "aws_s3_bucket" "bucket-bucket-us"' in templates["aws-us-east-1"]
+    assert "bucket-eu" not in templates["aws-us-east-1"]
+    assert 'resource "aws_instance" "ec2_instance_vm-central"' in templates["aws-eu-central-1"]
+
+
+def test_engine_renders_regions_on_threads_itself():
+    engine = GeneratorEngine()
+    engine.base = get_registry().from_string("# rendered by this engine\n{{ providers }}")
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        region_templates = engine.build(TEST_DATA_MULTI_REGION_MAPPING, executor)
+
+    assert all("".join(x).startswith("# rendered by this engine") for x in region_templates.values())
+
+
+def test_regions_rendered_in_process_pool_by_default(monkeypatch):
+    monkeypatch.setattr(generator, "REGION_WORKERS", 2)
+    generator.set_region_executor_mode(RegionExecutorMode.SERIAL)
+    serial = GeneratorEngine().build(TEST_DATA_MULTI_REGION_MAPPING, deterministic=True)
+
+    generator.set_region_executor_mode(RegionExecutorMode.PROCESS)
+    try:
+        pooled = GeneratorEngine().build(TEST_DATA_MULTI_REGION_MAPPING, deterministic=True)
+        assert isinstance(generator.get_region_pool(), ProcessPoolExecutor)
+    finally:
+        generator.set_region_executor_mode(RegionExecutorMode.SERIAL)
+        generator.set_region_executor_mode(generator.REGION_EXECUTOR)
+
+    assert {key: "".join(x) for key, x in pooled.items()} == {key: "".join(x) for key, x in serial.items()}
+
+
+def test_shutdown_region_pool(monkeypatch):
+    monkeypatch.setattr(generator, "REGION_WORKERS", 2)
+    generator.set_region_executor_mode(RegionExecutorMode.PROCESS)
+    try:
+        pool = generator.get_region_pool()
+        assert pool.submit(abs, -1).result() == 1
+
+        generator.shutdown_region_pool()
+
+        with pytest.raises(RuntimeError):
+            pool.submit(abs, -1)
+        assert generator.get_region_pool() is not pool
+    finally:
+        generator.set_region_executor_mode(RegionExecutorMode.SERIAL)
+        generator.set_region_executor_mode(generator.REGION_EXECUTOR)
+
+
+def test_single_region_template_rejects_multiple_regions():
+    with pytest.raises(CloudblocksValidationException):
+        TerraformGenerator().generate_template_from_json(TEST_DATA_MULTI_REGION_MAPPING)
+
+
+def test_cross_region_binding_rejected():
+    mapping = [
+        {
+            "cloud": "aws",
+            "regions": [
+                {"region": "eu-west-1", "resources": {"bucket": {"resource": "s3"}}},
+                {
+                    "region": "us-east-1",
+                    "resources": {
+                        "vm": {
+                            "resource": "vm",
+                            "bindings": [{"id": "bucket", "direction": "to"}],
+                            "params": VM_PARAMS,
+                        }
+                    },
+                },
+            ],
+        }
+    ]
+
+    with pytest.raises(CloudblocksValidationException):
+        TerraformGenerator.generate_region_templates(mapping)
+
+
+@pytest.mark.parametrize("path", SAMPLE_FILES)
+def test_deterministic_build_is_reproducible(path: str):
+    data = load_mapping(path)
+
+    first = TerraformGenerator.generate_region_templates(data, deterministic=True)
+    second = TerraformGenerator.generate_region_templates(load_mapping(path), deterministic=True)
+
+    assert {key: "".join(x) for key, x in first.items()} == {key: "".join(x) for key, x in second.items()}
+
+
+def test_deterministic_names_differ_per_region_and_seed():
+    templates = TerraformGenerator.generate_region_templates(TEST_DATA_MULTI_REGION_MAPPING, deterministic=True)
+    seeded = TerraformGenerator.generate_region_templates(TEST_DATA_MULTI_REGION_MAPPING, seed="stable")
+    eu, us = ("".join(templates[key]) for key in ("aws-eu-west-1", "aws-us-east-1"))
+
+    logging_bucket = 'resource "aws_s3_bucket" "bucket-'
+    assert eu[eu.index(logging_bucket) :].split('"')[3] != us[us.index(logging_bucket) :].split('"')[3]
+    assert "".join(seeded["aws-eu-west-1"]) != eu
+
+
+def test_engine_builds_concurrently():
+    engine = GeneratorEngine()
+    state = dict(vars(engine))
+    mappings = [TEST_DATA_MULTI_REGION_MAPPING, load_mapping(SAMPLE_FILES[0])] * 8
+
+    def build(mapping):
+        return {key: "".join(x) for key, x in engine.build(mapping, deterministic=True).items()}
+
+    expected = [build(mapping) for mapping in mappings]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        assert list(executor.map(build, mappings)) == expected
+    assert vars(engine) == state
@@ -0,0 +1,66 @@
+import pytest
+
+from models.exceptions import CloudblocksValidationException
+from models.high_level_items import HighLevelMap
+
+TEST_DATA_MULTI_REGION_MAPPING = {
+    "cloud": "aws",
+    "regions": [
+        {
+            "region": "eu-west-1",
+            "resources": {
+                "server": {"resource": "vm", "bindings": [{"id": "bucket", "direction": "to"}]},
+                "bucket": {"resource": "s3"},
+            },
+        },
+        {
+            "region": "us-east-1",
+            "resources": {
+                "container": {"resource": "docker", "bindings": [{"id": "bucket", "direction": "to"}]},
+            },
+        },
+    ],
+}
+
+
+def test_map_resolves_bindings_across_regions():
+    hl_map = HighLevelMap.from_dict(TEST_DATA_MULTI_REGION_MAPPING)
+
+    assert [resource.uid for resource in hl_map.resources] == ["server", "bucket", "container"]
+    assert hl_map["server"].bindings[0].target is hl_map["bucket"]
+    assert hl_map["container"].bindings[0].target is hl_map["bucket"]
+
+
+@pytest.mark.parametrize(
+    "uid,region",
+    [("server", "eu-west-1"), ("bucket", "eu-west-1"), ("container", "us-east-1")],
+)
+def test_map_region_lookup(uid: str, region: str):
+    hl_map = HighLevelMap.from_dict(TEST_DATA_MULTI_REGION_MAPPING)
+
+    assert hl_map.get_region(uid) == region
+    assert hl_map.get(uid, region).uid == uid
+
+
+@pytest.mark.parametrize(
+    "uid,region",
+    [("missing", None), ("server", "us-east-1"), ("container", "eu-west-1")],
+)
+def test_map_missing_resource(uid: str, region: str):
+    hl_map = HighLevelMap.from_dict(TEST_DATA_MULTI_REGION_MAPPING)
+
+    with pytest.raises(KeyError):
+        hl_map.get(uid, region)
+
+
+def test_map_duplicate_uid():
+    mapping = {
+        "cloud": "aws",
+        "regions": [
+            {"region": "eu-west-1", "resources": {"bucket": {"resource": "s3"}}},
+            {"region": "us-east-1", "resources": {"bucket": {"resource": "s3"}}},
+        ],
+    }
+
+    with pytest.raises(CloudblocksValidationException):
+        HighLevelMap.from_dict(mapping)
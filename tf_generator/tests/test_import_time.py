@@ -0,0 +1,60 @@
+import subprocess
+import sys
+from typing import Dict
+
+import pytest
+
+from config import BASE_DIR
+
+# Cumulative import time budgets (in microseconds) for modules loaded on Lambda cold start.
+# They are deliberately generous, their purpose is to catch heavy dependencies sneaking back into the import graph.
+IMPORT_TIME_BUDGETS_US = {
+    "api_handler": 50_000,
+    "aws_lambda": 150_000,
+}
+
+# Only needed once a request is actually handled, or by the CLI
+LAZY_MODULES = ["boto3", "cloup", "yaml", "jinja2", "schema", "petname", "generator", "cli", "models"]
+
+
+def _import_times(module: str) -> Dict[str, int]:
+    """Import a module in a fresh interpreter and return the cumulative import time of every module it loaded"""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BASE_DIR,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stderr
+
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+@pytest.mark.parametrize("module,budget", IMPORT_TIME_BUDGETS_US.items())
+def test_import_time_within_budget(module: str, budget: int):
+    # Best of a few runs, to smooth out noise from the machine running the tests
+    cumulative = min(_import_times(module)[module] for _ in range(3))
+    assert cumulative < budget, f"Importing {module} took {cumulative}us, budget is {budget}us"
+
+
+@pytest.mark.parametrize("module", IMPORT_TIME_BUDGETS_US.keys())
+def test_import_does_not_load_lazy_modules(module: str):
+    loaded = _import_times(module).keys()
+    eager = [name for name in loaded if name.split(".")[0] in LAZY_MODULES]
+    assert not eager, f"Importing {module} eagerly loaded {eager}"
+
+
+# Loaded by the CLI commands using them, rather than to parse arguments or print --help
+CLI_LAZY_MODULES = ["yaml", "jinja2", "schema", "generator", "models", "server", "watcher", "batch_builder", "profiler"]
+
+
+def test_cli_import_does_not_load_generator_stack():
+    loaded = _import_times("cli").keys()
+    eager = [name for name in loaded if name.split(".")[0] in CLI_LAZY_MODULES]
+    assert not eager, f"Importing cli eagerly loaded {eager}"
@@ -0,0 +1,114 @@
+import os
+from typing import List
+
+import pytest
+
+from config import BASE_DIR
+from mapping_loader import load_mapping
+from models.exceptions import CloudblocksValidationException
+from models.high_level_items import HighLevelBindingDirection, HighLevelMap
+from models.mapping_parser import parse_mapping
+
+SAMPLE_MAPPING = load_mapping(os.path.join(BASE_DIR, "tests", "samples", "basic_example.yaml"))
+VM_PARAMS = {"aws_instance_type": "t2.micro", "image_regex": "ubuntu"}
+
+
+def test_parse_sample():
+    result = parse_mapping(SAMPLE_MAPPING)
+
+    assert result.ok
+    assert result.message is None
+    assert len(result.get_maps()) == 1
+
+
+def test_parse_resolves_bindings():
+    mapping = [
+        {
+            "cloud": "aws",
+            "regions": [
+                {
+                    "region": "eu-west-1",
+                    "resources": {
+                        "vm": {
+                            "resource": "vm",
+                            "params": VM_PARAMS,
+                            "bindings": [{"id": "bucket", "direction": "from"}],
+                        },
+                        "bucket": {"resource": "s3"},
+                    },
+                },
+                {"region": "us-east-1", "resources": {"db": {"resource": "postgresql"}}},
+            ],
+        }
+    ]
+
+    hl_map = parse_mapping(mapping).get_maps()[0]
+
+    assert sorted(hl_map.region_resources) == ["eu-west-1", "us-east-1"]
+    vm = hl_map.get("vm")
+    assert vm.resource.key == "vm"
+    assert vm.bindings[0].target is hl_map.get("bucket")
+    assert vm.bindings[0].direction == HighLevelBindingDirection.FROM
+    # Same structure as the maps the generator built before parsing was done in a single pass
+    assert [r.uid for r in hl_map.resources] == [r.uid for r in HighLevelMap.from_dict(mapping[0]).resources]
+
+
+@pytest.mark.parametrize(
+    "mapping,expected_errors",
+    [
+        pytest.param(
+            {"vm": {"resource": "vm", "params": {"aws_instance_type": "t2.micro"}}},
+            ["/vm/params: One of the params ['aws_ami', 'image_regex'] is required"],
+            id="test_missing_image_params",
+        ),
+        pytest.param(
+            {"vm": {"resource": "vm", "params": {"image_regex": "ubuntu", "instance_count": "many"}}},
+            ["/vm/params/instance_count: 'many' should satisfy", "/vm/params: Missing key 'aws_instance_type'"],
+            id="test_invalid_params",
+        ),
+        pytest.param(
+            {"foo": {"resource": "unknown"}},
+            ["/foo/resource: No resource with key unknown found"],
+            id="test_unknown_resource",
+        ),
+        pytest.param(
+            {"vm": {"resource": "vm", "params": VM_PARAMS, "bindings": [{"id": "nope", "direction": "to"}]}},
+            ["/vm/bindings/0/id: No resource with uid nope found"],
+            id="test_missing_binding_target",
+        ),
+        pytest.param(
+            {
+                "bucket": {"resource": "s3", "bindings": [{"id": "db", "direction": "to"}]},
+                "db": {"resource": "postgresql"},
+            },
+            [
+                "/bucket/bindings/0/direction: Storage item cannot bind TO another element",
+                "/bucket/bindings/0/id: Storage item cannot bind with a database",
+            ],
+            id="test_storage_binding",
+        ),
+        pytest.param(
+            [{"cloud": "aws", "regions": [{"region": "nowhere"}, {"resources": {}}]}],
+            ["/0/regions/0/region: Region nowhere not recognised", "/0/regions/1: Missing key 'region'"],
+            id="test_invalid_regions",
+        ),
+    ],
+)
+def test_parse_reports_every_error(mapping, expected_errors: List[str]):
+    result = parse_mapping(mapping)
+
+    assert not result.ok
+    assert result.maps == []
+    messages = [str(error) for error in result.errors]
+    assert len(messages) == len(expected_errors)
+    for message, expected in zip(messages, expected_errors):
+        assert message.startswith(expected)
+
+
+def test_parse_get_maps_raises_with_every_error():
+    result = parse_mapping({"foo": {"resource": "unknown"}, "bar": {"resource": "also-unknown"}})
+
+    with pytest.raises(CloudblocksValidationException) as e:
+        result.get_maps()
+    assert e.value.errors == result.errors
+    assert len(e.value.errors) == 2
@@ -0,0 +1,89 @@
+import json
+
+import pytest
+
+import aws_lambda
+import metrics
+from metrics import LogEventBody, MetricsRecorder, Unit
+
+BODY = json.dumps({"version": "1.0", "action": "build", "mapping": {"foo": {"resource": "s3"}}})
+
+
+def test_recorder_emf():
+    recorder = MetricsRecorder(namespace="Test")
+    recorder.put_dimension("Action", "build")
+    recorder.put_metric("InputSize", 42, Unit.BYTES)
+    recorder.set_property("StatusCode", 200)
+    with recorder.time_phase("Build"):
+        pass
+
+    emf = recorder.to_emf(timestamp=1.5)
+
+    assert emf["_aws"] == {
+        "Timestamp": 1500,
+        "CloudWatchMetrics": [
+            {
+                "Namespace": "Test",
+                "Dimensions": [["Action"]],
+                "Metrics": [
+                    {"Name": "InputSize", "Unit": "Bytes"},
+                    {"Name": "BuildLatency", "Unit": "Milliseconds"},
+                ],
+            }
+        ],
+    }
+    assert emf["Action"] == "build"
+    assert emf["InputSize"] == 42
+    assert emf["StatusCode"] == 200
+    assert emf["BuildLatency"] >= 0
+
+
+@pytest.mark.parametrize(
+    "mode,expected_body,expected_extra",
+    [
+        pytest.param(LogEventBody.REDACT, None, {"bodyRedacted": True, "bodySize": len(BODY)}, id="test_redact"),
+        pytest.param(
+            LogEventBody.TRUNCATE, BODY[:10], {"bodyTruncated": True, "bodySize": len(BODY)}, id="test_trunc"
+        ),
+        pytest.param(LogEventBody.FULL, BODY, {}, id="test_full"),
+    ],
+)
+def test_redact_event(mode: str, expected_body, expected_extra):
+    event = {"body": BODY, "path": "/"}
+
+    redacted = metrics.redact_event(event, mode, max_chars=10)
+
+    assert redacted == {"body": expected_body, "path": "/", **expected_extra}
+    assert event["body"] == BODY
+
+
+@pytest.mark.parametrize("sample_rate,expected", [(0, False), (1, True)])
+def test_should_log_event(sample_rate: float, expected: bool):
+    assert metrics.should_log_event(sample_rate) == expected
+
+
+def test_lambda_handler_emits_metrics_without_logging_body(capsys, monkeypatch):
+    monkeypatch.setattr(metrics, "should_log_event", lambda: False)
+
+    result = aws_lambda.lambda_handler_new({"body": BODY}, None)
+
+    assert result["statusCode"] == 200
+    [line] = capsys.readouterr().out.splitlines()
+    emf = json.loads(line)
+    assert emf["Action"] == "build"
+    assert emf["InputSize"] == len(BODY)
+    assert emf["OutputSize"] == len("\n".join(result["body"]))
+    assert emf["Error"] == 0
+    assert {"DecodeLatency", "ParseLatency", "BuildLatency", "Latency", "CacheHit"} <= emf.keys()
+
+
+def test_lambda_handler_logs_failed_requests(capsys, monkeypatch):
+    monkeypatch.setattr(metrics, "should_log_event", lambda: False)
+
+    with pytest.raises(json.JSONDecodeError):
+        aws_lambda.lambda_handler_new({"body": "not json"}, None)
+
+    event, emf = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert event == {"body": None, "bodyRedacted": True, "bodySize": len("not json")}
+    assert emf["Error"] == 1
+    assert emf["StatusCode"] == 500
@@ -0,0 +1,24 @@
+import re
+
+from models.naming import NameGenerator, mapping_digest
+
+
+def test_seeded_names_are_stable():
+    names = NameGenerator("seed").scoped("aws-eu-west-1")
+
+    assert names.generate_id("vpc", "server") == NameGenerator("seed", ("aws-eu-west-1",)).generate_id("vpc", "server")
+    assert names.generate_id("vpc", "server") != names.generate_id("vpc", "other")
+    assert names.generate_name("s3", "bucket") == names.generate_name("s3", "bucket")
+    assert re.fullmatch(r"s3-bucket-[a-z]+-[a-z]+-[a-z]+", names.generate_name("s3", "bucket"))
+
+
+def test_unseeded_names_are_random():
+    names = NameGenerator()
+
+    assert len(names.generate_id()) == 32
+    assert names.generate_id() != names.generate_id()
+
+
+def test_mapping_digest_ignores_key_order():
+    assert mapping_digest({"a": 1, "b": [1, 2]}) == mapping_digest({"b": [1, 2], "a": 1})
+    assert mapping_digest({"a": 1}) != mapping_digest({"a": 2})
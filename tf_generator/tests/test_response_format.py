@@ -0,0 +1,88 @@
+import base64
+import gzip
+import io
+import json
+import os
+import tarfile
+import zipfile
+
+import pytest
+
+import api_handler
+import aws_lambda
+from config import BASE_DIR
+from mapping_loader import load_mapping
+from response_format import EncodedBody, to_archive
+
+SAMPLE_MAPPING = load_mapping(os.path.join(BASE_DIR, "tests", "samples", "basic_example.yaml"))
+REGION_FILES = ["providers.tf", "variables.tf", "main.tf", "outputs.tf"]
+
+
+def _build(response_format: str, mapping=SAMPLE_MAPPING):
+    results, status = api_handler.handle(
+        "1.0", "build", {"mapping": mapping, "deterministic": True, "format": response_format}
+    )
+    assert status == 200
+    return results
+
+
+def test_string_format_matches_lines():
+    assert _build("string").split("\n") == _build("lines")
+
+
+def test_gzip_format_round_trips():
+    result = _build("gzip")
+
+    assert isinstance(result, EncodedBody)
+    assert result.headers == {"Content-Type": "text/plain; charset=utf-8", "Content-Encoding": "gzip"}
+    assert gzip.decompress(result.data).decode() == _build("string")
+
+
+def test_zip_format_contains_region_files():
+    result = _build("zip")
+
+    with zipfile.ZipFile(io.BytesIO(result.data)) as archive:
+        assert archive.namelist() == REGION_FILES
+        main = archive.read("main.tf").decode()
+        providers = archive.read("providers.tf").decode()
+    assert 'provider "aws" {' in providers
+    assert 'provider "aws" {' not in main
+    assert 'resource "aws_' in main
+
+
+def test_tar_format_contains_region_files():
+    result = _build("tar")
+
+    assert result.headers == {"Content-Type": "application/x-tar", "Content-Encoding": "gzip"}
+    with tarfile.open(fileobj=io.BytesIO(gzip.decompress(result.data))) as archive:
+        assert archive.getnames() == REGION_FILES
+
+
+def test_archive_is_reproducible():
+    assert _build("zip").data == _build("zip").data
+
+
+def test_archive_has_a_directory_per_region():
+    region_files = {"aws-eu-west-1": {"main.tf": "a"}, "aws-us-east-1": {"main.tf": "b"}}
+
+    with zipfile.ZipFile(io.BytesIO(to_archive(region_files, "zip").data)) as archive:
+        assert archive.namelist() == ["aws-eu-west-1/main.tf", "aws-us-east-1/main.tf"]
+
+
+@pytest.mark.parametrize("response_format", ["xml", None])
+def test_unknown_format_is_rejected(response_format):
+    results, status = api_handler.handle("1.0", "build", {"mapping": SAMPLE_MAPPING, "format": response_format})
+
+    assert status == 422
+    assert "not recognised" in results
+
+
+def test_lambda_returns_encoded_body_as_base64():
+    body = json.dumps({"version": "1.0", "action": "build", "mapping": SAMPLE_MAPPING, "format": "gzip"})
+
+    response = aws_lambda.lambda_handler_new({"body": body}, None)
+
+    assert response["statusCode"] == 200
+    assert response["isBase64Encoded"] is True
+    assert response["headers"]["Content-Encoding"] == "gzip"
+    assert 'provider "aws" {' in gzip.decompress(base64.b64decode(response["body"])).decode()
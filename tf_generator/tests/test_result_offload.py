@@ -0,0 +1,145 @@
+import gzip
+import hashlib
+import json
+import os
+
+import pytest
+
+import api_handler
+import result_offload
+from config import BASE_DIR
+from mapping_loader import load_mapping
+from response_format import EncodedBody
+from result_offload import ResultOffloader, get_payload_size
+
+moto = pytest.importorskip("moto")
+
+BUCKET = "test-generated-tf"
+PART_SIZE = 5 * 1024 * 1024
+SAMPLE_MAPPING = load_mapping(os.path.join(BASE_DIR, "tests", "samples", "basic_example.yaml"))
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    result_offload.get_s3_client.cache_clear()
+    with moto.mock_aws():
+        client = result_offload.get_s3_client()
+        client.create_bucket(Bucket=BUCKET, CreateBucketConfiguration={"LocationConstraint": client.meta.region_name})
+        yield client
+    result_offload.get_s3_client.cache_clear()
+
+
+def _get_object(client, offloaded: result_offload.OffloadedResult) -> bytes:
+    key = offloaded.url.split("?")[0].split(f"{BUCKET}/")[-1].split(".amazonaws.com/")[-1]
+    body = client.get_object(Bucket=BUCKET, Key=key)["Body"].read()
+    assert hashlib.sha256(body).hexdigest() == offloaded.sha256
+    return body
+
+
+@pytest.mark.parametrize(
+    "size,expected_parts",
+    [
+        pytest.param(1024, 0, id="test_single_put"),
+        pytest.param(2 * PART_SIZE + 1024, 3, id="test_multipart"),
+    ],
+)
+def test_offload_uploads_result(s3, size: int, expected_parts: int):
+    result = EncodedBody(os.urandom(size), "application/zip")
+    offloader = ResultOffloader(bucket=BUCKET, part_size=PART_SIZE, workers=3)
+
+    offloaded = offloader.offload(result)
+
+    assert offloaded.size == size
+    assert offloaded.sha256 in offloaded.url
+    assert "Signature" in offloaded.url or "X-Amz-Signature" in offloaded.url
+    assert _get_object(s3, offloaded) == result.data
+    head = s3.head_object(Bucket=BUCKET, Key=f"results/{offloaded.sha256}")
+    assert head["ContentType"] == "application/zip"
+    # ETags of multipart uploads end with their number of parts
+    assert head["ETag"].strip('"').endswith(f"-{expected_parts}") == bool(expected_parts)
+
+
+def test_offload_aborts_failed_multipart_upload(s3):
+    offloader = ResultOffloader(bucket=BUCKET, part_size=PART_SIZE, workers=2, client=s3)
+    real_upload_part = s3.upload_part
+
+    def upload_part(**kwargs):
+        if kwargs["PartNumber"] == 2:
+            raise ConnectionError("part upload failed")
+        return real_upload_part(**kwargs)
+
+    s3.upload_part = upload_part
+    with pytest.raises(ConnectionError):
+        offloader.offload(EncodedBody(os.urandom(2 * PART_SIZE), "application/zip"))
+
+    assert not s3.list_multipart_uploads(Bucket=BUCKET).get("Uploads")
+
+
+@pytest.mark.parametrize(
+    "result,threshold,expected",
+    [
+        pytest.param(["a" * 10] * 10, 100, True, id="test_lines_above"),
+        pytest.param(["a" * 10] * 10, 1000, False, id="test_lines_below"),
+        pytest.param(EncodedBody(b"a" * 90, "application/zip"), 100, True, id="test_base64_above"),
+        pytest.param(EncodedBody(b"a" * 60, "application/zip"), 100, False, id="test_base64_below"),
+        pytest.param(["a" * 10] * 10, 0, False, id="test_disabled"),
+    ],
+)
+def test_get_offload_body(result, threshold: int, expected: bool):
+    body = ResultOffloader(threshold=threshold).get_offload_body(result)
+
+    assert (body is not None) is expected
+    if expected and not isinstance(result, EncodedBody):
+        assert body.content_type == "application/json"
+        assert json.loads(body.data) == result
+
+
+def test_payload_size_of_encoded_body_is_base64_size():
+    body = EncodedBody(b"a" * 100, "application/zip")
+    assert get_payload_size(body) == len(body.to_base64())
+
+
+def test_build_offloads_large_result(s3, monkeypatch):
+    offloader = ResultOffloader(bucket=BUCKET, threshold=1024, client=s3)
+    monkeypatch.setattr(api_handler, "get_result_offloader", lambda: offloader)
+
+    results, status = api_handler.handle("1.0", "build", {"mapping": SAMPLE_MAPPING, "format": "gzip"})
+
+    assert status == 200
+    offloaded = result_offload.OffloadedResult(**results["offloaded"])
+    assert offloaded.content_encoding == "gzip"
+    assert 'provider "aws" {' in gzip.decompress(_get_object(s3, offloaded)).decode()
+
+
+def test_build_returns_small_result_inline(s3, monkeypatch):
+    offloader = ResultOffloader(bucket=BUCKET, threshold=10 * 1024 * 1024, client=s3)
+    monkeypatch.setattr(api_handler, "get_result_offloader", lambda: offloader)
+
+    results, status = api_handler.handle("1.0", "build", {"mapping": SAMPLE_MAPPING})
+
+    assert status == 200
+    assert isinstance(results, list)
+    assert not s3.list_objects_v2(Bucket=BUCKET).get("Contents")
+
+
+@pytest.mark.parametrize(
+    "action,data",
+    [
+        pytest.param("build", {"mapping": SAMPLE_MAPPING, "profile": True}, id="test_profiled_build"),
+        pytest.param("build_incremental", {"mapping": SAMPLE_MAPPING}, id="test_incremental_build"),
+        pytest.param("build_batch", {"mappings": [SAMPLE_MAPPING] * 2}, id="test_batch_build"),
+    ],
+)
+def test_builds_offload_large_results(s3, monkeypatch, action: str, data: dict):
+    offloader = ResultOffloader(bucket=BUCKET, threshold=1024, client=s3)
+    monkeypatch.setattr(api_handler, "get_result_offloader", lambda: offloader)
+
+    results, status = api_handler.handle("1.0", action, data)
+
+    assert status == 200
+    offloaded = result_offload.OffloadedResult(**results["offloaded"])
+    assert offloaded.content_type == "application/json"
+    # Lines of the configuration, JSON encoded
+    assert 'provider \\"aws\\" {' in _get_object(s3, offloaded).decode()
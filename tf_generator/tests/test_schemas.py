@@ -1,10 +1,18 @@
-from typing import Dict
+import os
+from typing import Dict, List
 
 import pytest
 from schema import Schema
 
+import schema_validator
+from config import BASE_DIR
+from mapping_loader import load_mapping
+from models.schema_compiler import compile_schema
 from models.schemas import MAP_SCHEMA, RESOURCE_SCHEMA, CLOUD_SCHEMA
 
+SAMPLES_DIR = os.path.join(BASE_DIR, "tests", "samples")
+SAMPLE_FILES = [os.path.join(SAMPLES_DIR, name) for name in sorted(os.listdir(SAMPLES_DIR))]
+
 TEST_DATA_SYS_CONFIGS = [
     pytest.param(
         {"foo": {"resource": "docker"}},
@@ -104,3 +112,64 @@ TEST_DATA_SYS_CONFIGS = [
 @pytest.mark.parametrize("data,schema", TEST_DATA_SYS_CONFIGS)
 def test_sys_config_passes_schema(data: Dict, schema: Schema):
     assert schema.validate(data)
+
+
+@pytest.mark.parametrize("data,schema", TEST_DATA_SYS_CONFIGS)
+def test_compiled_schema_accepts(data: Dict, schema: Schema):
+    assert compile_schema(schema).errors(data) == []
+
+
+TEST_DATA_INVALID_MAPPINGS = [
+    pytest.param({"foo": "bar"}, ["/foo"], id="test_resource_not_an_object"),
+    pytest.param({"foo": {"bindings": []}}, ["/foo"], id="test_missing_resource_key"),
+    pytest.param({"foo": {"resource": "vm", "size": 1}}, ["/foo"], id="test_unknown_resource_key"),
+    pytest.param({"foo": {"resource": "unknown"}}, ["/foo/resource"], id="test_unknown_resource"),
+    pytest.param(
+        {
+            "foo": {
+                "resource": "vm",
+                "bindings": [{"id": "bar", "direction": "sideways"}, {"id": 1, "direction": "to"}],
+            }
+        },
+        ["/foo/bindings/0/direction", "/foo/bindings/1/id"],
+        id="test_every_binding_error",
+    ),
+    pytest.param(
+        [
+            {
+                "cloud": "aws",
+                "regions": [{"region": "eu-west-1"}, {"region": "mars-1"}, {"resources": {"foo": {"resource": "vm"}}}],
+            }
+        ],
+        ["/0/regions/2", "/0/regions/1/region", "/0/regions/2/region"],
+        id="test_region_errors",
+    ),
+    pytest.param([{"cloud": "nimbus", "resources": {"foo": {"resource": "vm"}}}], ["/0/cloud"], id="test_cloud"),
+    pytest.param(
+        [{"cloud": "aws", "resources": {"a/b": {"resource": "vm", "bindings": {}}}}],
+        ["/0/resources/a~1b/bindings"],
+        id="test_escaped_pointer",
+    ),
+    pytest.param("mapping", [""], id="test_not_a_mapping"),
+]
+
+
+@pytest.mark.parametrize("data,expected_paths", TEST_DATA_INVALID_MAPPINGS)
+def test_compiled_schema_reports_all_errors(data, expected_paths: List[str]):
+    errors = schema_validator.validate_all(data)
+
+    assert sorted(error.path for error in errors) == sorted(expected_paths)
+    assert not schema_validator.validate_with_schema_library(data)[0]
+
+
+@pytest.mark.parametrize("path", SAMPLE_FILES)
+def test_compiled_schema_accepts_samples(path: str):
+    data = load_mapping(path)
+
+    assert schema_validator.validate(data) == schema_validator.validate_with_schema_library(data) == (True, None)
+
+
+def test_compiled_schema_formats_custom_errors_with_value():
+    (error,) = compile_schema(RESOURCE_SCHEMA).errors({"foo": {"resource": "unknown"}})
+
+    assert str(error) == "/foo/resource: No resource with key unknown found"
@@ -0,0 +1,224 @@
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Tuple
+
+import pytest
+
+import server
+
+MAPPING = {"bucket": {"resource": "s3"}}
+
+
+async def _send(reader, writer, method: str, body: bytes = b"", headers: str = "") -> Tuple[int, dict, object]:
+    writer.write(f"{method} / HTTP/1.1\r\nHost: test\r\n{headers}Content-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    head = (await reader.readuntil(b"\r\n\r\n")).decode()
+    lines = head.split("\r\n")
+    response_headers = dict(line.split(": ", 1) for line in lines[1:] if line)
+    result = json.loads(await reader.readexactly(int(response_headers["Content-Length"])))
+    return int(lines[0].split(" ")[1]), response_headers, result
+
+
+def _run(test, **kwargs):
+    async def _with_server():
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            generator_server = server.GeneratorServer(port=0, workers=1, executor=executor, **kwargs)
+            await generator_server.start()
+            try:
+                return await test(generator_server)
+            finally:
+                await generator_server.close()
+
+    return asyncio.run(_with_server())
+
+
+def test_serve_requests_over_keep_alive_connection():
+    async def test(generator_server) -> List:
+        reader, writer = await asyncio.open_connection(generator_server.host, generator_server.port)
+        body = json.dumps({"version": "1.0", "action": "build", "mapping": MAPPING}).encode()
+        responses = [await _send(reader, writer, "POST", body) for _ in range(2)]
+        responses.append(await _send(reader, writer, "POST", b"{", "Connection: close\r\n"))
+        closed = await reader.read() == b""
+        writer.close()
+        return responses, closed
+
+    responses, closed = _run(test)
+
+    for status, headers, result in responses[:2]:
+        assert status == 200
+        assert headers["Connection"] == "keep-alive"
+        assert 'provider "aws" {' in result
+    status, headers, result = responses[2]
+    assert status == 400
+    assert headers["Connection"] == "close"
+    assert closed
+
+
+async def _post(generator_server, body: dict) -> Tuple[int, dict, object]:
+    reader, writer = await asyncio.open_connection(generator_server.host, generator_server.port)
+    try:
+        return await _send(reader, writer, "POST", json.dumps(body).encode())
+    finally:
+        writer.close()
+
+
+def _slow_dispatch(monkeypatch, release: asyncio.Event) -> List[dict]:
+    dispatched = []
+
+    async def slow_dispatch(self, request):
+        dispatched.append(request)
+        await release.wait()
+        return f"done {request['mapping']}", 200
+
+    monkeypatch.setattr(server.GeneratorServer, "_dispatch", slow_dispatch)
+    return dispatched
+
+
+def test_serve_rejects_requests_over_capacity(monkeypatch):
+    release = asyncio.Event()
+    _slow_dispatch(monkeypatch, release)
+
+    async def test(generator_server):
+        def request(i: int):
+            return _post(generator_server, {"version": "1.0", "action": "validate", "mapping": i})
+
+        tasks = [asyncio.create_task(request(i)) for i in range(3)]
+        while generator_server.in_flight < 2:
+            await asyncio.sleep(0.01)
+        rejected = await request(3)
+        release.set()
+        return rejected[0], [status for status, _, _ in await asyncio.gather(*tasks)]
+
+    rejected, statuses = _run(test, max_concurrency=1, max_pending=1)
+
+    assert rejected == 429
+    assert sorted(statuses) == [200, 200, 429]
+
+
+def test_serve_coalesces_identical_requests(monkeypatch):
+    release = asyncio.Event()
+    dispatched = _slow_dispatch(monkeypatch, release)
+
+    async def test(generator_server):
+        bodies = [{"version": "1.0", "action": "build", "mapping": MAPPING, "deterministic": True}] * 5
+        bodies.append({"version": "1.0", "action": "build", "mapping": {}, "deterministic": True})
+        tasks = [asyncio.create_task(_post(generator_server, body)) for body in bodies]
+        while generator_server.single_flight.coalesced < 4 or generator_server.in_flight < 2:
+            await asyncio.sleep(0.01)
+        release.set()
+        return await asyncio.gather(*tasks), generator_server.stats()
+
+    responses, stats = _run(test, max_concurrency=1, max_pending=1)
+
+    assert len(dispatched) == 2
+    assert [result for _, _, result in responses] == [f"done {MAPPING}"] * 5 + ["done {}"]
+    assert stats["coalescing"] == {"calls": 2, "coalesced": 4, "in_flight": 0}
+    assert stats["rejected"] == 0
+
+
+def test_single_flight_waiters_retry_cancelled_call():
+    async def test():
+        single_flight = server.SingleFlight()
+        release = asyncio.Event()
+        calls = []
+
+        async def call():
+            calls.append(len(calls))
+            await release.wait()
+            return f"result {len(calls)}"
+
+        leader = asyncio.create_task(single_flight.do("key", call))
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(single_flight.do("key", call)) for _ in range(2)]
+        await asyncio.sleep(0)
+        leader.cancel()
+        for _ in range(10):
+            # Lets the waiters resume, one of them calling again and the other waiting for it
+            await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*waiters)
+        return leader.cancelled(), results, calls, single_flight.stats()
+
+    leader_cancelled, results, calls, stats = asyncio.run(test())
+
+    assert leader_cancelled
+    assert results == ["result 2", "result 2"]
+    assert calls == [0, 1]
+    assert stats == {"calls": 2, "coalesced": 1, "in_flight": 0}
+
+
+def test_serve_does_not_coalesce_random_builds(monkeypatch):
+    release = asyncio.Event()
+    dispatched = _slow_dispatch(monkeypatch, release)
+
+    async def test(generator_server):
+        body = {"version": "1.0", "action": "build", "mapping": MAPPING}
+        tasks = [asyncio.create_task(_post(generator_server, body)) for _ in range(2)]
+        while generator_server.in_flight < 2:
+            await asyncio.sleep(0.01)
+        release.set()
+        return await asyncio.gather(*tasks), generator_server.stats()
+
+    responses, stats = _run(test, max_concurrency=2, max_pending=0)
+
+    assert len(dispatched) == 2
+    assert [status for status, _, _ in responses] == [200, 200]
+    assert stats["coalescing"] == {"calls": 0, "coalesced": 0, "in_flight": 0}
+
+
+@pytest.mark.parametrize(
+    "request_options,coalesced",
+    [
+        pytest.param({"action": "validate"}, True, id="test_validate"),
+        pytest.param({"action": "build"}, False, id="test_random_build"),
+        pytest.param({"action": "build", "deterministic": True}, True, id="test_deterministic_build"),
+        pytest.param({"action": "build", "seed": "stack"}, True, id="test_seeded_build"),
+        pytest.param({"action": "build", "deterministic": True, "profile": True}, False, id="test_profiled_build"),
+        pytest.param({"action": "build_incremental", "seed": "stack"}, False, id="test_incremental_build"),
+    ],
+)
+def test_coalescing_key(request_options: dict, coalesced: bool):
+    request = {"version": "1.0", "mapping": MAPPING, **request_options}
+    assert (server.get_coalescing_key(request) is not None) == coalesced
+
+
+def test_serve_answers_unexpected_errors(monkeypatch):
+    async def failing_dispatch(self, request):
+        raise ValueError("boom")
+
+    monkeypatch.setattr(server.GeneratorServer, "_dispatch", failing_dispatch)
+
+    async def test(generator_server):
+        reader, writer = await asyncio.open_connection(generator_server.host, generator_server.port)
+        body = json.dumps({"version": "1.0", "action": "build", "mapping": MAPPING}).encode()
+        responses = [await _send(reader, writer, "POST", body) for _ in range(2)]
+        writer.close()
+        return responses
+
+    for status, headers, result in _run(test):
+        assert status == 500
+        assert headers["Connection"] == "keep-alive"
+        assert result == "ValueError: boom"
+
+
+def test_serve_replaces_broken_worker_pool():
+    async def with_server():
+        generator_server = server.GeneratorServer(port=0, workers=1)
+        await generator_server.start()
+        try:
+            broken = generator_server.executor
+            with pytest.raises(BrokenProcessPool):
+                await asyncio.wrap_future(broken.submit(os._exit, 1))
+            body = {"version": "1.0", "action": "validate", "mapping": MAPPING}
+            responses = [await _post(generator_server, body) for _ in range(2)]
+            return broken, generator_server.executor, responses
+        finally:
+            await generator_server.close()
+
+    broken, executor, responses = asyncio.run(with_server())
+
+    assert [status for status, _, _ in responses] == [503, 200]
+    assert executor is not broken
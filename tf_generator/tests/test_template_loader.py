@@ -0,0 +1,88 @@
+import os
+import shutil
+
+import pytest
+
+from config import TEMPLATES_DIR
+from template_loader import TemplateRegistry, compile_bundle
+
+TEMPLATE_NAMES = [
+    "base.tf.template",
+    "providers/aws.tf.template",
+    "ec2/main.tf.template",
+    "ecs/main.tf.template",
+    "s3/main.tf.template",
+    "vpc/main.tf.template",
+]
+
+
+@pytest.mark.parametrize("name", TEMPLATE_NAMES)
+def test_registry_compiles_template_once(name: str):
+    registry = TemplateRegistry()
+    template = registry.get(name)
+
+    assert registry.get(name) is template
+    assert registry.stats() == {"hits": 1, "misses": 1, "size": 1}
+
+
+def test_registry_evicts_least_recently_used():
+    registry = TemplateRegistry(cache_size=2)
+    registry.get("ec2/main.tf.template")
+    registry.get("s3/main.tf.template")
+    registry.get("ec2/main.tf.template")
+    registry.get("vpc/main.tf.template")
+
+    registry.get("ec2/main.tf.template")
+    registry.get("s3/main.tf.template")
+
+    assert registry.stats() == {"hits": 2, "misses": 4, "size": 2}
+
+
+def test_registry_bytecode_cache(tmp_path):
+    registry = TemplateRegistry(bytecode_cache_dir=str(tmp_path))
+    registry.get("vpc/main.tf.template")
+
+    assert list(tmp_path.iterdir())
+
+    fresh_registry = TemplateRegistry(bytecode_cache_dir=str(tmp_path))
+    rendered = fresh_registry.get("providers/aws.tf.template").render({"region": "eu-west-1"})
+    assert 'default = "eu-west-1"' in rendered
+
+
+@pytest.fixture
+def templates_dir(tmp_path) -> str:
+    path = str(tmp_path / "templates")
+    shutil.copytree(TEMPLATES_DIR, path)
+    return path
+
+
+@pytest.fixture
+def bundle_dir(tmp_path, templates_dir) -> str:
+    path = str(tmp_path / "bundle")
+    compile_bundle(path, templates_dir)
+    return path
+
+
+@pytest.mark.parametrize("name", TEMPLATE_NAMES)
+def test_precompiled_bundle_matches_source(name: str, templates_dir: str, bundle_dir: str):
+    source_registry = TemplateRegistry(templates_dir)
+    bundle_registry = TemplateRegistry(templates_dir, bundle_dir=bundle_dir)
+    context = {"region": "eu-west-1", "uid": "foo", "vpc_uid": "bar", "azs": ["a"], "subnet_cidrs": ["10.0.1.0/24"]}
+
+    assert bundle_registry.environment.loader.is_bundled(name)
+    assert bundle_registry.get(name).render(context) == source_registry.get(name).render(context)
+
+
+def test_precompiled_bundle_falls_back_to_newer_source(templates_dir: str, bundle_dir: str):
+    source_path = os.path.join(templates_dir, "providers", "aws.tf.template")
+    with open(source_path, "a") as f:
+        f.write("# edited after compiling")
+    bundle_mtime = os.path.getmtime(bundle_dir)
+    os.utime(source_path, (bundle_mtime + 10, bundle_mtime + 10))
+
+    registry = TemplateRegistry(templates_dir, bundle_dir=bundle_dir)
+
+    assert not registry.environment.loader.is_bundled("providers/aws.tf.template")
+    assert (
+        registry.get("providers/aws.tf.template").render({"region": "eu-west-1"}).endswith("# edited after compiling")
+    )
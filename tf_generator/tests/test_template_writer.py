@@ -0,0 +1,79 @@
+import json
+import os
+
+import pytest
+
+import operations
+import template_writer
+from config import BASE_DIR
+from mapping_loader import load_mapping
+
+SAMPLE_MAPPING = load_mapping(os.path.join(BASE_DIR, "tests", "samples", "basic_example.yaml"))
+
+
+def test_write_files_skips_unchanged_and_removes_stale(tmp_path):
+    template_writer.write_files(str(tmp_path), {"a.tf": "a", "b.tf": "b", "c.tf": "c"})
+    modified = os.path.getmtime(tmp_path / "a.tf")
+    os.utime(tmp_path / "a.tf", (modified - 10, modified - 10))
+
+    result = template_writer.write_files(str(tmp_path), {"a.tf": "a", "b.tf": "bb"})
+
+    assert result.written == ["b.tf"]
+    assert result.unchanged == ["a.tf"]
+    assert result.removed == ["c.tf"]
+    assert os.path.getmtime(tmp_path / "a.tf") == modified - 10
+    assert (tmp_path / "b.tf").read_text() == "bb"
+    assert not (tmp_path / "c.tf").exists()
+
+
+def test_write_files_keeps_files_it_did_not_write(tmp_path):
+    (tmp_path / "backend.tf").write_text("terraform {}")
+    template_writer.write_files(str(tmp_path), {"a.tf": "a"})
+
+    result = template_writer.write_files(str(tmp_path), {})
+
+    assert result.removed == ["a.tf"]
+    assert (tmp_path / "backend.tf").exists()
+
+
+def test_write_files_only_removes_files_inside_directory(tmp_path):
+    out_dir, outside = tmp_path / "out", tmp_path / "outside.tf"
+    outside.write_text("keep")
+    (tmp_path / "linked").mkdir()
+    (tmp_path / "linked" / "main.tf").write_text("keep")
+    out_dir.mkdir()
+    (out_dir / "link").symlink_to(tmp_path / "linked")
+    manifest = ["../outside.tf", str(outside), "link/main.tf", "", 1]
+    (out_dir / template_writer.MANIFEST_FILE_NAME).write_text(json.dumps(manifest))
+
+    result = template_writer.write_files(str(out_dir), {"a.tf": "a"})
+
+    assert result.removed == []
+    assert outside.read_text() == "keep"
+    assert (tmp_path / "linked" / "main.tf").read_text() == "keep"
+
+
+@pytest.mark.parametrize("name", ["../a.tf", "/tmp/a.tf", "sub/../../a.tf"])
+def test_write_files_rejects_files_outside_directory(tmp_path, name: str):
+    with pytest.raises(ValueError):
+        template_writer.write_files(str(tmp_path / "out"), {name: "a"})
+
+
+def test_write_region_files_writes_a_directory_per_region(tmp_path):
+    region_files = {"aws-eu-west-1": {"main.tf": "a"}, "aws-us-east-1": {"main.tf": "b"}}
+
+    template_writer.write_region_files(str(tmp_path), region_files)
+
+    assert (tmp_path / "aws-eu-west-1" / "main.tf").read_text() == "a"
+    assert (tmp_path / "aws-us-east-1" / "main.tf").read_text() == "b"
+
+
+def test_split_items_moves_main_into_item_files():
+    (files,) = operations.build_files(SAMPLE_MAPPING, deterministic=True).values()
+    (split_files,) = operations.build_files(SAMPLE_MAPPING, deterministic=True, split_items=True).values()
+
+    item_files = [name for name in split_files if name not in files]
+    assert "main.tf" not in split_files
+    assert "".join(split_files[name] for name in item_files) == files["main.tf"]
+    for name in ["providers.tf", "variables.tf", "outputs.tf"]:
+        assert split_files[name] == files[name]
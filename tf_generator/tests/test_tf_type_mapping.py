@@ -78,9 +78,18 @@ def test_resource_map_getter(test_data: Dict, resource_map: ResourceMap):
         pytest.param({"keyword": "docker"}, ["docker"], id="test_search_by_key"),
         pytest.param({"keyword": "compute"}, ["docker"], id="test_search_by_category"),
         pytest.param({"keyword": "Generic docker"}, ["docker"], id="test_search_by_keyword_in_description"),
+        pytest.param({"keyword": "eneric dock"}, ["docker"], id="test_search_by_partial_keyword_in_description"),
+        pytest.param({"keyword": "data"}, ["bigtable", "postgresql"], id="test_search_by_partial_category"),
+        pytest.param({"keyword": "sql"}, ["bigtable", "postgresql"], id="test_search_by_tag_and_description"),
+        pytest.param({"keyword": "bucket_name"}, ["s3"], id="test_search_by_param_name"),
+        pytest.param({"keyword": "ocke"}, ["docker"], id="test_search_by_keyword_longer_than_ngrams"),
+        pytest.param({"keyword": "gcp"}, ["bigtable", "docker", "postgresql"], id="test_search_by_cloud_keyword"),
         pytest.param({"cloud": "aws"}, ["docker", "postgresql", "s3"], id="test_filter_by_cloud"),
         pytest.param({"tags": ["database"]}, ["bigtable", "postgresql"], id="test_filter_by_db_tag"),
         pytest.param({"cloud": "aws", "tags": ["database"]}, ["postgresql"], id="test_filter_by_db_tag_and_cloud"),
+        pytest.param(
+            {"keyword": "storage", "tags": ["aws-only"]}, ["s3"], id="test_search_by_keyword_and_filter_by_tag"
+        ),
     ],
 )
 def test_resource_map_search(search_params: Dict, expected_keys: List[str], resource_map: ResourceMap):
@@ -92,3 +101,36 @@ def test_resource_map_search(search_params: Dict, expected_keys: List[str], reso
     assert len(results) == len(expected_keys)
     for key in expected_keys:
         assert _get_resource_details(key) in results
+
+
+@pytest.mark.parametrize(
+    "search_params",
+    [
+        pytest.param({"keyword": "lorem"}, id="test_search_no_match_for_keyword"),
+        pytest.param({"cloud": "azure", "tags": ["storage"]}, id="test_filter_no_match_for_cloud_and_tag"),
+    ],
+)
+def test_resource_map_search_no_results(search_params: Dict, resource_map: ResourceMap):
+    with pytest.raises(KeyError):
+        resource_map.search(search_params.get("keyword"), search_params.get("cloud"), search_params.get("tags"))
+
+
+def test_resource_map_search_order(resource_map: ResourceMap):
+    unsorted_map = ResourceMap.from_dict(list(reversed(TEST_DATA_MAPPING)))
+
+    assert [x.key for x in unsorted_map.search(None, None, None)] == ["bigtable", "docker", "postgresql", "s3"]
+    assert [x.key for x in unsorted_map.search(None, None, None, sort_results=False)] == [
+        "s3",
+        "postgresql",
+        "docker",
+        "bigtable",
+    ]
+
+
+def test_matches_keyword_by_param_name():
+    resource = _get_resource_details("s3")
+
+    # Keywords used to be looked up in `params` itself, a list of dicts which no keyword ever equals
+    assert "bucket_name" not in resource.params
+    assert ResourceDetails.matches_keyword(resource, "bucket_name")
+    assert not ResourceDetails.matches_keyword(resource, "bucket")
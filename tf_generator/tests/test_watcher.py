@@ -0,0 +1,58 @@
+import json
+import threading
+import time
+
+import watcher
+
+VM_PARAMS = {"aws_instance_type": "t2.micro", "image_regex": "amazon linux"}
+
+
+def _write_mapping(path, instance_count: int):
+    params = {**VM_PARAMS, "instance_count": instance_count}
+    mapping = [
+        {"cloud": "aws", "resources": {"bucket": {"resource": "s3"}, "server": {"resource": "vm", "params": params}}}
+    ]
+    path.write_text(json.dumps(mapping))
+
+
+def test_rebuild_is_incremental(tmp_path):
+    mapping_path, output_path = tmp_path / "mapping.json", tmp_path / "out.tf"
+    _write_mapping(mapping_path, 1)
+    mapping_watcher = watcher.MappingWatcher(str(mapping_path), str(output_path))
+
+    first = mapping_watcher.rebuild()
+    _write_mapping(mapping_path, 2)
+    second = mapping_watcher.rebuild()
+
+    assert first.error is None and second.error is None
+    assert list(second.phases) == ["load", "parse", "build", "write"]
+    assert list(second.rendered.values()) == [["server"]]
+    assert "= 2" in output_path.read_text()
+
+
+def test_rebuild_reports_invalid_mapping(tmp_path):
+    mapping_path = tmp_path / "mapping.json"
+    mapping_path.write_text(json.dumps({"foo": "bar"}))
+
+    result = watcher.MappingWatcher(str(mapping_path), str(tmp_path / "out.tf")).rebuild()
+
+    assert result.error.startswith("Invalid mapping")
+
+
+def test_run_rebuilds_on_change(tmp_path):
+    mapping_path, output_path = tmp_path / "mapping.json", tmp_path / "out.tf"
+    _write_mapping(mapping_path, 1)
+    mapping_watcher = watcher.MappingWatcher(str(mapping_path), str(output_path), interval=0.01, debounce=0.01)
+    results = []
+
+    thread = threading.Thread(target=mapping_watcher.run, kwargs={"on_rebuild": results.append, "max_rebuilds": 1})
+    thread.start()
+    while not results:
+        time.sleep(0.01)
+    # Changes both the size and the modification time of the file
+    _write_mapping(mapping_path, 10)
+    thread.join(timeout=5)
+
+    assert not thread.is_alive()
+    assert len(results) == 2
+    assert list(results[1].rendered.values()) == [["server"]]
@@ -0,0 +1,158 @@
+"""
+Rebuild a mapping whenever it (or the templates) change, for local editing.
+
+Files are polled rather than watched through OS notifications, so that no extra dependency is needed. The catalog,
+the templates and the rendered fragments of unchanged resources stay loaded between rebuilds.
+"""
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import operations
+import template_writer
+from build_cache import get_catalog_version
+from config import TEMPLATES_DIR
+from generator import reset_engine
+from mapping_loader import load_mapping
+from template_loader import get_registry
+
+Snapshot = Dict[str, Tuple[float, int]]
+
+
+def snapshot(paths: Iterable[str]) -> Snapshot:
+    """Modification time and size of every file in `paths`, recursing into directories"""
+    out: Snapshot = {}
+    for path in paths:
+        if os.path.isdir(path):
+            files = (os.path.join(root, name) for root, _, names in os.walk(path) for name in names)
+        else:
+            files = [path]
+        for file_path in files:
+            try:
+                stat = os.stat(file_path)
+            except FileNotFoundError:
+                continue
+            out[file_path] = (stat.st_mtime, stat.st_size)
+    return out
+
+
+@dataclass
+class RebuildResult:
+    phases: Dict[str, float] = field(default_factory=dict)
+    rendered: Dict[str, List[str]] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    @property
+    def seconds(self) -> float:
+        return sum(self.phases.values())
+
+    def describe(self) -> str:
+        phases = ", ".join(f"{name} {seconds * 1000:.1f}ms" for name, seconds in self.phases.items())
+        if self.error:
+            return f"Rebuild failed after {self.seconds * 1000:.1f}ms ({phases}): {self.error}"
+        rendered = sum(len(uids) for uids in self.rendered.values())
+        return f"Rebuilt in {self.seconds * 1000:.1f}ms ({phases}), re-rendered {rendered} resource(s)"
+
+
+class MappingWatcher:
+    def __init__(
+        self,
+        mapping_path: str,
+        output_path: str,
+        watch_templates: bool = False,
+        interval: float = 0.5,
+        debounce: float = 0.2,
+    ):
+        self.mapping_path = mapping_path
+        self.output_path = output_path
+        self.templates_dir = TEMPLATES_DIR if watch_templates else None
+        self.interval = interval
+        self.debounce = debounce
+        self.fragment_cache = operations.create_fragment_cache()
+
+    @property
+    def watched_paths(self) -> List[str]:
+        return [self.mapping_path] + ([self.templates_dir] if self.templates_dir else [])
+
+    def rebuild(self, templates_changed: bool = False) -> RebuildResult:
+        result = RebuildResult()
+        phase_start = time.perf_counter()
+
+        def end_phase(name: str):
+            nonlocal phase_start
+            now = time.perf_counter()
+            result.phases[name] = now - phase_start
+            phase_start = now
+
+        try:
+            if templates_changed:
+                # Compiled templates and every fragment rendered with them are stale
+                get_registry().clear()
+                reset_engine()
+                get_catalog_version.cache_clear()
+                self.fragment_cache.clear()
+                self.fragment_cache.catalog_version = get_catalog_version()
+                end_phase("reload templates")
+
+            data = load_mapping(self.mapping_path)
+            end_phase("load")
+
+            parsed = operations.parse(data)
+            end_phase("parse")
+            if not parsed.ok:
+                result.error = f"Invalid mapping: {parsed.message}"
+                return result
+
+            region_templates, result.rendered = operations.build_incremental(
+                data, self.fragment_cache, hl_maps=parsed.maps
+            )
+            end_phase("build")
+
+            template_writer.write_regions(
+                self.output_path, {key: [template] for key, template in region_templates.items()}
+            )
+            end_phase("write")
+        except Exception as e:
+            result.error = f"{type(e).__name__}: {e}"
+        return result
+
+    def wait_for_change(self, previous: Snapshot) -> Tuple[Snapshot, bool]:
+        """
+        Block until a watched file changes and then stays unchanged for `debounce` seconds, so that editors saving
+        in several steps trigger a single rebuild. Returns the new snapshot and whether templates changed.
+        """
+        current = previous
+        while current == previous:
+            time.sleep(self.interval)
+            current = snapshot(self.watched_paths)
+
+        while True:
+            time.sleep(self.debounce)
+            settled = snapshot(self.watched_paths)
+            if settled == current:
+                break
+            current = settled
+
+        templates_changed = bool(self.templates_dir) and any(
+            current.get(path) != previous.get(path)
+            for path in set(current) | set(previous)
+            if path.startswith(self.templates_dir)
+        )
+        return current, templates_changed
+
+    def run(self, on_rebuild: Optional[Callable[[RebuildResult], None]] = None, max_rebuilds: Optional[int] = None):
+        """Build once, then rebuild on every change until interrupted (or after `max_rebuilds` rebuilds)"""
+        if on_rebuild is None:
+            on_rebuild = _print_result
+        state = snapshot(self.watched_paths)
+        on_rebuild(self.rebuild())
+        rebuilds = 0
+        while max_rebuilds is None or rebuilds < max_rebuilds:
+            state, templates_changed = self.wait_for_change(state)
+            on_rebuild(self.rebuild(templates_changed))
+            rebuilds += 1
+
+
+def _print_result(result: RebuildResult):
+    print(result.describe())